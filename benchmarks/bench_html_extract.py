@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Micro-benchmark of the Douyin/TikTok page parsers: the previous regex + full-page cleanup path
+against the offset based decoder in streamget.html_extract.
+
+Usage: python benchmarks/bench_html_extract.py [douyin.html] [tiktok.html] [-n 200]
+"""
+import argparse
+import json
+import re
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from streamget import html_extract  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+SIGI_TAG = '<script id="SIGI_STATE" type="application/json">'
+
+
+def legacy_douyin(html_str: str) -> tuple[dict, dict | None]:
+    match_json_str = re.search(r'(\{\\"state\\":.*?)]\\n"]\)', html_str)
+    if not match_json_str:
+        match_json_str = re.search(r'(\{\\"common\\":.*?)]\\n"]\)</script><div hidden', html_str)
+    cleaned_string = match_json_str.group(1).replace('\\', '').replace(r'u0026', r'&')
+    room_store = re.search('"roomStore":(.*?),"linkmicStore"', cleaned_string, re.DOTALL).group(1)
+    anchor_name = re.search('"nickname":"(.*?)","avatar_thumb', room_store, re.DOTALL).group(1)
+    room_store = room_store.split(',"has_commerce_goods"')[0] + '}}}'
+    json_data = json.loads(room_store)['roomInfo']['room']
+    json_data['anchor_name'] = anchor_name
+    origin = None
+    chunks = re.findall(r'"(\{\\"common\\":.*?)"]\)</script><script nonce=', html_str)
+    if chunks:
+        json_str = chunks[0] if json_data['stream_url']['stream_orientation'] == 1 else chunks[1]
+        json_data2 = json.loads(json_str.replace('\\', '').replace('"{', '{').replace('}"', '}').replace('u0026', '&'))
+        origin = json_data2['data']['origin']['main']
+    return json_data, origin
+
+
+def fast_douyin(html_str: str) -> tuple[dict, dict | None]:
+    room_info = html_extract.extract_douyin_room_store(html_str)['roomInfo']
+    json_data = room_info['room']
+    json_data['anchor_name'] = (json_data.get('owner') or room_info.get('anchor') or {}).get('nickname', '')
+    origin = None
+    chunks = html_extract.extract_douyin_stream_chunks(html_str)
+    if chunks:
+        chunk = chunks[0] if json_data['stream_url']['stream_orientation'] == 1 else chunks[1]
+        origin = chunk['data']['origin']['main']
+    return json_data, origin
+
+
+def legacy_tiktok(html_str: str) -> dict:
+    json_str = re.findall('<script id="SIGI_STATE" type="application/json">(.*?)</script>', html_str, re.DOTALL)[0]
+    return json.loads(json_str)
+
+
+def fast_tiktok(html_str: str) -> dict:
+    return html_extract.extract_script_json(html_str, SIGI_TAG)
+
+
+def measure(name: str, func, html_str: str, number: int) -> None:
+    per_call = min(timeit.repeat(lambda: func(html_str), number=number, repeat=3)) / number
+    tracemalloc.start()
+    func(html_str)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name:<16}{per_call * 1000:>10.3f} ms/call{peak / 1024:>12.1f} KiB peak')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument('douyin', nargs='?', default=FIXTURES_DIR / 'douyin' / '00.html')
+    parser.add_argument('tiktok', nargs='?', default=FIXTURES_DIR / 'tiktok' / '00.html')
+    parser.add_argument('-n', '--number', type=int, default=200)
+    args = parser.parse_args()
+
+    douyin_html = Path(args.douyin).read_text(encoding='utf-8')
+    tiktok_html = Path(args.tiktok).read_text(encoding='utf-8')
+
+    legacy_room, legacy_origin = legacy_douyin(douyin_html)
+    fast_room, fast_origin = fast_douyin(douyin_html)
+    assert (legacy_origin['flv'], legacy_origin['hls']) == (fast_origin['flv'], fast_origin['hls']), \
+        'douyin origin stream mismatch'
+    assert legacy_room['anchor_name'] == fast_room['anchor_name'], 'douyin anchor mismatch'
+    assert legacy_room['stream_url'] == fast_room['stream_url'], 'douyin stream_url mismatch'
+    assert legacy_tiktok(tiktok_html) == fast_tiktok(tiktok_html), 'tiktok SIGI_STATE mismatch'
+
+    print(f'douyin page: {len(douyin_html) / 1024:.0f} KiB')
+    measure('legacy', legacy_douyin, douyin_html, args.number)
+    measure('html_extract', fast_douyin, douyin_html, args.number)
+    print(f'tiktok page: {len(tiktok_html) / 1024:.0f} KiB')
+    measure('legacy', legacy_tiktok, tiktok_html, args.number)
+    measure('html_extract', fast_tiktok, tiktok_html, args.number)
+
+
+if __name__ == '__main__':
+    main()
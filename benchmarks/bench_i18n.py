@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Micro-benchmark of translated output: the former print replacement that called inspect.stack() for every
+argument against the explicit catalog lookup (streamget.messages.tr). Output goes to an in-memory buffer.
+
+Usage: python benchmarks/bench_i18n.py [-n 20000]
+"""
+import argparse
+import inspect
+import io
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import i18n  # noqa: E402
+from streamget.messages import tr  # noqa: E402
+
+TRANSLATED = "The anchor did not start broadcasting."
+UNTRANSLATED = "序號1 主播 等待直播... "
+
+
+def legacy_print(catalog: dict, *args, **kwargs):
+    # former i18n.translated_print, with the gettext lookup replaced by the same dict
+    for arg in args:
+        if 'streamget' in inspect.stack()[1].filename:
+            translated_arg = catalog.get(str(arg), str(arg))
+        else:
+            translated_arg = str(arg)
+        print(translated_arg, **kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=20000)
+    args = parser.parse_args()
+
+    i18n.locale_path = ROOT / 'i18n'
+    entries = i18n.install('zh_TW')
+    catalog = i18n.load_mo(i18n.locale_path / 'zh_TW' / 'LC_MESSAGES' / 'zh_TW.mo')
+    out = io.StringIO()
+    cases = [
+        ('legacy print, catalog message', lambda: legacy_print(catalog, TRANSLATED, file=out)),
+        ('legacy print, plain message', lambda: legacy_print(catalog, UNTRANSLATED, file=out)),
+        ('print(tr(...))', lambda: print(tr(TRANSLATED), file=out)),
+        ('plain print', lambda: print(UNTRANSLATED, file=out)),
+        ('tr() lookup only', lambda: tr(TRANSLATED)),
+    ]
+    print(f'catalog entries: {entries}, iterations: {args.n}')
+    for label, fn in cases:
+        seconds = timeit.timeit(fn, number=args.n)
+        out.seek(0)
+        out.truncate()
+        print(f'{label:32} {seconds / args.n * 1e6:10.2f} us/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Summarise `python -X importtime` for the imports main.py runs at startup: total import time,
+the slowest modules by self time, time per top-level package and the resulting max RSS. The import
+statements are read from main.py itself, so the list follows it; pass module names to measure those
+instead.
+
+Usage: python benchmarks/bench_importtime.py [module ...] [--top 15] [--repeat 5]
+"""
+import argparse
+import ast
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+_LINE_PATTERN = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+RSS_SNIPPET = """
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(rss // 1024 if sys.platform == 'darwin' else rss)
+except ImportError:
+    print(0)
+"""
+
+
+def module_imports(nodes: list[ast.stmt]) -> list[str]:
+    """Import statements that run when the module body runs, including those under if/try/while"""
+    statements = []
+    for node in nodes:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            statements.append(ast.unparse(node))
+        elif not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            for field in ('body', 'orelse', 'handlers', 'finalbody'):
+                statements += module_imports(getattr(node, field, []))
+    return statements
+
+
+def startup_imports(path: Path = ROOT_DIR / 'main.py') -> list[str]:
+    return module_imports(ast.parse(path.read_text(encoding='utf-8')).body)
+
+
+def run_python(args: list[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    # measure against cached bytecode, as a deployed recorder would
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, int, str]]:
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Import-time summary of the recorder startup modules')
+    parser.add_argument('modules', nargs='*', help='default: the module-level imports of main.py')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    statements = [f'import {m}' for m in args.modules] or startup_imports()
+    import_stmt = 'import sys; ' + '; '.join(statements)
+    run_python(['-c', import_stmt])  # warm the bytecode cache
+
+    runs = []
+    for _ in range(args.repeat):
+        result = run_python(['-X', 'importtime', '-c', import_stmt])
+        if result.returncode != 0:
+            sys.exit(result.stderr)
+        runs.append(parse_importtime(result.stderr))
+    totals = [sum(row[1] for row in rows if row[2] == 0) for rows in runs]
+    rows = runs[totals.index(statistics.median_low(totals))]
+
+    packages = defaultdict(int)
+    for self_us, _, _, name in rows:
+        packages[name.split('.')[0]] += self_us
+
+    rss_kib = int(run_python(['-c', import_stmt + '\n' + RSS_SNIPPET]).stdout.strip() or 0)
+
+    if args.modules:
+        print(f'modules: {", ".join(args.modules)}')
+    else:
+        print(f'main.py imports: {len(statements)} statements')
+    print(f'total import time: {statistics.median(totals) / 1000:.1f} ms (median of {args.repeat}), '
+          f'max RSS: {rss_kib / 1024:.1f} MiB')
+    print(f'\n{"self ms":>9}{"cumul ms":>10}  slowest modules')
+    for self_us, cumulative_us, _, name in sorted(rows, reverse=True)[:args.top]:
+        print(f'{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {name}')
+    print(f'\n{"self ms":>9}  package')
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f'{self_us / 1000:>9.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()
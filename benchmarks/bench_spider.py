@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Replay the recorded corpus through every spider/stream parser and report, per platform:
+probe latency (spider function end to end over the replay transport), parse time (stream function),
+peak traced allocations of one probe, and requests that had no recorded response.
+
+Usage: python benchmarks/bench_spider.py [platform ...] [-n 20]
+Exits non-zero when a platform stops returning data, so it can gate parser changes.
+
+Most fixtures are synthetic (built offline in the layout the parser reads, see corpus.py) and the corpus
+covers only a few of the spider functions; the header line says how many of each, so the numbers are read as
+parser costs on hand-built pages rather than on live traffic.
+
+time.sleep is patched out during the replay: get_tiktok_stream_data pauses a second after every request,
+which would otherwise be the whole TikTok probe time instead of the parser cost.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+from corpus import ReplayTransport, load_corpus
+from streamget import spider, stream
+from streamget.http_clients import async_http
+
+
+async def timed(func, repeat: int, *args, **kwargs) -> tuple[float, object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await func(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+async def bench_platform(name: str, entry: dict, repeat: int, video_quality: str) -> dict:
+    transport = ReplayTransport(entry['responses'])
+    async_http.set_transport(transport)
+    sleep_patch = mock.patch.object(spider.time, 'sleep', lambda seconds: None)
+    sleep_patch.start()
+    try:
+        spider_func = getattr(spider, entry['spider'])
+        probe, json_data = await timed(spider_func, repeat, url=entry['url'])
+
+        tracemalloc.start()
+        await spider_func(url=entry['url'])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        parse, port_info = 0.0, None
+        if entry.get('stream') and json_data:
+            stream_func = getattr(stream, entry['stream'])
+            parse, port_info = await timed(
+                stream_func, repeat, json_data, video_quality, **entry.get('stream_kwargs', {}))
+    finally:
+        sleep_patch.stop()
+        async_http.set_transport(None)
+
+    # spider functions of some platforms return the stream info themselves
+    info = port_info if entry.get('stream') else json_data
+    return {
+        'platform': name,
+        'probe': probe,
+        'parse': parse,
+        'peak': peak,
+        'misses': len(set(transport.misses)),
+        'ok': bool(info and info.get('anchor_name')),
+        'live': bool(info and info.get('is_live')),
+    }
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description='Offline benchmark of the spider/stream parsers')
+    parser.add_argument('platforms', nargs='*', help='platforms in fixtures/corpus.json, default all')
+    parser.add_argument('-n', '--number', type=int, default=20)
+    parser.add_argument('-q', '--quality', default='OD')
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    platforms = args.platforms or list(corpus)
+    synthetic = sum('note' in corpus[name] for name in platforms)
+    covered = {corpus[name]['spider'] for name in platforms}
+    spiders = [name for name, value in vars(spider).items()
+               if name.startswith('get_') and getattr(value, '__module__', None) == spider.__name__]
+    print(f'{len(platforms)} corpus entries, {synthetic} synthetic (not captured from live rooms), '
+          f'covering {len(covered)} of {len(spiders)} spider.get_* functions')
+    print(f'{"platform":<14}{"probe ms":>10}{"parse ms":>10}{"peak KiB":>10}{"misses":>8}  result')
+    failed = 0
+    for name in platforms:
+        row = await bench_platform(name, corpus[name], args.number, args.quality)
+        status = ('live' if row['live'] else 'offline') if row['ok'] else 'FAILED'
+        failed += not row['ok']
+        print(f'{name:<14}{row["probe"] * 1000:>10.3f}{row["parse"] * 1000:>10.3f}'
+              f'{row["peak"] / 1024:>10.1f}{row["misses"]:>8}  {status}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Scan a synthetic URL_config.ini with N rooms (a few percent duplicated) with url_catalog.UrlCatalog:
+the first load with duplicate removal, a rescan of the unchanged file and a rescan after one line
+was appended, as the main loop does every few seconds.
+
+The first load still runs every line through the Python parser, so it grows with N (a few hundred ms
+at 50000 rooms). A rescan of the unchanged file is a stat call. A rescan after an edit still walks every
+line to rebuild the offsets, though it skips parse_line for lines it has seen, so only the unchanged
+rescan is in the low-ms range.
+
+``--legacy N`` also times the previous list based loop, which rewrote the file for every duplicate,
+against a first load on N rooms. That loop is quadratic, so keep N small (5000 takes seconds, 50000
+takes minutes).
+
+Usage: python benchmarks/bench_url_catalog.py [-n 50000] [--dup 0.02] [--legacy 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from url_catalog import UrlCatalog, parse_line  # noqa: E402
+
+ENCODING = 'utf-8-sig'
+
+
+def make_config(path: str, rooms: int, dup_ratio: float) -> None:
+    rng = random.Random(0)
+    lines = [f'{rng.choice(("原畫", "超清"))},https://live.douyin.com/{100000000 + i},主播: room{i}\n'
+             for i in range(rooms)]
+    for _ in range(int(rooms * dup_ratio)):
+        lines.insert(rng.randrange(len(lines)), rng.choice(lines))
+    with open(path, 'w', encoding=ENCODING) as f:
+        f.writelines(lines)
+
+
+def delete_line(file_path: str, del_line: str) -> None:
+    with open(file_path, 'r+', encoding=ENCODING) as f:
+        lines = f.readlines()
+        f.seek(0)
+        f.truncate()
+        skip_line = False
+        for txt_line in lines:
+            if del_line in txt_line and not skip_line:
+                skip_line = True
+                continue
+            f.write(txt_line)
+
+
+def legacy_scan(path: str) -> int:
+    line_list, url_line_list = [], []
+    with open(path, 'r', encoding=ENCODING, errors='ignore') as file:
+        for origin_line in file:
+            if origin_line in line_list:
+                delete_line(path, origin_line)
+            line_list.append(origin_line)
+            line = origin_line.strip()
+            if len(line) < 20:
+                continue
+            _, url, _, _ = parse_line(line, '原畫')
+            if url not in url_line_list:
+                url_line_list.append(url)
+            else:
+                delete_line(path, origin_line)
+    return len(url_line_list)
+
+
+def catalog_scan(path: str) -> int:
+    catalog = UrlCatalog.load(path, ENCODING)
+    catalog.remove(catalog.duplicates)
+    return len(catalog.by_url)
+
+
+def timed(label: str, path: str, scan) -> UrlCatalog | None:
+    start = time.perf_counter()
+    result = scan()
+    elapsed = time.perf_counter() - start
+    with open(path, encoding=ENCODING) as f:
+        remaining = sum(1 for _ in f)
+    rooms = len(result.by_url) if isinstance(result, UrlCatalog) else result
+    print(f'{label:16} {elapsed * 1000:10.1f} ms  rooms={rooms}  lines left={remaining}')
+    return result if isinstance(result, UrlCatalog) else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', type=int, default=50000)
+    parser.add_argument('--dup', type=float, default=0.02)
+    parser.add_argument('--legacy', type=int, default=0, metavar='N',
+                        help='also compare the quadratic legacy scan on N rooms')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'URL_config.ini')
+        if args.legacy:
+            for label, scan in (('legacy', legacy_scan), ('catalog', catalog_scan)):
+                make_config(path, args.legacy, args.dup)
+                timed(f'{label} n={args.legacy}', path, lambda: scan(path))
+
+        make_config(path, args.n, args.dup)
+        timed('first load', path, lambda: catalog_scan(path))
+        catalog = UrlCatalog.load(path, ENCODING)
+        catalog = timed('rescan unchanged', path, lambda: UrlCatalog.load(path, ENCODING, previous=catalog))
+        with open(path, 'a', encoding=ENCODING) as f:
+            f.write('原畫,https://live.douyin.com/999999999,主播: appended\n')
+        timed('rescan edited', path, lambda: UrlCatalog.load(path, ENCODING, previous=catalog))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+
+Recorded-response corpus for the spider parsers.
+
+fixtures/corpus.json maps a platform to the room URL, the spider/stream functions that parse it and the
+responses they requested. ReplayTransport serves those responses through streamget's async client, so the
+parsers run fully offline. Requests made with urllib/execjs outside async_req are not covered.
+
+Every entry so far was built without network access in the layout its parser reads, as its ``note`` says:
+the Douyin and TikTok pages at about live page size, the other platforms as compact responses. They exercise
+the parsing paths; recording an entry again replaces it with real responses and drops the note.
+
+Record new entries from the rooms in demo.py (needs network):
+    python benchmarks/corpus.py record douyin tiktok
+Entries are named after demo.py. Rooms that demo.py does not list are taken from EXTRA_ROOMS, e.g. huya_web:
+the room page that main.py parses for qualities below OD.
+"""
+import asyncio
+import json
+import sys
+import urllib.parse
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+CORPUS_FILE = FIXTURES_DIR / 'corpus.json'
+
+# entries that are not in demo.LIVE_STREAM_CONFIG: name -> (room URL, spider function)
+EXTRA_ROOMS = {
+    'huya_web': ('https://www.huya.com/116', 'get_huya_stream_data'),
+}
+
+
+def load_corpus() -> dict:
+    return json.loads(CORPUS_FILE.read_text(encoding='utf-8'))
+
+
+def save_corpus(corpus: dict) -> None:
+    CORPUS_FILE.write_text(json.dumps(corpus, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+
+def _url_key(url: str) -> str:
+    parsed = urllib.parse.urlsplit(url)
+    return f'{parsed.netloc}{parsed.path}'
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve recorded responses, matched on the full URL first and then on host + path"""
+
+    def __init__(self, responses: list[dict], fixtures_dir: Path = FIXTURES_DIR):
+        self.exact = {}
+        self.loose = {}
+        for entry in responses:
+            body = (fixtures_dir / entry['file']).read_bytes()
+            item = (entry.get('status', 200), entry.get('content_type', 'text/html; charset=utf-8'), body)
+            self.exact[(entry.get('method', 'GET'), entry['url'])] = item
+            self.loose.setdefault((entry.get('method', 'GET'), _url_key(entry['url'])), item)
+        self.misses = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        item = self.exact.get((request.method, url)) or self.loose.get((request.method, _url_key(url)))
+        if not item:
+            self.misses.append(f'{request.method} {url}')
+            return httpx.Response(404, content=b'no recorded response', request=request)
+        status, content_type, body = item
+        return httpx.Response(status, headers={'content-type': content_type}, content=body, request=request)
+
+
+class RecordingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, platform: str, fixtures_dir: Path = FIXTURES_DIR):
+        super().__init__(http2=True, verify=False)
+        self.platform = platform
+        self.fixtures_dir = fixtures_dir
+        self.responses = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        body = await response.aread()
+        content_type = response.headers.get('content-type', '')
+        suffix = '.json' if 'json' in content_type else '.m3u8' if 'mpegurl' in content_type else '.html'
+        file_name = f'{self.platform}/{len(self.responses):02d}{suffix}'
+        (self.fixtures_dir / self.platform).mkdir(parents=True, exist_ok=True)
+        (self.fixtures_dir / file_name).write_bytes(body)
+        self.responses.append({
+            'method': request.method,
+            'url': str(request.url),
+            'status': response.status_code,
+            'content_type': content_type,
+            'file': file_name,
+        })
+        # the body has already been decoded by aread
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+
+def room(platform: str) -> tuple[str, str]:
+    """Room URL and spider function name to record ``platform`` from"""
+    from demo import LIVE_STREAM_CONFIG
+
+    if platform in LIVE_STREAM_CONFIG:
+        config = LIVE_STREAM_CONFIG[platform]
+        return config['url'], config['func'].__name__
+    if platform in EXTRA_ROOMS:
+        return EXTRA_ROOMS[platform]
+    known = sorted(set(LIVE_STREAM_CONFIG) | set(EXTRA_ROOMS))
+    raise SystemExit(f'Unknown platform {platform!r}; known: {", ".join(known)}')
+
+
+async def record(platforms: list[str]) -> None:
+    from streamget import spider
+    from streamget.http_clients import async_http
+
+    corpus = load_corpus()
+    for platform in platforms:
+        url, spider_name = room(platform)
+        transport = RecordingTransport(platform)
+        async_http.set_transport(transport)
+        try:
+            await getattr(spider, spider_name)(url=url)
+        finally:
+            async_http.set_transport(None)
+        entry = corpus.get(platform, {})
+        entry |= {'url': url, 'spider': spider_name, 'responses': transport.responses}
+        entry.pop('note', None)
+        corpus[platform] = entry
+        print(f'{platform}: recorded {len(transport.responses)} responses')
+    save_corpus(corpus)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] != 'record':
+        sys.exit('Usage: python benchmarks/corpus.py record <platform> [<platform> ...]')
+    asyncio.run(record(sys.argv[2:]))
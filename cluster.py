@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Share rooms between several recorder nodes through leases in a common SQLite file.
+"""
+import math
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    node_id TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL,
+    weight REAL NOT NULL,
+    free_gb REAL NOT NULL,
+    load REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    url TEXT PRIMARY KEY,
+    node_id TEXT NOT NULL,
+    expires REAL NOT NULL,
+    epoch INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS leases_node ON leases (node_id);
+"""
+
+
+def default_node_id() -> str:
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def system_load() -> float:
+    """1 minute load per core, 0 where the platform does not report it"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+def node_weight(free_gb: float, load: float) -> float:
+    # free disk decides the share, a busy CPU scales it down
+    return max(free_gb, 0.1) * max(0.1, 1 - min(load, 1.0))
+
+
+class LeaseStore:
+    """
+    Room leases kept in a SQLite file shared by every node.
+
+    A node owns a room while its lease is unexpired; taking over a lease is a single conditional upsert
+    inside an immediate transaction, so two nodes can never hold the same room at once. Every takeover
+    increments the lease epoch. The file uses the rollback journal: WAL needs shared memory, which does not
+    work when the file sits on a network share, as it does for nodes on different machines. Waiting for
+    another node's lock gives up after ``busy_timeout``, a small part of the lease, so a failed renewal is
+    noticed while the leases are still valid.
+    """
+
+    def __init__(self, db_path: str, node_id: str, lease_seconds: float = 30):
+        self.db_path = db_path
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.busy_timeout = lease_seconds / 6
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=self.busy_timeout,
+                                     isolation_level=None)
+        # also switches a file that an older version left in WAL mode back
+        self._conn.execute('PRAGMA journal_mode=DELETE')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                result = fn(self._conn)
+                self._conn.execute('COMMIT')
+                return result
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def heartbeat(self, free_gb: float, load: float) -> None:
+        now = time.time()
+        self._transaction(lambda conn: conn.execute(
+            'INSERT INTO nodes (node_id, heartbeat, weight, free_gb, load) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(node_id) DO UPDATE SET heartbeat = excluded.heartbeat, weight = excluded.weight, '
+            'free_gb = excluded.free_gb, load = excluded.load',
+            (self.node_id, now, node_weight(free_gb, load), free_gb, load)))
+
+    def leave(self) -> None:
+        """Give up every lease at once so other nodes do not wait for them to expire"""
+        self._transaction(lambda conn: (
+            conn.execute('DELETE FROM leases WHERE node_id = ?', (self.node_id,)),
+            conn.execute('DELETE FROM nodes WHERE node_id = ?', (self.node_id,))))
+
+    def live_nodes(self) -> dict[str, float]:
+        """node id -> weight for nodes that sent a heartbeat within one lease period"""
+        with self._lock:
+            rows = self._conn.execute('SELECT node_id, weight FROM nodes WHERE heartbeat >= ?',
+                                      (time.time() - self.lease_seconds,)).fetchall()
+        return dict(rows)
+
+    def owned(self) -> set[str]:
+        with self._lock:
+            rows = self._conn.execute('SELECT url FROM leases WHERE node_id = ? AND expires > ?',
+                                      (self.node_id, time.time())).fetchall()
+        return {url for url, in rows}
+
+    def renew(self) -> float:
+        """Extend all leases of this node; returns the new expiry time"""
+        expires = time.time() + self.lease_seconds
+        self._transaction(lambda conn: conn.execute(
+            'UPDATE leases SET expires = ? WHERE node_id = ? AND expires > ?', (expires, self.node_id, time.time())))
+        return expires
+
+    def acquire(self, urls: Iterable[str], limit: int) -> set[str]:
+        """Take up to ``limit`` rooms that nobody holds or whose lease has expired"""
+        def take(conn: sqlite3.Connection) -> set[str]:
+            now = time.time()
+            taken = set()
+            for url in urls:
+                if len(taken) >= limit:
+                    break
+                cursor = conn.execute(
+                    'INSERT INTO leases (url, node_id, expires) VALUES (?, ?, ?) '
+                    'ON CONFLICT(url) DO UPDATE SET node_id = excluded.node_id, expires = excluded.expires, '
+                    'epoch = epoch + 1 WHERE leases.expires <= ?',
+                    (url, self.node_id, now + self.lease_seconds, now))
+                if cursor.rowcount:
+                    taken.add(url)
+            return taken
+
+        return self._transaction(take) if limit > 0 else set()
+
+    def release(self, urls: Iterable[str]) -> None:
+        urls = list(urls)
+        if urls:
+            self._transaction(lambda conn: conn.executemany(
+                'DELETE FROM leases WHERE url = ? AND node_id = ?', [(url, self.node_id) for url in urls]))
+
+    def unowned(self, urls: Iterable[str]) -> list[str]:
+        """Rooms of ``urls`` without a valid lease on any node"""
+        with self._lock:
+            held = {url for url, in self._conn.execute('SELECT url FROM leases WHERE expires > ?', (time.time(),))}
+        return [url for url in urls if url not in held]
+
+
+class ClusterNode:
+    """
+    Background thread that keeps this node's share of the rooms.
+
+    Every ``lease_seconds / 3`` it sends a heartbeat with free disk and CPU load, renews its leases, picks up
+    rooms that are unowned (new rooms or rooms of a dead node) up to its weighted share of the fleet, and
+    releases idle rooms when it holds more than its share. If renewing keeps failing, the node drops every
+    room itself ``lease_seconds / 3`` before its leases expire, because other nodes take them over at expiry;
+    a failed renewal is retried early enough to finish before that point.
+    """
+
+    def __init__(self, store: LeaseStore, disk_path: str, busy: Callable[[str], bool] = lambda url: False,
+                 on_lost: Callable[[set[str]], None] = lambda urls: None):
+        self.store = store
+        self.disk_path = disk_path
+        self.busy = busy
+        self.on_lost = on_lost
+        self.owned: set[str] = set()
+        self.lost: set[str] = set()
+        self._rooms: list[str] | None = None
+        self._expires = 0.0
+        self._thread: threading.Thread | None = None
+
+    def set_rooms(self, urls: Iterable[str]) -> None:
+        """The rooms that should be recorded somewhere in the fleet"""
+        self._rooms = list(dict.fromkeys(urls))
+
+    def start(self) -> None:
+        """Take the first share synchronously, then keep it from the background thread"""
+        if self._thread is None:
+            self.tick()
+            self._thread = threading.Thread(target=self._run, name='cluster-node', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        interval = self.store.lease_seconds / 3
+        delay = interval
+        while True:
+            time.sleep(delay)
+            delay = interval
+            try:
+                self.tick()
+            except (sqlite3.Error, OSError) as e:
+                print(f'叢集租約更新失敗: {e}')
+                remaining = self._expires - interval - time.time()
+                if remaining <= 0:
+                    self._drop(set(self.owned))
+                else:
+                    delay = max(remaining - self.store.busy_timeout, 0)
+
+    def _drop(self, urls: set[str]) -> None:
+        if not urls:
+            return
+        self.owned -= urls
+        self.lost |= urls
+        self.on_lost(urls)
+
+    def share(self, total: int) -> int:
+        nodes = self.store.live_nodes()
+        weight = nodes.get(self.store.node_id, 0)
+        if not nodes or not weight:
+            return total
+        return math.ceil(total * weight / sum(nodes.values()))
+
+    def tick(self) -> None:
+        free_gb = shutil.disk_usage(self.disk_path).free / (1024 ** 3)
+        self.store.heartbeat(free_gb, system_load())
+        self._expires = self.store.renew()
+
+        rooms = self._rooms
+        if rooms is None:
+            return
+        wanted = set(rooms)
+        held = self.store.owned()
+        self.store.release(held - wanted)
+        held &= wanted
+
+        target = self.share(len(rooms))
+        if len(held) > target + 1:
+            idle = [url for url in held if not self.busy(url)]
+            release = set(idle[:len(held) - target])
+            self.store.release(release)
+            held -= release
+        elif len(held) < target:
+            held |= self.store.acquire(self.store.unowned(rooms), target - len(held))
+
+        self._drop(self.owned - held)
+        self.owned = held
+        self.lost -= held
+
+    def leave(self) -> None:
+        self.store.leave()
+        self._drop(set(self.owned))
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Detect config file changes cheaply and keep a compressed backup history.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from streamget.utils import check_md5
+
+
+class ChangeDetector:
+    """
+    Report whether a file changed since the last call.
+
+    A matching (mtime_ns, size) pair is trusted without reading the file; only when the stat differs
+    is the content hashed, so a touch without edits is not reported as a change.
+    """
+
+    def __init__(self):
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._digests: dict[str, str] = {}
+
+    def digest(self, file_path: str) -> str | None:
+        return self._digests.get(file_path)
+
+    def changed(self, file_path: str) -> bool:
+        stat = os.stat(file_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._stats.get(file_path) == key:
+            return False
+        self._stats[file_path] = key
+        digest = check_md5(file_path)
+        if self._digests.get(file_path) == digest:
+            return False
+        self._digests[file_path] = digest
+        return True
+
+
+class BackupStore:
+    """
+    Content-addressed, gzip compressed history of config files.
+
+    Every distinct version is stored once under objects/<md5[:2]>/<md5>.gz and index.json records
+    (time, digest, size) per file, so a long history costs little disk and any point in time can be
+    restored without listing the directory. A missing or unreadable index is rebuilt from objects/ and
+    never causes blobs to be deleted.
+    """
+
+    INDEX_NAME = 'index.json'
+    INDEX_VERSION = 2
+    RECOVERED_NAME = '(recovered)'
+    TIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
+
+    def __init__(self, backup_dir: str, max_versions: int = 1000):
+        self.backup_dir = backup_dir
+        self.max_versions = max_versions
+        self.index_path = os.path.join(backup_dir, self.INDEX_NAME)
+        self.objects_dir = os.path.join(backup_dir, 'objects')
+        self._index: dict[str, list[dict]] | None = None
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f'{digest}.gz')
+
+    def _load(self) -> dict[str, list[dict]]:
+        if self._index is None:
+            try:
+                with open(self.index_path, encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != self.INDEX_VERSION:
+                    raise ValueError('old index format')
+                index = data['files']
+            except FileNotFoundError:
+                index = None
+            except (ValueError, AttributeError, KeyError, TypeError):
+                # keep the unreadable index for inspection instead of overwriting it
+                suffix = datetime.datetime.now().strftime(self.TIME_FORMAT)
+                os.replace(self.index_path, f'{self.index_path}.bad-{suffix}')
+                index = None
+            if index is None:
+                # other read errors propagate and leave the index unloaded, so the next call tries again
+                self._index = {}
+                self._import_legacy()
+                self._recover_objects()
+                self._save()
+            else:
+                self._index = index
+        return self._index
+
+    def _import_legacy(self) -> None:
+        # plain <name>_<timestamp> copies written before the store existed
+        if not os.path.isdir(self.backup_dir):
+            return
+        entries = [e for e in os.scandir(self.backup_dir) if e.is_file() and not e.name.startswith(self.INDEX_NAME)]
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            parts = entry.name.rsplit('_', maxsplit=2)
+            if len(parts) != 3:
+                continue
+            try:
+                datetime.datetime.strptime(f'{parts[1]}_{parts[2]}', self.TIME_FORMAT)
+            except ValueError:
+                continue
+            self._add(parts[0], entry.path, f'{parts[1]}_{parts[2]}')
+            os.remove(entry.path)
+
+    def _recover_objects(self) -> None:
+        """
+        List the blobs no index entry refers to under RECOVERED_NAME, oldest first.
+
+        Without an index the file a blob belonged to is unknown. Listing them keeps them referenced, so they
+        are never pruned and stay restorable with ``read(digest)``.
+        """
+        if not os.path.isdir(self.objects_dir):
+            return
+        referenced = {v['digest'] for versions in self._index.values() for v in versions}
+        orphans = []
+        for sub_dir in os.scandir(self.objects_dir):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith('.gz') and entry.name[:-3] not in referenced:
+                    orphans.append(entry)
+        recovered = self._index.setdefault(self.RECOVERED_NAME, [])
+        for entry in sorted(orphans, key=lambda e: e.stat().st_mtime):
+            with open(entry.path, 'rb') as f:
+                # the gzip trailer holds the uncompressed size modulo 2**32
+                f.seek(-4, os.SEEK_END)
+                size = int.from_bytes(f.read(4), 'little')
+            timestamp = datetime.datetime.fromtimestamp(entry.stat().st_mtime).strftime(self.TIME_FORMAT)
+            recovered.append({'time': timestamp, 'digest': entry.name[:-3], 'size': size})
+        if not recovered:
+            del self._index[self.RECOVERED_NAME]
+
+    def _save(self) -> None:
+        os.makedirs(self.backup_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.INDEX_VERSION, 'files': self._index}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def _store_blob(self, file_path: str) -> tuple[str, int]:
+        os.makedirs(self.objects_dir, exist_ok=True)
+        file_md5 = hashlib.md5()
+        size = 0
+        tmp_path = os.path.join(self.objects_dir, f'.{os.getpid()}-{threading.get_ident()}.tmp')
+        with open(file_path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                file_md5.update(chunk)
+                size += len(chunk)
+                dst.write(chunk)
+        digest = file_md5.hexdigest()
+        object_path = self._object_path(digest)
+        if os.path.exists(object_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+        return digest, size
+
+    def _add(self, base_name: str, file_path: str, timestamp: str) -> dict | None:
+        digest, size = self._store_blob(file_path)
+        versions = self._index.setdefault(base_name, [])
+        if versions and versions[-1]['digest'] == digest:
+            return None
+        entry = {'time': timestamp, 'digest': digest, 'size': size}
+        versions.append(entry)
+        del versions[:-self.max_versions]
+        return entry
+
+    def _prune_objects(self) -> None:
+        referenced = {v['digest'] for versions in self._index.values() for v in versions}
+        if not os.path.isdir(self.objects_dir):
+            return
+        for sub_dir in os.scandir(self.objects_dir):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith('.gz') and entry.name[:-3] not in referenced:
+                    os.remove(entry.path)
+
+    def versions(self, file_path: str) -> list[dict]:
+        with self._lock:
+            return [dict(v) for v in self._load().get(os.path.basename(file_path), [])]
+
+    def backup(self, file_path: str) -> dict | None:
+        """Record the current content of ``file_path``; returns None when it matches the latest version"""
+        with self._lock:
+            base_name = os.path.basename(file_path)
+            self._load()
+            entry = self._add(base_name, file_path, datetime.datetime.now().strftime(self.TIME_FORMAT))
+            if entry is None:
+                return None
+            if len(self._index[base_name]) >= self.max_versions:
+                # the oldest version may have fallen out of the history
+                self._prune_objects()
+            self._save()
+            return entry
+
+    def find(self, file_path: str, when: datetime.datetime | str | None = None) -> dict | None:
+        """Latest version saved at or before ``when`` (default: latest version)"""
+        if isinstance(when, datetime.datetime):
+            when = when.strftime(self.TIME_FORMAT)
+        candidates = [v for v in self.versions(file_path) if when is None or v['time'] <= when]
+        return candidates[-1] if candidates else None
+
+    def read(self, digest: str) -> bytes:
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def restore(self, file_path: str, when: datetime.datetime | str | None = None,
+                target_path: str | None = None) -> dict:
+        entry = self.find(file_path, when)
+        if entry is None:
+            raise FileNotFoundError(f'No backup of {os.path.basename(file_path)} at or before {when}')
+        target_path = target_path or file_path
+        tmp_path = target_path + '.restore'
+        with gzip.open(self._object_path(entry['digest']), 'rb') as src, open(tmp_path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, target_path)
+        return entry
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='List or restore config backups')
+    parser.add_argument('action', choices=['list', 'restore'])
+    parser.add_argument('file', help='config file, e.g. config/URL_config.ini')
+    parser.add_argument('time', nargs='?', help='restore the version saved at or before YYYY-mm-dd_HH-MM-SS')
+    parser.add_argument('--backup-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             'backup_config'))
+    parser.add_argument('--output', help='write the restored file here instead of overwriting it')
+    args = parser.parse_args()
+
+    store = BackupStore(args.backup_dir)
+    if args.action == 'list':
+        for version in store.versions(args.file):
+            print(f"{version['time']}  {version['digest']}  {version['size']} bytes")
+    else:
+        restored = store.restore(args.file, args.time, args.output)
+        print(f"restored {args.output or args.file} from {restored['time']} ({restored['digest']})")
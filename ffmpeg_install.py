@@ -15,8 +15,6 @@ import sys
 import platform
 import zipfile
 from pathlib import Path
-import requests
-from tqdm import tqdm
 from streamget.logger import logger
 
 current_platform = platform.system()
@@ -37,6 +35,7 @@ def unzip_file(zip_path: str | Path, extract_to: str | Path, delete: bool = True
 
 
 def get_lanzou_download_link(url: str, password: str | None = None) -> str | None:
+    import requests
     try:
         headers = {
             'accept-language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
@@ -63,6 +62,9 @@ def get_lanzou_download_link(url: str, password: str | None = None) -> str | Non
 
 
 def install_ffmpeg_windows():
+    # only needed when ffmpeg is missing, keep them out of the startup path
+    import requests
+    from tqdm import tqdm
     try:
         logger.warning("ffmpeg is not installed.")
         logger.debug("Installing the latest version of ffmpeg for Windows...")
@@ -8,34 +8,45 @@ Update: 2025-03-18 05:40:00
 Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
 """
 import os
+import struct
 import sys
-import gettext
-import inspect
 import builtins
 from pathlib import Path
 
-
-def init_gettext(locale_dir, locale_name):
-    gettext.bindtextdomain('zh_TW', locale_dir)
-    gettext.textdomain('zh_TW')
-    os.environ['LANG'] = f'{locale_name}.utf8'
-    return gettext.gettext
-
+from streamget.messages import set_catalog, tr
 
 execute_dir = os.path.split(os.path.realpath(sys.argv[0]))[0]
 if os.path.exists(Path(execute_dir) / '_internal/i18n'):
     locale_path = Path(execute_dir) / '_internal/i18n'
 else:
     locale_path = Path(execute_dir) / 'i18n'
-_tr = init_gettext(locale_path, 'zh_TW')
 original_print = builtins.print
-package_name = 'streamget'
+
+
+def load_mo(mo_path: str | Path) -> dict[str, str]:
+    """Read a compiled gettext catalog into a plain dict; strings are always decoded as UTF-8"""
+    with open(mo_path, 'rb') as f:
+        data = f.read()
+    byte_order = '<' if struct.unpack('<I', data[:4])[0] == 0x950412de else '>'
+    _, count, ids_offset, strs_offset = struct.unpack(f'{byte_order}4I', data[4:20])
+    catalog = {}
+    for i in range(count):
+        id_length, id_offset = struct.unpack(f'{byte_order}2I', data[ids_offset + 8 * i:ids_offset + 8 * i + 8])
+        str_length, str_offset = struct.unpack(f'{byte_order}2I', data[strs_offset + 8 * i:strs_offset + 8 * i + 8])
+        message_id = data[id_offset:id_offset + id_length].decode('utf-8')
+        if message_id:
+            catalog[message_id] = data[str_offset:str_offset + str_length].decode('utf-8')
+    return catalog
+
+
+def install(locale_name: str = 'zh_TW') -> int:
+    """Load the catalog of ``locale_name`` for the call sites that translate through ``tr``"""
+    mo_path = locale_path / locale_name / 'LC_MESSAGES' / f'{locale_name}.mo'
+    catalog = load_mo(mo_path) if mo_path.exists() else {}
+    set_catalog(catalog)
+    return len(catalog)
 
 
 def translated_print(*args, **kwargs):
-    for arg in args:
-        if package_name in inspect.stack()[1].filename:
-            translated_arg = _tr(str(arg))
-        else:
-            translated_arg = str(arg)
-        original_print(translated_arg, **kwargs)
+    """Kept for scripts that still replace ``builtins.print``; every argument is looked up in the catalog"""
+    original_print(*(tr(str(arg)) for arg in args), **kwargs)
@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Go-live detection from platform websocket channels, with polling as the fallback.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import ssl
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Awaitable, Callable
+
+import httpx
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+def encode_frame(opcode: int, payload: bytes, mask: bool) -> bytes:
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack('>H', length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack('>Q', length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[bool, int, bytes]:
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('>H', await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack('>Q', await reader.readexactly(8))[0]
+    key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if key:
+        payload = bytes(b ^ key[i % 4] for i, b in enumerate(payload))
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+class WebSocket:
+    """Minimal RFC 6455 endpoint on asyncio streams; clients mask their frames, servers do not"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, is_client: bool = True):
+        self.reader = reader
+        self.writer = writer
+        self.is_client = is_client
+        self._send_lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, url: str, headers: dict | None = None, timeout: float = 10) -> 'WebSocket':
+        parts = urllib.parse.urlsplit(url)
+        secure = parts.scheme == 'wss'
+        port = parts.port or (443 if secure else 80)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None), timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = [f'GET {parts.path or "/"}{"?" + parts.query if parts.query else ""} HTTP/1.1',
+                   f'Host: {parts.hostname}:{port}', 'Upgrade: websocket', 'Connection: Upgrade',
+                   f'Sec-WebSocket-Key: {key}', 'Sec-WebSocket-Version: 13']
+        request += [f'{k}: {v}' for k, v in (headers or {}).items()]
+        writer.write(('\r\n'.join(request) + '\r\n\r\n').encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        status_line = response.split(b'\r\n', 1)[0].decode(errors='ignore')
+        if ' 101 ' not in status_line or accept.encode() not in response:
+            writer.close()
+            raise ConnectionError(f'websocket handshake refused: {status_line}')
+        return cls(reader, writer)
+
+    @classmethod
+    async def accept(cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> 'WebSocket':
+        request = await reader.readuntil(b'\r\n\r\n')
+        key = re.search(rb'Sec-WebSocket-Key:\s*(\S+)', request, re.I).group(1).decode()
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+        await writer.drain()
+        return cls(reader, writer, is_client=False)
+
+    async def send(self, data: bytes | str) -> None:
+        opcode = OP_TEXT if isinstance(data, str) else OP_BINARY
+        await self._send_frame(opcode, data.encode() if isinstance(data, str) else data)
+
+    async def _send_frame(self, opcode: int, payload: bytes) -> None:
+        async with self._send_lock:
+            self.writer.write(encode_frame(opcode, payload, self.is_client))
+            await self.writer.drain()
+
+    async def recv(self) -> bytes | str:
+        message, message_opcode = b'', None
+        while True:
+            fin, opcode, payload = await read_frame(self.reader)
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                raise ConnectionError('websocket closed by peer')
+            if opcode != OP_CONTINUATION:
+                message_opcode = opcode
+            message += payload
+            if fin:
+                return message.decode() if message_opcode == OP_TEXT else message
+
+    async def close(self) -> None:
+        try:
+            await self._send_frame(OP_CLOSE, b'')
+        except (OSError, RuntimeError):
+            pass
+        self.writer.close()
+
+
+# Bilibili live room channel: 16-byte header (length, header length, protocol version, operation, sequence)
+BILI_HEADER = struct.Struct('>IHHII')
+BILI_OP_HEARTBEAT, BILI_OP_MESSAGE, BILI_OP_AUTH, BILI_OP_AUTH_REPLY = 2, 5, 7, 8
+
+
+def bili_packet(operation: int, body: bytes = b'', version: int = 1) -> bytes:
+    return BILI_HEADER.pack(BILI_HEADER.size + len(body), BILI_HEADER.size, version, operation, 1) + body
+
+
+def bili_messages(data: bytes) -> list[dict]:
+    """JSON messages in one websocket frame; zlib-compressed (version 2) bundles are unpacked"""
+    messages = []
+    offset = 0
+    while offset + BILI_HEADER.size <= len(data):
+        length, header_length, version, operation, _ = BILI_HEADER.unpack_from(data, offset)
+        body = data[offset + header_length:offset + length]
+        if operation == BILI_OP_MESSAGE:
+            if version == 2:
+                messages += bili_messages(zlib.decompress(body))
+            elif version == 0:
+                try:
+                    messages.append(json.loads(body))
+                except ValueError:
+                    pass
+        offset += max(length, BILI_HEADER.size)
+    return messages
+
+
+class BilibiliChannel:
+    """
+    Bilibili's danmaku websocket; the server sends ``{"cmd": "LIVE"}`` when the room starts broadcasting.
+
+    ``endpoint`` skips the room lookup and connects there directly, e.g. to a local stand-in.
+    """
+
+    name = 'bilibili'
+    room_api = 'https://api.live.bilibili.com/room/v1/Room/room_init?id={room}'
+    info_api = 'https://api.live.bilibili.com/xlive/web-room/v1/index/getDanmuInfo?id={room}&type=0'
+    heartbeat_seconds = 30
+
+    def __init__(self, endpoint: str | None = None, proxy: str | None = None):
+        self.endpoint = endpoint
+        self.proxy = proxy
+
+    @staticmethod
+    def match(url: str) -> str | None:
+        found = re.search(r'live\.bilibili\.com/(?:h5/)?(\d+)', url)
+        return found.group(1) if found else None
+
+    async def _resolve(self, room: str) -> tuple[int, str, str]:
+        if self.endpoint:
+            return int(room), '', self.endpoint
+        async with httpx.AsyncClient(proxy=self.proxy, timeout=10) as client:
+            room_id = (await client.get(self.room_api.format(room=room))).json()['data']['room_id']
+            data = (await client.get(self.info_api.format(room=room_id))).json()['data']
+        host = data['host_list'][0]
+        return room_id, data.get('token', ''), f"wss://{host['host']}:{host['wss_port']}/sub"
+
+    async def run(self, url: str, emit: Callable[[str, str], Awaitable[None]],
+                  on_connected: Callable[[], None]) -> None:
+        room_id, token, endpoint = await self._resolve(self.match(url))
+        ws = await WebSocket.connect(endpoint)
+        try:
+            auth = {'uid': 0, 'roomid': room_id, 'protover': 2, 'platform': 'web', 'type': 2, 'key': token}
+            await ws.send(bili_packet(BILI_OP_AUTH, json.dumps(auth).encode()))
+            on_connected()
+            heartbeat = asyncio.create_task(self._heartbeat(ws))
+            try:
+                while True:
+                    data = await ws.recv()
+                    for message in bili_messages(data if isinstance(data, bytes) else data.encode()):
+                        cmd = str(message.get('cmd', '')).split(':', 1)[0]
+                        if cmd == 'LIVE':
+                            await emit(url, 'live')
+                        elif cmd == 'PREPARING':
+                            await emit(url, 'offline')
+            finally:
+                heartbeat.cancel()
+        finally:
+            await ws.close()
+
+    async def _heartbeat(self, ws: WebSocket) -> None:
+        while True:
+            await ws.send(bili_packet(BILI_OP_HEARTBEAT, b'[object Object]'))
+            await asyncio.sleep(self.heartbeat_seconds)
+
+
+class PushWatcher:
+    """
+    Keep one websocket per monitored room on the platforms that push go-live events, all on a single asyncio
+    loop thread, and wake the room's polling thread as soon as an event arrives.
+
+    New connections are opened at most ``connect_concurrency`` at a time and capped at ``max_connections``.
+    Events pass through a bounded queue; a room that already has an unread event is not queued again and
+    events beyond the queue size are dropped, polling still covers those rooms. Lost connections are
+    retried with exponential backoff up to ``max_backoff`` seconds.
+    """
+
+    def __init__(self, channels: list | None = None, max_connections: int = 500, connect_concurrency: int = 5,
+                 queue_size: int = 256, max_backoff: float = 300):
+        self.channels = channels if channels is not None else [BilibiliChannel()]
+        self.max_connections = max_connections
+        self.connect_concurrency = connect_concurrency
+        self.queue_size = queue_size
+        self.max_backoff = max_backoff
+        self.events_received = 0
+        self.events_dropped = 0
+        self._signals: dict[str, threading.Event] = {}
+        self._connected: set[str] = set()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._ready = threading.Event()
+        self._queue: asyncio.Queue | None = None
+        self._connect_gate: asyncio.Semaphore | None = None
+
+    def channel_for(self, url: str):
+        for channel in self.channels:
+            if channel.match(url):
+                return channel
+        return None
+
+    def start(self) -> None:
+        if self._loop is None:
+            threading.Thread(target=self._run_loop, name='live-push', daemon=True).start()
+            self._ready.wait()
+
+    def _run_loop(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._connect_gate = asyncio.Semaphore(self.connect_concurrency)
+        self._loop.create_task(self._dispatch())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def set_rooms(self, urls) -> None:
+        """Subscribe to the supported rooms among ``urls`` and drop the subscriptions of the others"""
+        wanted = [url for url in dict.fromkeys(urls) if self.channel_for(url)][:self.max_connections]
+        for url in wanted:
+            self._signals.setdefault(url, threading.Event())
+        self._loop.call_soon_threadsafe(self._apply_rooms, set(wanted))
+
+    def _apply_rooms(self, wanted: set[str]) -> None:
+        for url in set(self._tasks) - wanted:
+            self._tasks.pop(url).cancel()
+            self._connected.discard(url)
+        for url in wanted - set(self._tasks):
+            self._tasks[url] = self._loop.create_task(self._subscribe(url))
+
+    async def _emit(self, url: str, event: str) -> None:
+        self.events_received += 1
+        if event != 'live' or self._signals[url].is_set():
+            return
+        try:
+            self._queue.put_nowait(url)
+        except asyncio.QueueFull:
+            self.events_dropped += 1
+
+    async def _dispatch(self) -> None:
+        while True:
+            url = await self._queue.get()
+            signal = self._signals.get(url)
+            if signal is not None:
+                signal.set()
+
+    async def _subscribe(self, url: str) -> None:
+        channel = self.channel_for(url)
+        backoff = 1.0
+        while True:
+            started = time.monotonic()
+            connected = asyncio.Event()
+
+            def on_connected():
+                self._connected.add(url)
+                connected.set()
+
+            task = asyncio.ensure_future(channel.run(url, self._emit, on_connected))
+            try:
+                # the gate only limits handshakes, a subscription releases it once connected
+                async with self._connect_gate:
+                    waiter = asyncio.ensure_future(connected.wait())
+                    await asyncio.wait([task, waiter], return_when=asyncio.FIRST_COMPLETED)
+                    waiter.cancel()
+                await task
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            except Exception:
+                pass
+            self._connected.discard(url)
+            backoff = 1.0 if time.monotonic() - started > 60 else min(backoff * 2, self.max_backoff)
+            await asyncio.sleep(backoff)
+
+    def connected(self, url: str) -> bool:
+        return url in self._connected
+
+    def wait(self, url: str, timeout: float) -> bool:
+        """Sleep up to ``timeout`` seconds; True as soon as a go-live event for ``url`` arrived"""
+        signal = self._signals.get(url)
+        if signal is None:
+            time.sleep(timeout)
+            return False
+        if signal.wait(timeout):
+            signal.clear()
+            return True
+        return False
+
+
+async def serve_standin(host: str = '127.0.0.1', port: int = 8765, live_every: float = 10) -> None:
+    """Local stand-in for the Bilibili channel: acknowledges auth and heartbeats, sends LIVE periodically"""
+
+    async def announce(ws):
+        while True:
+            await asyncio.sleep(live_every)
+            body = zlib.compress(bili_packet(BILI_OP_MESSAGE, json.dumps({'cmd': 'LIVE'}).encode(), 0))
+            await ws.send(bili_packet(BILI_OP_MESSAGE, body, 2))
+
+    async def handle(reader, writer):
+        ws = await WebSocket.accept(reader, writer)
+        announcer = asyncio.create_task(announce(ws))
+        try:
+            while True:
+                data = await ws.recv()
+                operation = BILI_HEADER.unpack_from(data)[3]
+                if operation == BILI_OP_AUTH:
+                    await ws.send(bili_packet(BILI_OP_AUTH_REPLY, b'{"code":0}'))
+                elif operation == BILI_OP_HEARTBEAT:
+                    await ws.send(bili_packet(3, struct.pack('>I', 1)))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+        finally:
+            announcer.cancel()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Websocket go-live detection')
+    sub = parser.add_subparsers(dest='command', required=True)
+    standin = sub.add_parser('standin', help='run a local stand-in of the Bilibili channel')
+    standin.add_argument('--port', type=int, default=8765)
+    standin.add_argument('--live-every', type=float, default=10)
+    watch = sub.add_parser('watch', help='print go-live events of rooms')
+    watch.add_argument('urls', nargs='+')
+    watch.add_argument('--endpoint', help='connect here instead of the platform, e.g. ws://127.0.0.1:8765/sub')
+    args = parser.parse_args()
+
+    if args.command == 'standin':
+        asyncio.run(serve_standin(port=args.port, live_every=args.live_every))
+        return
+    watcher = PushWatcher([BilibiliChannel(endpoint=args.endpoint)])
+    watcher.start()
+    watcher.set_rooms(args.urls)
+    while True:
+        for url in args.urls:
+            if watcher.wait(url, 1 / len(args.urls)):
+                print(f'{time.strftime("%H:%M:%S")} 開播: {url}')
+
+
+if __name__ == '__main__':
+    main()
@@ -27,16 +27,15 @@ v4.1.0 更新內容:
 
 # ==================== 標準庫導入 ====================
 import asyncio
+import atexit
 import os
 import sys
-import builtins
 import subprocess
 import signal
 import threading
 import time
 import datetime
 import re
-import shutil
 import random
 import uuid
 from pathlib import Path
@@ -47,13 +46,31 @@ from typing import Any
 import configparser
 
 # ==================== 第三方庫導入 ====================
-from streamget import spider, stream
-from streamget.proxy import ProxyDetector
+from streamget import spider, stream, node_check
+from streamget.playlist import SelectionPolicy
+from streamget.url_cache import StreamUrlCache, is_url_rejected
+from streamget.dns_cache import pin_ffmpeg_input
+from streamget.proxy import ProxyDetector, proxy_pool
+from streamget.tool_versions import tool_versions
 from streamget.utils import logger
 from streamget import utils
 from msg_push import (
-    dingtalk, xizhi, tg_bot, send_email, bark, ntfy
+    SmtpSession, dingtalk_async, xizhi_async, tg_bot_async, bark_async, ntfy_async
 )
+from msg_dispatcher import PushCoalescer, PushDispatcher
+from timecode import SubtitleService
+from config_backup import BackupStore, ChangeDetector
+from url_catalog import UrlCatalog, parse_line
+from room_db import RoomCatalog, parse_room_line
+import supervisor
+from cluster import ClusterNode, LeaseStore, default_node_id
+from storage import StorageRouter, count_segments
+from retention import RetentionEngine, exclusive_lock, parse_policies
+from stall_watch import OutputWatch, StallMetrics, output_bytes, parse_thresholds, threshold_for
+from recovery import RecoverySchedule
+from stitcher import BroadcastStitcher, pending_fragments
+from live_push import PushWatcher
+from startup import StartupTasks
 from ffmpeg_install import (
     check_ffmpeg, ffmpeg_path, current_env_path
 )
@@ -80,12 +97,23 @@ error_threshold = 5                         # 錯誤閾值
 
 # 監控狀態管理
 monitoring = 0                              # 監控中的直播間數量
-running_list = []                           # 正在運行的URL列表
+running_list = set()                        # 正在運行的URL集合
 url_tuples_list = []                        # URL元組列表
-url_comments = []                           # 被註釋的URL列表
+url_comments = set()                        # 被註釋的URL集合
+stream_url_cache = StreamUrlCache()         # 已解析直播源地址快取
+push_dispatcher = PushDispatcher()          # 直播狀態推送佇列
+push_coalescer = PushCoalescer(lambda *args: send_push(*args))  # 推送合併與開關播防抖
+smtp_sessions = {}                          # 依郵箱配置保持的SMTP連線
 text_no_repeat_url = []                     # 去重後的URL列表
 need_update_line_list = []                  # 需要更新的行列表
-not_record_list = []                        # 不錄製的URL列表
+not_record_list = set()                     # 不錄製的URL集合
+room_catalog = None                         # 房間資料庫(未啟用時使用URL_config.ini)
+url_catalog = None                          # 上次解析的URL配置檔案快照
+room_revision = 0                           # 已同步的房間資料庫版本
+cluster_node = None                         # 叢集模式的租約節點
+recording_urls = set()                      # 正在錄製的直播間URL集合
+empty_runs = set()                          # 上次錄製未寫入任何資料的直播間URL集合
+push_watcher = None                         # 開播推送偵測(未啟用時只靠輪詢)
 
 # 程式狀態標誌
 create_var = locals()                       # 動態變數容器
@@ -97,9 +125,25 @@ start_display_time = datetime.datetime.now()  # 顯示開始時間
 # ==================== 路徑與配置 ====================
 script_path = os.path.split(os.path.realpath(sys.argv[0]))[0]  # 腳本路徑
 config_file = f'{script_path}/config/config.ini'               # 配置檔案路徑
-url_config_file = f'{script_path}/config/URL_config.ini'       # URL配置檔案路徑
+worker_shard = supervisor.worker_shard()                       # 由supervisor.py啟動時的分片(編號, 總數)
+url_config_file = (os.environ.get(supervisor.URL_CONFIG_ENV)
+                   or f'{script_path}/config/URL_config.ini')   # URL配置檔案路徑(工作行程為所屬分片的快照)
+shard_ring = supervisor.HashRing([str(i) for i in range(worker_shard[1])]) if worker_shard else None
 backup_dir = f'{script_path}/backup_config'                    # 備份目錄路徑
+backup_store = BackupStore(backup_dir)                          # 配置備份索引
+storage_router = StorageRouter(ledger_path=f'{script_path}/logs/storage_ledger.jsonl')  # 多儲存路徑分配與落地紀錄
+# 同一目錄下的所有分片工作行程與叢集節點共用錄製紀錄，只由取得鎖的行程執行保留策略
+retention_lock = exclusive_lock(f'{script_path}/logs/retention.lock')
+retention_engine = RetentionEngine(
+    storage_router.ledger_path, f'{script_path}/logs/retention_state.json', storage_router.is_active,
+    lambda: pending_fragments(f'{script_path}/logs')) if retention_lock else None  # 依保留策略清理舊錄製
+stall_metrics = StallMetrics(f'{script_path}/logs/stall_events.jsonl')  # 錄製輸出停滯統計
+shard_suffix = f'-{worker_shard[0]}' if worker_shard else ''  # 分片工作行程各自的狀態檔後綴
+broadcast_stitcher = BroadcastStitcher(f'{script_path}/logs/stitch_journal{shard_suffix}.json',
+                                       lambda *args: finish_recording(*args))  # 斷線片段合併(每個分片各自的日誌)
+startup_tasks = StartupTasks()               # 啟動檢查並行執行與耗時統計
 text_encoding = 'utf-8-sig'
+subtitle_service = SubtitleService(text_encoding)  # 所有錄製共用的時間字幕寫入服務
 rstr = r"[\/\\\:\*\？?\"\<\>\|&#.。,， ~！· ]"
 default_path = f'{script_path}/downloads'
 os.makedirs(default_path, exist_ok=True)
@@ -122,7 +166,18 @@ def signal_handler(_signal, _frame):
     sys.exit(0)
 
 
+def leave_cluster() -> None:
+    # 租約在程式結束時釋放而不在信號處理函數中進行:
+    # 信號到達時主執行緒可能正持有租約鎖, 在處理函數中再取鎖會死結
+    if cluster_node is not None:
+        try:
+            cluster_node.leave()
+        except Exception as e:
+            logger.error(f"釋放叢集租約失敗: {e}")
+
+
 signal.signal(signal.SIGTERM, signal_handler)
+atexit.register(leave_cluster)
 
 
 # ==================== 檔案命名相關函數 ====================
@@ -268,6 +323,18 @@ def display_info() -> None:
         try:
             time.sleep(5)
 
+            # 分片工作行程不直接輸出，將狀態回報給supervisor彙總顯示
+            if worker_shard is not None:
+                supervisor.write_status(os.environ[supervisor.STATUS_FILE_ENV], {
+                    'shard': worker_shard[0],
+                    'monitoring': monitoring,
+                    'error_count': error_count,
+                    'stalls': stall_metrics.total,
+                    'recording': {name: [rt.isoformat(), qa] for name, (rt, qa) in
+                                  list(recording_time_list.items()) if name in recording},
+                })
+                continue
+
             # 如果不是後台運行模式，清屏顯示最新資訊
             if Path(sys.executable).name != 'pythonw.exe':
                 os.system(clear_command)
@@ -291,6 +358,8 @@ def display_info() -> None:
             print(f"錄製視訊質量為: {video_record_quality}", end=" | ")
             print(f"錄製視訊格式為: {video_save_type}", end=" | ")
             print(f"目前瞬時錯誤數為: {error_count}", end=" | ")
+            if stall_metrics.total:
+                print(f"輸出停滯重啟次數: {stall_metrics.total}", end=" | ")
 
             # 顯示當前時間
             now = time.strftime("%H:%M:%S", time.localtime())
@@ -349,6 +418,7 @@ def update_file(file_path: str, old_str: str, new_str: str, start_str: str = Non
     # 使用檔案鎖確保操作的原子性
     with file_update_lock:
         file_data = []
+        seen_lines = set()
 
         # 讀取檔案內容並進行替換
         with open(file_path, "r", encoding=text_encoding) as f:
@@ -362,7 +432,8 @@ def update_file(file_path: str, old_str: str, new_str: str, start_str: str = Non
                             text_line = f'{start_str}{text_line}'
 
                     # 避免重複行
-                    if text_line not in file_data:
+                    if text_line not in seen_lines:
+                        seen_lines.add(text_line)
                         file_data.append(text_line)
 
             except RuntimeError as e:
@@ -413,6 +484,59 @@ def delete_line(file_path: str, del_line: str, delete_all: bool = False) -> None
                 f.write(txt_line)
 
 
+def open_room_catalog(db_path: str) -> RoomCatalog:
+    """
+    開啟房間資料庫，資料庫為空時從URL_config.ini匯入
+
+    參數:
+    db_path (str): 資料庫路徑
+    """
+    catalog = RoomCatalog(db_path)
+    if not len(catalog) and os.path.isfile(url_config_file):
+        default_quality = read_config_value(config, '錄製設定', '原畫|超清|高清|標清|流暢', "原畫")
+        count = catalog.import_ini(url_config_file, text_encoding, default_quality)
+        print(f"已從URL_config.ini匯入{count}個直播間到房間資料庫: {db_path}")
+    return catalog
+
+
+def is_supported_url(url: str) -> bool:
+    """
+    判斷直播間地址是否屬於支援的平台，或為直接的flv/m3u8直播源
+
+    參數:
+    url (str): 直播間地址
+    """
+    url = 'https://' + url if '://' not in url else url
+    url_host = url.split('/')[2]
+    if 'live.shopee.' in url_host or '.shp.ee' in url_host:
+        url_host = 'live.shopee.' if 'live.shopee.' in url_host else '.shp.ee'
+    return url_host in platform_host or any(ext in url for ext in (".flv", ".m3u8"))
+
+
+def sync_room_catalog() -> None:
+    """
+    只讀取上次同步之後在房間資料庫中變更的直播間
+
+    暫停或刪除的直播間加入註釋集合，讓對應的錄製執行緒退出；其餘的加入待啟動列表
+    """
+    global room_revision, url_comments
+    if room_revision == 0:
+        url_comments = set()
+    room_revision, rooms = room_catalog.changes(room_revision)
+    for room in rooms:
+        if shard_ring and shard_ring.owner(room.url) != str(worker_shard[0]):
+            continue
+        if room.paused or room.deleted:
+            url_comments.add(room.url)
+        elif not is_supported_url(room.url):
+            # 與URL_config.ini中的未知鏈接相同處理：暫停該直播間，使用者修正後取消暫停即可
+            color_obj.print_colored(f"\r{room.url} 房間資料庫中包含未知鏈接.已暫停此直播間", color_obj.YELLOW)
+            room_catalog.set_paused(room.url)
+        else:
+            url_comments.discard(room.url)
+            url_tuples_list.append((room.quality, room.url, f'主播: {room.name}' if room.name else ''))
+
+
 # ==================== 系統相關函數 ====================
 def get_startup_info(system_type: str):
     """
@@ -755,28 +879,15 @@ def converts_m4a(converts_file_path: str, is_original_delete: bool = True) -> No
 
 
 def generate_subtitles(record_name: str, ass_filename: str, sub_format: str = 'srt') -> None:
-    index_time = 0
-    today = datetime.datetime.now()
-    re_datatime = today.strftime('%Y-%m-%d %H:%M:%S')
-
-    def transform_int_to_time(seconds: int) -> str:
-        m, s = divmod(seconds, 60)
-        h, m = divmod(m, 60)
-        return f"{h:02d}:{m:02d}:{s:02d}"
-
-    while True:
-        index_time += 1
-        txt = str(index_time) + "\n" + transform_int_to_time(index_time) + ',000 --> ' + transform_int_to_time(
-            index_time + 1) + ',000' + "\n" + str(re_datatime) + "\n\n"
-
-        with open(f"{ass_filename}.{sub_format.lower()}", 'a', encoding=text_encoding) as f:
-            f.write(txt)
+    """
+    為錄製中的檔案產生時間字幕
 
-        if record_name not in recording:
-            return
-        time.sleep(1)
-        today = datetime.datetime.now()
-        re_datatime = today.strftime('%Y-%m-%d %H:%M:%S')
+    所有錄製共用同一個計時執行緒，字幕經緩衝寫入並定期落盤；
+    開啟「錄製結束後產生」時錄製期間不寫檔，結束後依開始時間與時長一次產生
+    """
+    subtitle_service.add(
+        f"{ass_filename}.{sub_format.lower()}", lambda: record_name in recording, live=not defer_time_file
+    )
 
 
 
@@ -838,7 +949,23 @@ def adjust_max_request() -> None:
 
 
 # ==================== 推送通知相關函數 ====================
-def push_message(record_name: str, live_url: str, content: str) -> None:
+def push_message(record_name: str, live_url: str, content: str, is_live: bool = True) -> None:
+    """
+    提交直播狀態推送
+
+    設定了推送合併時間時，時間窗口內的推送會合併成一則摘要發送，
+    窗口內開播又關播(或關播又開播)的直播間不重複推送
+
+    參數:
+    record_name (str): 錄製名稱（主播名稱）
+    live_url (str): 直播間URL
+    content (str): 推送內容
+    is_live (bool): 推送的是開播(True)還是關播(False)
+    """
+    push_coalescer.add(record_name, live_url, content, is_live)
+
+
+def send_push(record_name: str, live_url: str, content: str) -> None:
     """
     發送直播狀態推送通知到各個平台
 
@@ -851,43 +978,44 @@ def push_message(record_name: str, live_url: str, content: str) -> None:
     content (str): 推送內容
 
     功能:
-    - 支援多平台同時推送
-    - 自動錯誤處理和重試
-    - 詳細的推送結果統計
-    - 靈活的推送內容自定義
+    - 推送交由背景事件循環處理，呼叫後立即返回
+    - 各平台併發推送，每個平台共用連線池
+    - 郵箱保持登入連線，斷線後自動重連
+    - 失敗時按指數退避自動重試，釘釘、TG按平台頻率限制發送
     """
     # 設定推送標題，使用自定義標題或預設標題
     msg_title = push_message_title.strip() or "直播間狀態更新通知"
 
-    # 定義各平台的推送函數
+    # 定義各平台的推送函數，參數client為該平台共用的HTTP連線池
     push_functions = {
-        '微信': lambda: xizhi(xizhi_api_url, msg_title, content),
-        '釘釘': lambda: dingtalk(dingtalk_api_url, content, dingtalk_phone_num, dingtalk_is_atall),
-        '郵箱': lambda: send_email(
-            email_host, login_email, email_password, sender_email, sender_name,
-            to_email, msg_title, content, smtp_port, open_smtp_ssl
+        '微信': lambda client: xizhi_async(client, xizhi_api_url, msg_title, content),
+        '釘釘': lambda client: dingtalk_async(client, dingtalk_api_url, content, dingtalk_phone_num, dingtalk_is_atall),
+        '郵箱': lambda client: asyncio.to_thread(
+            get_smtp_session().send, sender_email, sender_name, to_email, msg_title, content
         ),
-        'TG': lambda: tg_bot(tg_chat_id, tg_token, content),
-        'BARK': lambda: bark(
-            bark_msg_api, title=msg_title, content=content, level=bark_msg_level, sound=bark_msg_ring
+        'TG': lambda client: tg_bot_async(client, tg_chat_id, tg_token, content),
+        'BARK': lambda client: bark_async(
+            client, bark_msg_api, title=msg_title, content=content, level=bark_msg_level, sound=bark_msg_ring
         ),
-        'NTFY': lambda: ntfy(
-            ntfy_api, title=msg_title, content=content, tags=ntfy_tags, action_url=live_url, email=ntfy_email
+        'NTFY': lambda client: ntfy_async(
+            client, ntfy_api, title=msg_title, content=content, tags=ntfy_tags, action_url=live_url, email=ntfy_email
         ),
     }
 
-    # 遍歷所有推送平台，根據配置進行推送
-    for platform, func in push_functions.items():
-        if platform in live_status_push.upper():
-            try:
-                # 執行推送
-                result = func()
-                # 顯示推送結果統計
-                print(f'提示資訊：已經將[{record_name}]直播狀態訊息推送至你的{platform},'
-                      f' 成功{len(result["success"])}, 失敗{len(result["error"])}')
-            except Exception as e:
-                # 推送失敗時的錯誤處理
-                color_obj.print_colored(f"直播訊息推送到{platform}失敗: {e}", color_obj.RED)
+    # 只推送已在配置中啟用的平台
+    senders = {platform: func for platform, func in push_functions.items() if platform in live_status_push.upper()}
+    push_dispatcher.submit(record_name, senders)
+
+
+def get_smtp_session() -> SmtpSession:
+    """依目前郵箱配置取得SMTP連線，配置變更後自動建立新連線"""
+    key = (email_host, login_email, email_password, smtp_port, open_smtp_ssl)
+    if key not in smtp_sessions:
+        for session in smtp_sessions.values():
+            session.close()
+        smtp_sessions.clear()
+        smtp_sessions[key] = SmtpSession(*key)
+    return smtp_sessions[key]
 
 
 def run_script(command: str) -> None:
@@ -910,6 +1038,11 @@ def run_script(command: str) -> None:
         logger.error('Please add `#!/bin/bash` at the beginning of your bash script file.')
 
 
+def room_released(record_url: str) -> bool:
+    """直播間已被註釋，或在叢集模式下已交由其他節點錄製"""
+    return record_url in url_comments or (cluster_node is not None and record_url in cluster_node.lost)
+
+
 def clear_record_info(record_name: str, record_url: str) -> None:
     """
     清理錄製資訊，從各個列表中移除指定的錄製項目
@@ -931,14 +1064,76 @@ def clear_record_info(record_name: str, record_url: str) -> None:
 
     # 從正在錄製的集合中移除
     recording.discard(record_name)
+    recording_urls.discard(record_url)
 
     # 如果URL在註釋列表和運行列表中，進行清理
-    if record_url in url_comments and record_url in running_list:
+    if room_released(record_url) and record_url in running_list:
         running_list.remove(record_url)
         monitoring -= 1
         color_obj.print_colored(f"[{record_name}]已經從錄製列表中移除\n", color_obj.YELLOW)
 
 
+def stop_ffmpeg(process: subprocess.Popen, timeout: float = 15) -> None:
+    """讓ffmpeg正常結束以寫完檔案尾, 超時仍未退出時強制結束"""
+    try:
+        if os.name == 'nt':
+            if process.stdin:
+                process.stdin.write('q')
+                process.stdin.close()
+        else:
+            process.send_signal(signal.SIGINT)
+        process.wait(timeout=timeout)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        process.kill()
+        process.wait()
+
+
+def finish_recording(save_file_path: str, save_type: str, record_name: str, script_command: str | None = None) -> None:
+    """錄製完成後的轉檔與自定義指令碼, 斷線片段合併後對整場直播只執行一次"""
+    if converts_to_mp4 and save_type == 'TS':
+        if split_video_by_time:
+            file_paths = utils.get_file_paths(os.path.dirname(save_file_path))
+            prefix = os.path.basename(save_file_path).rsplit('_', maxsplit=1)[0]
+            for path in file_paths:
+                if prefix in path:
+                    threading.Thread(target=converts_mp4, args=(path, delete_origin_file)).start()
+        else:
+            threading.Thread(target=converts_mp4, args=(save_file_path, delete_origin_file)).start()
+    elif save_type == 'MP4':
+        # 直接錄製的MP4檔案需要優化以確保快速開啟
+        if split_video_by_time:
+            # 分段錄製的MP4檔案，需要優化所有分段檔案
+            file_paths = utils.get_file_paths(os.path.dirname(save_file_path))
+            prefix = os.path.basename(save_file_path).rsplit('-%d', maxsplit=1)[0] if '-%d' in save_file_path else os.path.basename(save_file_path).rsplit('.', maxsplit=1)[0]
+            for path in file_paths:
+                if prefix in path and path.endswith('.mp4'):
+                    threading.Thread(target=optimize_mp4, args=(path,)).start()
+        else:
+            threading.Thread(target=optimize_mp4, args=(save_file_path,)).start()
+
+    if script_command:
+        logger.debug("開始執行指令碼命令!")
+        if "python" in script_command:
+            params = [
+                f'--record_name "{record_name}"',
+                f'--save_file_path "{save_file_path}"',
+                f'--save_type {save_type}'
+                f'--split_video_by_time {split_video_by_time}',
+                f'--converts_to_mp4 {converts_to_mp4}',
+            ]
+        else:
+            params = [
+                f'"{record_name.split(" ", maxsplit=1)[-1]}"',
+                f'"{save_file_path}"',
+                save_type,
+                f'split_video_by_time:{split_video_by_time}',
+                f'converts_to_mp4:{converts_to_mp4}'
+            ]
+        script_command = script_command.strip() + ' ' + ' '.join(params)
+        run_script(script_command)
+        logger.debug("指令碼命令執行結束!")
+
+
 def check_subprocess(record_name: str, record_url: str, ffmpeg_command: list, save_type: str,
                      script_command: str | None = None, platform: str = "", proxy_address: str = None) -> bool:
     save_file_path = ffmpeg_command[-1]
@@ -949,16 +1144,41 @@ def check_subprocess(record_name: str, record_url: str, ffmpeg_command: list, sa
     )
 
     subs_file_path = save_file_path.rsplit('.', maxsplit=1)[0]
-    subs_thread_name = f'subs_{Path(subs_file_path).name}'
     if create_time_file and not split_video_by_time and '音訊' not in save_type:
-        create_var[subs_thread_name] = threading.Thread(
-            target=generate_subtitles, args=(record_name, subs_file_path)
-        )
-        create_var[subs_thread_name].daemon = True
-        create_var[subs_thread_name].start()
-
+        generate_subtitles(record_name, subs_file_path)
+
+    storage_router.open(record_name.split(' ', maxsplit=1)[-1], save_file_path, platform)
+    broadcast_stitcher.open(record_url)
+    record_started = time.time()
+    storage_checked = time.monotonic()
+    move_after_segment = None
+    storage_moved = False
+    output_watch = OutputWatch(save_file_path, threshold_for(stall_thresholds, platform))
+    stalled = False
     while process.poll() is None:
-        if record_url in url_comments or exit_recording:
+        # ffmpeg仍在執行但輸出不再增長時, 結束本次錄製並重新解析直播源, 重新開始時寫入新的檔案
+        if output_watch.stalled():
+            idle_seconds = output_watch.idle_seconds()
+            stall_metrics.record(platform, record_name, idle_seconds, output_watch.bytes)
+            logger.warning(f"[{record_name}]錄製輸出已停滯{idle_seconds:.0f}秒, 重新連線錄製")
+            stream_url_cache.invalidate(record_url)
+            stop_ffmpeg(process)
+            stalled = True
+            break
+
+        # 儲存路徑空間不足且有其他可用路徑時，在分段邊界結束本次錄製，重新開始時會換到其他路徑
+        if time.monotonic() - storage_checked >= 10:
+            storage_checked = time.monotonic()
+            if move_after_segment is None and storage_router.should_move(save_file_path):
+                move_after_segment = count_segments(save_file_path) if '%' in save_file_path else -1
+                color_obj.print_colored(f"[{record_name}]儲存路徑空間不足, 將切換到其他儲存路徑", color_obj.YELLOW)
+        if move_after_segment is not None and (move_after_segment < 0 or
+                                               count_segments(save_file_path) > move_after_segment):
+            stop_ffmpeg(process)
+            storage_moved = True
+            break
+
+        if room_released(record_url) or exit_recording:
             color_obj.print_colored(f"[{record_name}]錄製時已被註釋,本條執行緒將會退出", color_obj.YELLOW)
             clear_record_info(record_name, record_url)
             # process.terminate()
@@ -969,6 +1189,10 @@ def check_subprocess(record_name: str, record_url: str, ffmpeg_command: list, sa
             else:
                 process.send_signal(signal.SIGINT)
             process.wait()
+            storage_router.close(save_file_path)
+            if not split_video_by_time and os.path.exists(save_file_path) and os.path.getsize(save_file_path) > 0:
+                broadcast_stitcher.finish(record_url, save_file_path, record_started, time.time(), save_type,
+                                          record_name, script_command)
             return True  # 只有被手動註釋時才真正退出執行緒
             
         # 簡化的封包監控（預設啟用，不記錄）
@@ -984,62 +1208,49 @@ def check_subprocess(record_name: str, record_url: str, ffmpeg_command: list, sa
                             # 靜默監控損壞封包，不輸出任何記錄
                             if error_line and 'corrupt' in error_line.lower():
                                 pass  # 檢測到損壞封包，但不記錄
+                            # 直播源地址被拒絕(403/404)時, 快取的地址不再可用
+                            if error_line and is_url_rejected(error_line):
+                                stream_url_cache.invalidate(record_url)
             except Exception as e:
                 pass  # 靜默處理監控錯誤
         
         time.sleep(1)
 
+    storage_router.close(save_file_path)
     return_code = process.returncode
     stop_time = time.strftime('%Y-%m-%d %H:%M:%S')
-    if return_code == 0:
-        if converts_to_mp4 and save_type == 'TS':
-            if split_video_by_time:
-                file_paths = utils.get_file_paths(os.path.dirname(save_file_path))
-                prefix = os.path.basename(save_file_path).rsplit('_', maxsplit=1)[0]
-                for path in file_paths:
-                    if prefix in path:
-                        threading.Thread(target=converts_mp4, args=(path, delete_origin_file)).start()
-            else:
-                threading.Thread(target=converts_mp4, args=(save_file_path, delete_origin_file)).start()
-        elif save_type == 'MP4':
-            # 直接錄製的MP4檔案需要優化以確保快速開啟
-            if split_video_by_time:
-                # 分段錄製的MP4檔案，需要優化所有分段檔案
-                file_paths = utils.get_file_paths(os.path.dirname(save_file_path))
-                prefix = os.path.basename(save_file_path).rsplit('-%d', maxsplit=1)[0] if '-%d' in save_file_path else os.path.basename(save_file_path).rsplit('.', maxsplit=1)[0]
-                for path in file_paths:
-                    if prefix in path and path.endswith('.mp4'):
-                        threading.Thread(target=optimize_mp4, args=(path,)).start()
-            else:
-                threading.Thread(target=optimize_mp4, args=(save_file_path,)).start()
+    try:
+        if process.stderr and is_url_rejected(process.stderr.read()):
+            stream_url_cache.invalidate(record_url)
+    except (OSError, ValueError):
+        pass
+    recorded = os.path.exists(save_file_path) and os.path.getsize(save_file_path) > 0
+    # 沒有寫入任何資料的錄製(直播已結束或地址已失效)不再複用快取的直播源地址, 下次重新向平臺解析
+    if output_bytes(save_file_path):
+        empty_runs.discard(record_url)
+    else:
+        empty_runs.add(record_url)
+        stream_url_cache.invalidate(record_url)
+    # 經代理池錄製出錯或停滯時記錄該代理對此平臺的失敗, 連續失敗的代理在冷卻時間內不再分配給此平臺
+    if proxy_address in proxy_pool and not storage_moved:
+        live_domain = '/'.join(record_url.split('/')[0:3])
+        if stalled or return_code != 0:
+            proxy_pool.report_failure(proxy_address, live_domain)
+        else:
+            proxy_pool.report_success(proxy_address, live_domain)
+    if return_code == 0 or storage_moved or (stalled and output_watch.bytes):
         print(f"\n{record_name} {stop_time} 直播錄製完成\n")
-
-        if script_command:
-            logger.debug("開始執行指令碼命令!")
-            if "python" in script_command:
-                params = [
-                    f'--record_name "{record_name}"',
-                    f'--save_file_path "{save_file_path}"',
-                    f'--save_type {save_type}'
-                    f'--split_video_by_time {split_video_by_time}',
-                    f'--converts_to_mp4 {converts_to_mp4}',
-                ]
-            else:
-                params = [
-                    f'"{record_name.split(" ", maxsplit=1)[-1]}"',
-                    f'"{save_file_path}"',
-                    save_type,
-                    f'split_video_by_time:{split_video_by_time}',
-                    f'converts_to_mp4:{converts_to_mp4}'
-                ]
-            script_command = script_command.strip() + ' ' + ' '.join(params)
-            run_script(script_command)
-            logger.debug("指令碼命令執行結束!")
-
     else:
         color_obj.print_colored(f"\n{record_name} {stop_time} 直播錄製出錯,返回碼: {return_code}\n", color_obj.RED)
+    # 單檔錄製交給片段合併服務, 同一場直播斷線重連產生的多個檔案合併後才統一轉檔與執行指令碼
+    if not split_video_by_time and recorded:
+        broadcast_stitcher.finish(record_url, save_file_path, record_started, time.time(), save_type, record_name,
+                                  script_command)
+    elif return_code == 0 or storage_moved or (stalled and output_watch.bytes):
+        finish_recording(save_file_path, save_type, record_name, script_command)
 
     recording.discard(record_name)
+    recording_urls.discard(record_url)
     return False  # 返回False讓程式回到監控循環，而不是退出執行緒
 
 
@@ -1109,17 +1320,22 @@ def get_quality_code(qn):
     return QUALITY_MAPPING.get(qn)
 
 
-def start_record(url_data: tuple, count_variable: int = -1) -> None:
+def start_record(url_data: tuple, count_variable: int = -1, start_delay: float = 0) -> None:
     global error_count
 
+    # 排隊讀取網址改為各執行緒自行延遲, 主循環不必逐個等待
+    time.sleep(start_delay)
     while True:
         try:
             record_finished = False
+            reuse_stream_url = False
             run_once = False
             start_pushed = False
             new_record_url = ''
             count_time = time.time()
             retry = 0
+            recovery = None
+            gap_started = None
             record_quality_zh, record_url, anchor_name = url_data
             record_quality = get_quality_code(record_quality_zh)
             proxy_address = proxy_addr
@@ -1139,14 +1355,27 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                         if pt and pt.strip() in record_url:
                             proxy_address = proxy_addr_bak or None
 
+            # 設定了代理池時, 每次偵測都為該平臺選用延遲最低的可用代理
+            use_proxy_pool = bool(proxy_address) and len(proxy_pool) > 0
             # print(f'\r代理地址:{proxy_address}')
             # print(f'\r全域性代理:{global_proxy}')
             while True:
                 try:
                     port_info = []
-                    if record_url.find("douyin.com/") > -1:
+                    if use_proxy_pool:
+                        proxy_address = proxy_pool.choose(live_domain) or proxy_address
+                    # 錄製剛結束後的快速重連不必和其他直播間排隊
+                    probe_gate = recovery_semaphore if recovery is not None else semaphore
+                    # 錄製剛結束時重連, 上次錄製有寫入資料且簽名未過期則直接複用上次解析的直播源地址
+                    cached_stream = (stream_url_cache.get(record_url)
+                                     if reuse_stream_url and record_url not in empty_runs else None)
+                    reuse_stream_url = False
+                    if cached_stream:
+                        platform, port_info = cached_stream
+
+                    elif record_url.find("douyin.com/") > -1:
                         platform = '抖音直播'
-                        with semaphore:
+                        with probe_gate:
                             if 'v.douyin.com' not in record_url:
                                 json_data = asyncio.run(spider.get_douyin_stream_data(
                                     url=record_url,
@@ -1157,39 +1386,43 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=dy_cookie))
-                            port_info = asyncio.run(stream.get_douyin_stream_url(json_data, record_quality))
+                            port_info = asyncio.run(stream.get_douyin_stream_url(
+                                json_data, record_quality, policy=variant_policy))
 
                     elif record_url.find("https://www.tiktok.com/") > -1:
                         platform = 'TikTok直播'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_tiktok_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=tiktok_cookie))
-                                port_info = asyncio.run(stream.get_tiktok_stream_url(json_data, record_quality))
+                                port_info = asyncio.run(stream.get_tiktok_stream_url(
+                                    json_data, record_quality, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查網路是否能正常訪問TikTok平臺")
                                 port_info = None
 
                     elif record_url.find("https://live.kuaishou.com/") > -1:
                         platform = '快手直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_kuaishou_stream_data(
                                 url=record_url,
                                 proxy_addr=proxy_address,
                                 cookies=ks_cookie))
-                            port_info = asyncio.run(stream.get_kuaishou_stream_url(json_data, record_quality))
+                            port_info = asyncio.run(stream.get_kuaishou_stream_url(
+                                json_data, record_quality, policy=variant_policy))
 
                     elif record_url.find("https://www.huya.com/") > -1:
                         platform = '虎牙直播'
-                        with semaphore:
+                        with probe_gate:
                             if record_quality not in ['OD', 'BD', 'UHD']:
                                 json_data = asyncio.run(spider.get_huya_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=hy_cookie))
-                                port_info = asyncio.run(stream.get_huya_stream_url(json_data, record_quality))
+                                port_info = asyncio.run(stream.get_huya_stream_url(
+                                    json_data, record_quality, policy=variant_policy))
                             else:
                                 port_info = asyncio.run(spider.get_huya_app_stream_url(
                                     url=record_url,
@@ -1199,7 +1432,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("https://www.douyu.com/") > -1:
                         platform = '鬥魚直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_douyu_info_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=douyu_cookie))
                             port_info = asyncio.run(stream.get_douyu_stream_url(
@@ -1208,44 +1441,45 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("https://www.yy.com/") > -1:
                         platform = 'YY直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_yy_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=yy_cookie))
                             port_info = asyncio.run(stream.get_yy_stream_url(json_data))
 
                     elif record_url.find("https://live.bilibili.com/") > -1:
                         platform = 'B站直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_bilibili_room_info(
                                 url=record_url, proxy_addr=proxy_address, cookies=bili_cookie))
                             port_info = asyncio.run(stream.get_bilibili_stream_url(
-                                json_data, video_quality=record_quality, cookies=bili_cookie, proxy_addr=proxy_address))
+                                json_data, video_quality=record_quality, cookies=bili_cookie, proxy_addr=proxy_address,
+                                policy=variant_policy))
 
                     elif record_url.find("https://www.redelight.cn/") > -1 or \
                             record_url.find("https://www.xiaohongshu.com/") > -1 or \
                             record_url.find("http://xhslink.com/") > -1:
                         platform = '小紅書直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_xhs_stream_url(
                                 record_url, proxy_addr=proxy_address, cookies=xhs_cookie))
                             retry += 1
 
                     elif record_url.find("https://www.bigo.tv/") > -1 or record_url.find("slink.bigovideo.tv/") > -1:
                         platform = 'Bigo直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_bigo_stream_url(
                                 record_url, proxy_addr=proxy_address, cookies=bigo_cookie))
 
                     elif record_url.find("https://app.blued.cn/") > -1:
                         platform = 'Blued直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_blued_stream_url(
                                 record_url, proxy_addr=proxy_address, cookies=blued_cookie))
 
                     elif record_url.find("sooplive.co.kr/") > -1:
                         platform = 'SOOP'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_sooplive_stream_data(
                                     url=record_url, proxy_addr=proxy_address,
                                     cookies=sooplive_cookie,
@@ -1258,7 +1492,8 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     )
                                 # 檢查json_data是否包含必要的數據結構
                                 if json_data and json_data.get('is_live') and 'play_url_list' in json_data:
-                                    port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                    port_info = asyncio.run(stream.get_stream_url(
+                                        json_data, record_quality, spec=True, policy=variant_policy))
                                 else:
                                     # 如果沒有有效的流數據，設置為None
                                     port_info = json_data if json_data else None
@@ -1268,54 +1503,57 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("cc.163.com/") > -1:
                         platform = '網易CC直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_netease_stream_data(
                                 url=record_url, cookies=netease_cookie))
-                            port_info = asyncio.run(stream.get_netease_stream_url(json_data, record_quality))
+                            port_info = asyncio.run(stream.get_netease_stream_url(
+                                json_data, record_quality, policy=variant_policy))
 
                     elif record_url.find("qiandurebo.com/") > -1:
                         platform = '千度熱播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_qiandurebo_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=qiandurebo_cookie))
 
                     elif record_url.find("www.pandalive.co.kr/") > -1:
                         platform = 'PandaTV'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_pandatv_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=pandatv_cookie
                                 ))
-                                port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                port_info = asyncio.run(stream.get_stream_url(
+                                    json_data, record_quality, spec=True, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查本網路是否能正常訪問PandaTV直播平臺")
                                 port_info = None
 
                     elif record_url.find("fm.missevan.com/") > -1:
                         platform = '貓耳FM直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_maoerfm_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=maoerfm_cookie))
 
                     elif record_url.find("www.winktv.co.kr/") > -1:
                         platform = 'WinkTV'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_winktv_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=winktv_cookie))
-                                port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                port_info = asyncio.run(stream.get_stream_url(
+                                    json_data, record_quality, spec=True, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查本網路是否能正常訪問WinkTV直播平臺")
                                 port_info = None
 
                     elif record_url.find("www.flextv.co.kr/") > -1:
                         platform = 'FlexTV'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_flextv_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
@@ -1327,22 +1565,23 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     utils.update_config(
                                         config_file, 'Cookie', 'flextv_cookie', json_data.get('new_cookies')
                                     )
-                                port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                port_info = asyncio.run(stream.get_stream_url(
+                                    json_data, record_quality, spec=True, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查本網路是否能正常訪問FlexTV直播平臺")
                                 port_info = None
 
                     elif record_url.find("look.163.com/") > -1:
                         platform = 'Look直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_looklive_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=look_cookie
                             ))
 
                     elif record_url.find("www.popkontv.com/") > -1:
                         platform = 'PopkonTV'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 port_info = asyncio.run(spider.get_popkontv_stream_url(
                                     url=record_url,
                                     proxy_addr=proxy_address,
@@ -1363,7 +1602,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("twitcasting.tv/") > -1:
                         platform = 'TwitCasting'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_twitcasting_stream_url(
                                 url=record_url,
                                 proxy_addr=proxy_address,
@@ -1380,45 +1619,47 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("live.baidu.com/") > -1:
                         platform = '百度直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_baidu_stream_data(
                                 url=record_url,
                                 proxy_addr=proxy_address,
                                 cookies=baidu_cookie))
-                            port_info = asyncio.run(stream.get_stream_url(json_data, record_quality))
+                            port_info = asyncio.run(stream.get_stream_url(
+                                json_data, record_quality, policy=variant_policy))
 
                     elif record_url.find("weibo.com/") > -1:
                         platform = '微博直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_weibo_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=weibo_cookie))
                             port_info = asyncio.run(stream.get_stream_url(
-                                json_data, record_quality, hls_extra_key='m3u8_url'))
+                                json_data, record_quality, hls_extra_key='m3u8_url', policy=variant_policy))
 
                     elif record_url.find("kugou.com/") > -1:
                         platform = '酷狗直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_kugou_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=kugou_cookie))
 
                     elif record_url.find("www.twitch.tv/") > -1:
                         platform = 'TwitchTV'
-                        with semaphore:
-                            if global_proxy or proxy_address:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
                                 json_data = asyncio.run(spider.get_twitchtv_stream_data(
                                     url=record_url,
                                     proxy_addr=proxy_address,
                                     cookies=twitch_cookie
                                 ))
-                                port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                port_info = asyncio.run(stream.get_stream_url(
+                                    json_data, record_quality, spec=True, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查本網路是否能正常訪問TwitchTV直播平臺")
                                 port_info = None
 
                     elif record_url.find("www.liveme.com/") > -1:
-                        if global_proxy or proxy_address:
+                        if proxy_address or has_global_proxy():
                             platform = 'LiveMe'
-                            with semaphore:
+                            with probe_gate:
                                 port_info = asyncio.run(spider.get_liveme_stream_url(
                                     url=record_url, proxy_addr=proxy_address, cookies=liveme_cookie))
                         else:
@@ -1427,113 +1668,115 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("www.huajiao.com/") > -1:
                         platform = '花椒直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_huajiao_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=huajiao_cookie))
 
                     elif record_url.find("7u66.com/") > -1:
                         platform = '流星直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_liuxing_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=liuxing_cookie))
 
                     elif record_url.find("showroom-live.com/") > -1:
                         platform = 'ShowRoom'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_showroom_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=showroom_cookie))
-                            port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                            port_info = asyncio.run(stream.get_stream_url(
+                                json_data, record_quality, spec=True, policy=variant_policy))
 
                     elif record_url.find("live.acfun.cn/") > -1 or record_url.find("m.acfun.cn/") > -1:
                         platform = 'Acfun'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_acfun_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=acfun_cookie))
                             port_info = asyncio.run(stream.get_stream_url(
-                                json_data, record_quality, url_type='flv', flv_extra_key='url'))
+                                json_data, record_quality, url_type='flv', flv_extra_key='url', policy=variant_policy))
 
                     elif record_url.find("live.tlclw.com/") > -1:
                         platform = '暢聊直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_changliao_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=changliao_cookie))
 
                     elif record_url.find("ybw1666.com/") > -1:
                         platform = '音播直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_yinbo_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=yinbo_cookie))
 
                     elif record_url.find("www.inke.cn/") > -1:
                         platform = '映客直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_yingke_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=yingke_cookie))
 
                     elif record_url.find("www.zhihu.com/") > -1:
                         platform = '知乎直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_zhihu_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=zhihu_cookie))
 
                     elif record_url.find("chzzk.naver.com/") > -1:
                         platform = 'CHZZK'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_chzzk_stream_data(
                                 url=record_url, proxy_addr=proxy_address, cookies=chzzk_cookie))
-                            port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                            port_info = asyncio.run(stream.get_stream_url(
+                                json_data, record_quality, spec=True, policy=variant_policy))
 
                     elif record_url.find("www.haixiutv.com/") > -1:
                         platform = '嗨秀直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_haixiu_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=haixiu_cookie))
 
                     elif record_url.find("vvxqiu.com/") > -1:
                         platform = 'VV星球'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_vvxqiu_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=vvxqiu_cookie))
 
                     elif record_url.find("17.live/") > -1:
                         platform = '17Live'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_17live_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=yiqilive_cookie))
 
                     elif record_url.find("www.lang.live/") > -1:
                         platform = '浪Live'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_langlive_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=langlive_cookie))
 
                     elif record_url.find("m.pp.weimipopo.com/") > -1:
                         platform = '漂漂直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_pplive_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=pplive_cookie))
 
                     elif record_url.find(".6.cn/") > -1:
                         platform = '六間房直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_6room_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=six_room_cookie))
 
                     elif record_url.find("lehaitv.com/") > -1:
                         platform = '樂嗨直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_haixiu_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=lehaitv_cookie))
 
                     elif record_url.find("h.catshow168.com/") > -1:
                         platform = '花貓直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_pplive_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=huamao_cookie))
 
                     elif record_url.find("live.shopee") > -1 or record_url.find("shp.ee/") > -1:
                         platform = 'shopee'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_shopee_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=shopee_cookie))
                             if port_info and port_info.get('uid'):
@@ -1541,35 +1784,37 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                     elif record_url.find("www.youtube.com/") > -1 or record_url.find("youtu.be/") > -1:
                         platform = 'Youtube'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_youtube_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=youtube_cookie))
-                            port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                            port_info = asyncio.run(stream.get_stream_url(
+                                json_data, record_quality, spec=True, policy=variant_policy))
 
                     elif record_url.find("tb.cn") > -1:
                         platform = '淘寶直播'
-                        with semaphore:
+                        with probe_gate:
                             json_data = asyncio.run(spider.get_taobao_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=taobao_cookie))
                             port_info = asyncio.run(stream.get_stream_url(
                                 json_data, record_quality,
-                                url_type='all', hls_extra_key='hlsUrl', flv_extra_key='flvUrl'
+                                url_type='all', hls_extra_key='hlsUrl', flv_extra_key='flvUrl', policy=variant_policy
                             ))
 
                     elif record_url.find("3.cn") > -1 or record_url.find("m.jd.com") > -1:
                         platform = '京東直播'
-                        with semaphore:
+                        with probe_gate:
                             port_info = asyncio.run(spider.get_jd_stream_url(
                                 url=record_url, proxy_addr=proxy_address, cookies=jd_cookie))
 
                     elif record_url.find("faceit.com/") > -1:
                         platform = 'faceit'
-                        with semaphore:
-                            if global_proxy or proxy_address:
-                                with semaphore:
+                        with probe_gate:
+                            if proxy_address or has_global_proxy():
+                                with probe_gate:
                                     json_data = asyncio.run(spider.get_faceit_stream_data(
                                         url=record_url, proxy_addr=proxy_address, cookies=faceit_cookie))
-                                    port_info = asyncio.run(stream.get_stream_url(json_data, record_quality, spec=True))
+                                    port_info = asyncio.run(stream.get_stream_url(
+                                        json_data, record_quality, spec=True, policy=variant_policy))
                             else:
                                 logger.error("錯誤資訊: 網路異常，請檢查本網路是否能正常訪問faceit直播平臺")
                                 port_info = None
@@ -1617,8 +1862,8 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                         anchor_name = clean_name(anchor_name)
                         record_name = f'序號{count_variable} {anchor_name}'
 
-                        if record_url in url_comments:
-                            print(f"[{anchor_name}]已被註釋,本條執行緒將會退出")
+                        if room_released(record_url):
+                            print(f"[{anchor_name}]已被註釋或交由其他節點錄製,本條執行緒將會退出")
                             clear_record_info(record_name, record_url)
                             return
 
@@ -1626,7 +1871,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                             if new_record_url:
                                 need_update_line_list.append(
                                     f'{record_url}|{new_record_url},主播: {anchor_name.strip()}')
-                                not_record_list.append(new_record_url)
+                                not_record_list.add(new_record_url)
                             else:
                                 need_update_line_list.append(f'{record_url}|{record_url},主播: {anchor_name.strip()}')
                             run_once = True
@@ -1643,16 +1888,15 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                                     push_content = (push_content.replace('[直播間名稱]', record_name).
                                                     replace('[時間]', push_at))
-                                    threading.Thread(
-                                        target=push_message,
-                                        args=(record_name, record_url, push_content.replace(r'\n', '\n')),
-                                        daemon=True
-                                    ).start()
+                                    push_message(record_name, record_url, push_content.replace(r'\n', '\n'),
+                                                 is_live=False)
                                 start_pushed = False
 
                         else:
                             content = f"\r{record_name} 正在直播中..."
                             print(content)
+                            if room_catalog is not None:
+                                room_catalog.mark_live(record_url)
 
                             if live_status_push and not start_pushed:
                                 if begin_show_push:
@@ -1662,11 +1906,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
 
                                     push_content = (push_content.replace('[直播間名稱]', record_name).
                                                     replace('[時間]', push_at))
-                                    threading.Thread(
-                                        target=push_message,
-                                        args=(record_name, record_url, push_content.replace(r'\n', '\n')),
-                                        daemon=True
-                                    ).start()
+                                    push_message(record_name, record_url, push_content.replace(r'\n', '\n'))
                                 start_pushed = True
 
                             if disable_record:
@@ -1676,6 +1916,12 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                             real_url = port_info.get('record_url')
                             full_path = f'{default_path}/{platform}'
                             if real_url:
+                                stream_url_cache.put(record_url, platform, port_info)
+                                if gap_started is not None:
+                                    gap_seconds = time.time() - gap_started
+                                    color_obj.print_colored(f"[{record_name}]錄製中斷{gap_seconds:.1f}秒後恢復",
+                                                            color_obj.GREEN)
+                                    logger.info(f"[{record_name}]錄製中斷{gap_seconds:.1f}秒後恢復")
                                 now = datetime.datetime.today().strftime("%Y-%m-%d_%H-%M-%S")
                                 live_title = port_info.get('title')
                                 title_in_name = ''
@@ -1684,11 +1930,13 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     title_in_name = live_title + '_' if filename_by_title else ''
 
                                 try:
-                                    if len(video_save_path) > 0:
-                                        if not video_save_path.endswith(('/', '\\')):
-                                            full_path = f'{video_save_path}/{platform}'
+                                    # 每次開始錄製時選擇剩餘空間最多且寫入最少的儲存路徑
+                                    save_volume = storage_router.choose() or video_save_path
+                                    if len(save_volume) > 0:
+                                        if not save_volume.endswith(('/', '\\')):
+                                            full_path = f'{save_volume}/{platform}'
                                         else:
-                                            full_path = f'{video_save_path}{platform}'
+                                            full_path = f'{save_volume}{platform}'
 
                                     full_path = full_path.replace("\\", '/')
                                     if folder_by_author:
@@ -1769,6 +2017,12 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                 }
 
                                 headers = record_headers.get(platform)
+                                # http直播源改用快取的IP位址, 省去ffmpeg自行解析域名, 原域名以Host標頭帶上
+                                if pin_ffmpeg_dns and not proxy_address:
+                                    pinned_url, host_header = pin_ffmpeg_input(real_url)
+                                    if host_header:
+                                        ffmpeg_command[ffmpeg_command.index("-i") + 1] = pinned_url
+                                        headers = f'Host: {host_header}\r\n' + (headers or '')
                                 if headers:
                                     ffmpeg_command.insert(11, "-headers")
                                     ffmpeg_command.insert(12, headers)
@@ -1778,6 +2032,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     ffmpeg_command.insert(2, proxy_address)
 
                                 recording.add(record_name)
+                                recording_urls.add(record_url)
                                 start_record_time = datetime.datetime.now()
                                 recording_time_list[record_name] = [start_record_time, record_quality_zh]
                                 rec_info = f"\r{anchor_name} 準備開始錄製視訊: {full_path}"
@@ -1806,13 +2061,8 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                     print(f'{rec_info}/{filename}')
 
                                     subs_file_path = save_file_path.rsplit('.', maxsplit=1)[0]
-                                    subs_thread_name = f'subs_{Path(subs_file_path).name}'
                                     if create_time_file:
-                                        create_var[subs_thread_name] = threading.Thread(
-                                            target=generate_subtitles, args=(record_name, subs_file_path)
-                                        )
-                                        create_var[subs_thread_name].daemon = True
-                                        create_var[subs_thread_name].start()
+                                        generate_subtitles(record_name, subs_file_path)
 
                                     try:
                                         flv_url = port_info.get('flv_url')
@@ -1820,6 +2070,7 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                             _filepath, _ = urllib.request.urlretrieve(flv_url, save_file_path)
                                             record_finished = True
                                             recording.discard(record_name)
+                                            recording_urls.discard(record_url)
                                             print(
                                                 f"\n{anchor_name} {time.strftime('%Y-%m-%d %H:%M:%S')} 直播錄製完成\n")
                                         else:
@@ -2196,9 +2447,6 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                                             )
                                             # 只有被手動註釋時才退出執行緒，錄製自然結束時繼續監控循環
                                             if comment_end:
-                                                threading.Thread(
-                                                    target=converts_mp4, args=(save_file_path, delete_origin_file)
-                                                ).start()
                                                 return
                                             # 錄製結束，設置標誌並繼續監控循環
                                             record_finished = True
@@ -2226,23 +2474,47 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
                     x = x + 60
                     color_obj.print_colored("\r瞬時錯誤太多,延遲加60秒", color_obj.YELLOW)
 
-                # 這裡是.如果錄製結束後,循環時間會暫時變成30s後檢測一遍. 這樣一定程度上防止主播卡頓造成少錄
-                # 當30秒過後檢測一遍後. 會迴歸正常設定的循環秒數
+                # 錄製結束後立即重新檢測, 之後依1/2/4/8秒間隔檢測到快速重連時間結束, 防止主播斷線重連造成少錄
+                # 同一時間窗口內再次結束時沿用原本的間隔, 不會重新從頭開始
                 if record_finished:
-                    count_time_end = time.time() - count_time
-                    if count_time_end < 60:
-                        x = 30
+                    # 中斷時間從最後一次有錄到資料的錄製結束時起算, 重連後立即失敗的錄製不重新計時
+                    if gap_started is None or record_url not in empty_runs:
+                        gap_started = time.time()
+                    if reprobe_window > 0 and (recovery is None or recovery.expired()):
+                        recovery = RecoverySchedule(reprobe_window)
                     record_finished = False
-
+                    reuse_stream_url = True
+                    if recovery is None:
+                        count_time_end = time.time() - count_time
+                        if count_time_end < 60:
+                            x = 30
                 else:
                     x = num
 
-                # 這裡是正常循環
+                if recovery is not None:
+                    delay = recovery.next_delay()
+                    if delay is None:
+                        recovery = None
+                        if gap_started is not None:
+                            logger.info(f"[{anchor_name}]錄製中斷後{reprobe_window}秒內未恢復直播")
+                            gap_started = None
+                    else:
+                        x = delay
+                elif push_watcher is not None and push_watcher.connected(record_url):
+                    # 已訂閱開播推送的直播間, 輪詢只作為較慢的備援
+                    x = max(x, push_poll_seconds)
+
+                # 這裡是正常循環, 收到開播推送時立即結束等待
                 while x:
                     x = x - 1
                     if loop_time:
                         print(f'\r{anchor_name}循環等待{x}秒 ', end="")
-                    time.sleep(1)
+                    if push_watcher is not None:
+                        if push_watcher.wait(record_url, 1):
+                            print(f'\r{anchor_name} 收到開播推送, 立即檢測')
+                            break
+                    else:
+                        time.sleep(1)
                 if loop_time:
                     print('\r檢測直播間中...', end="")
         except Exception as e:
@@ -2253,69 +2525,60 @@ def start_record(url_data: tuple, count_variable: int = -1) -> None:
             time.sleep(2)
 
 
-def backup_file(file_path: str, backup_dir_path: str, limit_counts: int = 6) -> None:
+def backup_file(file_path: str) -> None:
     try:
-        if not os.path.exists(backup_dir_path):
-            os.makedirs(backup_dir_path)
-
-        timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        backup_file_name = os.path.basename(file_path) + '_' + timestamp
-        backup_file_path = os.path.join(backup_dir_path, backup_file_name).replace("\\", "/")
-        shutil.copy2(file_path, backup_file_path)
-
-        files = os.listdir(backup_dir_path)
-        _files = [f for f in files if f.startswith(os.path.basename(file_path))]
-        _files.sort(key=lambda x: os.path.getmtime(os.path.join(backup_dir_path, x)))
-
-        while len(_files) > limit_counts:
-            oldest_file = _files[0]
-            os.remove(os.path.join(backup_dir_path, oldest_file))
-            _files = _files[1:]
-
+        backup_store.backup(file_path)
     except Exception as e:
         logger.error(f'\r備份配置檔案 {file_path} 失敗：{str(e)}')
 
 
 def backup_file_start() -> None:
-    config_md5 = ''
-    url_config_md5 = ''
+    # 先比對檔案大小與修改時間，有變化時才計算MD5確認內容是否真的改變
+    detector = ChangeDetector()
 
     while True:
         try:
-            if os.path.exists(config_file):
-                new_config_md5 = utils.check_md5(config_file)
-                if new_config_md5 != config_md5:
-                    backup_file(config_file, backup_dir)
-                    config_md5 = new_config_md5
-
-            if os.path.exists(url_config_file):
-                new_url_config_md5 = utils.check_md5(url_config_file)
-                if new_url_config_md5 != url_config_md5:
-                    backup_file(url_config_file, backup_dir)
-                    url_config_md5 = new_url_config_md5
+            for file_path in (config_file, url_config_file):
+                if os.path.exists(file_path) and detector.changed(file_path):
+                    backup_file(file_path)
             time.sleep(600)
         except Exception as e:
             logger.error(f"備份配置檔案失敗, 錯誤資訊: {e}")
 
 
 def check_ffmpeg_existence() -> bool:
+    # 版本資訊依ffmpeg執行檔快取, 執行檔未變更時啟動不必再執行ffmpeg
+    version_info = tool_versions.version('ffmpeg', ('-version',), lines=2)
+    if version_info:
+        print(version_info)
+        return True
+    return check_ffmpeg()
+
+
+def check_system_proxy() -> bool:
+    global global_proxy
     try:
-        result = subprocess.run(['ffmpeg', '-version'], check=True, capture_output=True, text=True)
-        if result.returncode == 0:
-            lines = result.stdout.splitlines()
-            version_line = lines[0]
-            built_line = lines[1]
-            print(version_line)
-            print(built_line)
-    except subprocess.CalledProcessError as e:
-        logger.error(e)
-    except FileNotFoundError:
-        pass
-    finally:
-        if check_ffmpeg():
-            time.sleep(1)
-            return True
-    return False
+        print('系統代理檢測中，請耐心等待...')
+        urllib.request.urlopen("https://www.google.com/", timeout=15)
+        global_proxy = True
+        print('\r全域性/規則網路代理已開啟√')
+        pd = ProxyDetector()
+        if pd.is_proxy_enabled():
+            proxy_info = pd.get_proxy_info()
+            print("System Proxy: http://{}:{}".format(proxy_info.ip, proxy_info.port))
+    except HTTPError as err:
+        print(f"HTTP error occurred: {err.code} - {err.reason}")
+    except URLError as err:
+        color_obj.print_colored(f"INFO：未檢測到全域性/規則網路代理，請檢查代理配置（若無需錄製海外直播請忽略此條提示）",
+                                color_obj.YELLOW)
+    except Exception as err:
+        print("An unexpected error occurred:", err)
+    return global_proxy
+
+
+def has_global_proxy() -> bool:
+    # 系統代理檢測在背景執行, 只有未設定代理地址的海外平臺需要等待檢測結果
+    return global_proxy or bool(startup_tasks.wait('系統代理檢測'))
 
 
 # --------------------------初始化程式-------------------------------------
@@ -2327,13 +2590,15 @@ print(f"版本號: {version}")
 print("GitHub: https://github.com/ihmily/DouyinLiveRecorder")
 print(f'支援平臺: {platforms}')
 print('.....................................................')
-if not check_ffmpeg_existence():
-    logger.error("缺少ffmpeg無法進行錄製，程式退出")
-    sys.exit(1)
+# 互不相依的啟動檢查並行執行, 只有後續步驟用到結果時才等待
+startup_tasks.submit('ffmpeg檢測', check_ffmpeg_existence)
+startup_tasks.submit('Node.js檢測', node_check.join)
+startup_tasks.submit('URL配置去重', utils.remove_duplicate_lines, url_config_file)
 os.makedirs(os.path.dirname(config_file), exist_ok=True)
-t3 = threading.Thread(target=backup_file_start, args=(), daemon=True)
-t3.start()
-utils.remove_duplicate_lines(url_config_file)
+if worker_shard is None:
+    # 分片工作行程的URL配置由supervisor產生，不需備份
+    t3 = threading.Thread(target=backup_file_start, args=(), daemon=True)
+    t3.start()
 
 
 def read_config_value(config_parser: configparser.RawConfigParser, section: str, option: str, default_value: Any) \
@@ -2364,32 +2629,39 @@ config = configparser.RawConfigParser()
 language = read_config_value(config, '錄製設定', 'language(zh_tw/en)', "zh_tw")
 skip_proxy_check = options.get(read_config_value(config, '錄製設定', '是否跳過代理檢測(是/否)', "否"), False)
 if language and 'en' not in language.lower():
-    from i18n import translated_print
+    import i18n
 
-    builtins.print = translated_print
+    i18n.install('zh_TW')
 
-try:
-    if skip_proxy_check:
-        global_proxy = True
-    else:
-        print('系統代理檢測中，請耐心等待...')
-        response_g = urllib.request.urlopen("https://www.google.com/", timeout=15)
-        global_proxy = True
-        print('\r全域性/規則網路代理已開啟√')
-        pd = ProxyDetector()
-        if pd.is_proxy_enabled():
-            proxy_info = pd.get_proxy_info()
-            print("System Proxy: http://{}:{}".format(proxy_info.ip, proxy_info.port))
-except HTTPError as err:
-    print(f"HTTP error occurred: {err.code} - {err.reason}")
-except URLError as err:
-    color_obj.print_colored(f"INFO：未檢測到全域性/規則網路代理，請檢查代理配置（若無需錄製海外直播請忽略此條提示）",
-                            color_obj.YELLOW)
-except Exception as err:
-    print("An unexpected error occurred:", err)
+if skip_proxy_check:
+    global_proxy = True
+else:
+    # 代理檢測最長需15秒, 在背景完成, 不延後直播間監控的開始
+    startup_tasks.submit('系統代理檢測', check_system_proxy)
+if not startup_tasks.wait('ffmpeg檢測'):
+    logger.error("缺少ffmpeg無法進行錄製，程式退出")
+    sys.exit(1)
+startup_tasks.wait('URL配置去重')
+startup_tasks.mark('啟動檢查')
 
 while True:
 
+    room_db_path = read_config_value(config, '錄製設定', '房間資料庫路徑(留空則使用URL_config.ini)', "")
+    if room_db_path and not os.path.isabs(room_db_path):
+        room_db_path = f'{script_path}/{room_db_path}'
+    if room_catalog is not None and room_catalog.db_path != room_db_path:
+        # 路徑變更或停用時先關閉舊的資料庫連線
+        room_catalog.close()
+        room_catalog = None
+    if room_db_path and room_catalog is None:
+        room_catalog = open_room_catalog(room_db_path)
+        room_revision = 0
+
+    cluster_db_path = read_config_value(config, '錄製設定', '叢集租約資料庫路徑(留空則不啟用)', "")
+    cluster_node_id = read_config_value(config, '錄製設定', '叢集節點名稱(留空則自動產生)', "")
+    if cluster_db_path and not os.path.isabs(cluster_db_path):
+        cluster_db_path = f'{script_path}/{cluster_db_path}'
+
     try:
         if not os.path.isfile(config_file):
             with open(config_file, 'w', encoding=text_encoding) as file:
@@ -2400,14 +2672,19 @@ while True:
             with open(url_config_file, 'r', encoding=text_encoding) as file:
                 ini_URL_content = file.read().strip()
 
-        if not ini_URL_content.strip():
+        if not ini_URL_content.strip() and not room_catalog and worker_shard is None:
             input_url = input('請輸入要錄製的主播直播間網址（儘量使用PC網頁端的直播間地址）:\n')
             with open(url_config_file, 'w', encoding=text_encoding) as file:
                 file.write(input_url)
+            if room_catalog is not None:
+                input_quality, input_url, input_name = parse_room_line(input_url)
+                room_catalog.upsert('https://' + input_url if '://' not in input_url else input_url,
+                                    input_quality, input_name)
     except OSError as err:
         logger.error(f"發生 I/O 錯誤: {err}")
 
     video_save_path = read_config_value(config, '錄製設定', '直播儲存路徑(不填則預設)', "")
+    extra_save_paths = read_config_value(config, '錄製設定', '額外儲存路徑(逗號分隔,依剩餘空間分配)', "")
     folder_by_author = options.get(read_config_value(config, '錄製設定', '儲存資料夾是否以作者區分', "是"), False)
     folder_by_time = options.get(read_config_value(config, '錄製設定', '儲存資料夾是否以時間區分', "否"), False)
     folder_by_title = options.get(read_config_value(config, '錄製設定', '儲存資料夾是否以標題區分', "否"), False)
@@ -2415,11 +2692,30 @@ while True:
     clean_emoji = options.get(read_config_value(config, '錄製設定', '是否去除名稱中的表情符號', "是"), True)
     video_save_type = read_config_value(config, '錄製設定', '視訊儲存格式ts|mkv|flv|mp4|mp3音訊|m4a音訊', "ts")
     video_record_quality = read_config_value(config, '錄製設定', '原畫|超清|高清|標清|流暢', "原畫")
+    max_record_bitrate = int(read_config_value(config, '錄製設定', '錄製碼率上限(kbps,0為不限)', 0))
+    max_record_height = int(read_config_value(config, '錄製設定', '錄製解析度上限(如1080,0為不限)', 0))
+    prefer_video_codec = read_config_value(config, '錄製設定', '優先視訊編碼(h264/h265,逗號分隔)', "")
+    variant_policy = SelectionPolicy.from_config(max_record_bitrate, max_record_height, prefer_video_codec)
     use_proxy = options.get(read_config_value(config, '錄製設定', '是否使用代理ip(是/否)', "是"), False)
     proxy_addr_bak = read_config_value(config, '錄製設定', '代理地址', "")
+    proxy_pool_list = [p for p in read_config_value(
+        config, '錄製設定', '代理池地址(逗號分隔)', "").replace('，', ',').split(',') if p.strip()]
+    proxy_pool.update(proxy_pool_list, read_config_value(
+        config, '錄製設定', '代理健康檢測地址', "https://www.google.com/generate_204"))
+    proxy_pool.interval = float(read_config_value(config, '錄製設定', '代理健康檢測間隔(秒)', 60))
+    if proxy_pool_list:
+        # 未填寫代理地址時以代理池的第一個代理為準, 實際使用的代理由代理池按延遲挑選
+        proxy_addr_bak = proxy_addr_bak or proxy_pool_list[0].strip()
+        proxy_pool.start()
     proxy_addr = None if not use_proxy else proxy_addr_bak
     max_request = int(read_config_value(config, '錄製設定', '同一時間訪問網路的執行緒數', 3))
     semaphore = threading.Semaphore(max_request)
+    recovery_semaphore = threading.Semaphore(max_request)
+    reprobe_window = int(read_config_value(config, '錄製設定', '錄製結束後快速重連時間(秒)', 60))
+    enable_push_watch = options.get(read_config_value(config, '錄製設定', '開播推送偵測(是/否)', "否"), False)
+    push_poll_seconds = int(read_config_value(config, '錄製設定', '開播推送偵測時輪詢時間(秒)', 600))
+    pin_ffmpeg_dns = options.get(read_config_value(config, '錄製設定', 'ffmpeg使用預解析的直播源地址(是/否)', "否"), False)
+    broadcast_stitcher.gap = float(read_config_value(config, '錄製設定', '斷線片段合併間隔(秒,0為不合併)', 120))
     delay_default = int(read_config_value(config, '錄製設定', '循環時間(秒)', 120))
     local_delay_default = int(read_config_value(config, '錄製設定', '排隊讀取網址時間(秒)', 0))
     loop_time = options.get(read_config_value(config, '錄製設定', '是否顯示循環秒數', "否"), False)
@@ -2427,11 +2723,18 @@ while True:
     split_video_by_time = options.get(read_config_value(config, '錄製設定', '分段錄製是否開啟', "否"), False)
     enable_https_recording = options.get(read_config_value(config, '錄製設定', '是否強制啟用https錄製', "否"), False)
     disk_space_limit = float(read_config_value(config, '錄製設定', '錄製空間剩餘閾值(gb)', 1.0))
+    stall_thresholds = parse_thresholds(read_config_value(config, '錄製設定', '輸出停滯重啟秒數(平台與秒數,分號分隔)', "*:90"))
+    retention_rules = read_config_value(config, '錄製設定', '錄製保留策略(範圍與規則,分號分隔)', "")
+    retention_action = read_config_value(config, '錄製設定', '超出保留策略的處理方式(delete/archive)', "delete")
+    retention_archive_path = read_config_value(config, '錄製設定', '歸檔路徑', "")
+    retention_rate_mb = float(read_config_value(config, '錄製設定', '保留策略IO上限(MB/s)', 50))
+    emergency_prune = options.get(read_config_value(config, '錄製設定', '空間不足時刪除最舊錄製(是/否)', "否"), False)
     split_time = str(read_config_value(config, '錄製設定', '視訊分段時間(秒)', 1800))
     converts_to_mp4 = options.get(read_config_value(config, '錄製設定', '錄製完成後自動轉為mp4格式', "否"), False)
     converts_to_h264 = options.get(read_config_value(config, '錄製設定', 'mp4格式重新編碼為h264', "否"), False)
     delete_origin_file = options.get(read_config_value(config, '錄製設定', '追加格式後刪除原檔案', "否"), False)
     create_time_file = options.get(read_config_value(config, '錄製設定', '產生時間字幕檔案', "否"), False)
+    defer_time_file = options.get(read_config_value(config, '錄製設定', '時間字幕錄製結束後產生(是/否)', "否"), False)
     is_run_script = options.get(read_config_value(config, '錄製設定', '是否錄製完成後執行自定義指令碼', "否"), False)
     custom_script = read_config_value(config, '錄製設定', '自定義指令碼執行命令', "") if is_run_script else None
     # 封包監控預設啟用（硬編碼，無需配置）
@@ -2471,6 +2774,7 @@ while True:
     push_check_seconds = int(read_config_value(config, '推送配置', '直播推送檢測頻率(秒)', 1800))
     begin_show_push = options.get(read_config_value(config, '推送配置', '開播推送開啟(是/否)', "是"), True)
     over_show_push = options.get(read_config_value(config, '推送配置', '關播推送開啟(是/否)', "否"), False)
+    push_coalescer.window = int(read_config_value(config, '推送配置', '推送合併時間(秒,0為不合併)', 0))
     sooplive_username = read_config_value(config, '帳號密碼', 'sooplive帳號', '')
     sooplive_password = read_config_value(config, '帳號密碼', 'sooplive密碼', '')
     flextv_username = read_config_value(config, '帳號密碼', 'flextv帳號', '')
@@ -2535,8 +2839,30 @@ while True:
     else:
         video_save_type = "TS"
 
-    check_path = video_save_path or default_path
-    if utils.check_disk_capacity(check_path, show=first_run) < disk_space_limit:
+    storage_router.update([video_save_path or default_path] +
+                          [i.strip() for i in extra_save_paths.replace('，', ',').split(',') if i.strip()],
+                          disk_space_limit)
+    if first_run:
+        for volume in storage_router.volumes:
+            utils.check_disk_capacity(volume, show=True)
+
+    try:
+        retention_policies = parse_policies(retention_rules)
+    except ValueError as e:
+        retention_policies = {}
+        logger.error(f"錄製保留策略格式錯誤: {e}")
+    if retention_engine is not None:
+        retention_engine.configure(retention_policies, retention_action.strip().lower(), retention_archive_path,
+                                   retention_rate_mb)
+    if retention_engine is not None and (retention_policies or emergency_prune):
+        retention_engine.start(free_bytes=lambda: storage_router.shortfall_gb() * 1024 ** 3 if emergency_prune else 0)
+    broadcast_stitcher.startupinfo = get_startup_info(os_type)
+    broadcast_stitcher.start()
+    # 空間不足時先刪除最舊的已完成錄製,只有仍無法騰出空間時才停止錄製
+    if storage_router.choose() is None and emergency_prune and retention_engine is not None:
+        retention_engine.run_once(free_bytes=lambda: storage_router.shortfall_gb() * 1024 ** 3)
+    # 只有所有儲存路徑都低於閾值時才停止錄製
+    if storage_router.choose() is None:
         exit_recording = True
         if not recording:
             logger.warning(f"Disk space remaining is below {disk_space_limit} GB. "
@@ -2544,167 +2870,141 @@ while True:
             sys.exit(-1)
 
 
-    def contains_url(string: str) -> bool:
-        pattern = r"(https?://)?(www\.)?[a-zA-Z0-9-]+(\.[a-zA-Z0-9-]+)+(:\d+)?(/.*)?"
-        return re.search(pattern, string) is not None
-
-
     try:
-        url_comments, line_list, url_line_list = [[] for _ in range(3)]
-        with (open(url_config_file, "r", encoding=text_encoding, errors='ignore') as file):
-            for origin_line in file:
-                if origin_line in line_list:
-                    delete_line(url_config_file, origin_line)
-                line_list.append(origin_line)
-                line = origin_line.strip()
-                if len(line) < 20:
+        platform_host = [
+            'live.douyin.com',
+            'v.douyin.com',
+            'www.douyin.com',
+            'live.kuaishou.com',
+            'www.huya.com',
+            'www.douyu.com',
+            'www.yy.com',
+            'live.bilibili.com',
+            'www.redelight.cn',
+            'www.xiaohongshu.com',
+            'xhslink.com',
+            'www.bigo.tv',
+            'slink.bigovideo.tv',
+            'app.blued.cn',
+            'cc.163.com',
+            'qiandurebo.com',
+            'fm.missevan.com',
+            'look.163.com',
+            'twitcasting.tv',
+            'live.baidu.com',
+            'weibo.com',
+            'fanxing.kugou.com',
+            'fanxing2.kugou.com',
+            'mfanxing.kugou.com',
+            'www.huajiao.com',
+            'www.7u66.com',
+            'wap.7u66.com',
+            'live.acfun.cn',
+            'm.acfun.cn',
+            'live.tlclw.com',
+            'wap.tlclw.com',
+            'live.ybw1666.com',
+            'wap.ybw1666.com',
+            'www.inke.cn',
+            'www.zhihu.com',
+            'www.haixiutv.com',
+            "h5webcdnp.vvxqiu.com",
+            "17.live",
+            'www.lang.live',
+            "m.pp.weimipopo.com",
+            "v.6.cn",
+            "m.6.cn",
+            'www.lehaitv.com',
+            'h.catshow168.com',
+            'e.tb.cn',
+            'huodong.m.taobao.com',
+            '3.cn',
+            'eco.m.jd.com'
+        ]
+        overseas_platform_host = [
+            'www.tiktok.com',
+            'play.sooplive.co.kr',
+            'm.sooplive.co.kr',
+            'www.pandalive.co.kr',
+            'www.winktv.co.kr',
+            'www.flextv.co.kr',
+            'www.popkontv.com',
+            'www.twitch.tv',
+            'www.liveme.com',
+            'www.showroom-live.com',
+            'chzzk.naver.com',
+            'm.chzzk.naver.com',
+            'live.shopee.',
+            '.shp.ee',
+            'www.youtube.com',
+            'youtu.be',
+            'www.faceit.com'
+        ]
+
+        platform_host = set(platform_host + overseas_platform_host)
+        clean_url_host_list = (
+            "live.douyin.com",
+            "live.bilibili.com",
+            "www.huajiao.com",
+            "www.zhihu.com",
+            "www.huya.com",
+            "chzzk.naver.com",
+            "www.liveme.com",
+            "www.haixiutv.com",
+            "v.6.cn",
+            "m.6.cn",
+            'www.lehaitv.com'
+        )
+
+        if room_catalog is not None:
+            sync_room_catalog()
+        else:
+            # 一次解析整個URL配置檔案，重複的行和重複的URL只保留第一次出現的，並一次性刪除
+            # 檔案未變動時直接沿用上次的解析結果，變動後只有新的行需要重新解析
+            url_catalog = UrlCatalog.load(url_config_file, text_encoding, video_record_quality, previous=url_catalog)
+            if url_catalog.duplicates:
+                with file_update_lock:
+                    url_catalog.remove(url_catalog.duplicates)
+            # 本輪對各行的修改先記下, 最後按位移一次性寫回
+            url_edits = {}
+            url_comments = set()
+            for entry in url_catalog.entries:
+                if not entry.url:
                     continue
+                origin_line = entry.raw
+                quality, url, name, is_comment_line = entry.quality, entry.url, entry.name, entry.is_comment
 
+                line = origin_line.strip()
                 line_spilt = line.split('主播: ')
                 if len(line_spilt) > 2:
-                    line = update_file(url_config_file, line, f'{line_spilt[0]}主播: {line_spilt[-1]}')
-
-                is_comment_line = line.startswith("#")
-                if is_comment_line:
-                    line = line.lstrip('#')
-
-                if re.search('[,，]', line):
-                    split_line = re.split('[,，]', line)
-                else:
-                    split_line = [line, '']
-
-                if len(split_line) == 1:
-                    url = split_line[0]
-                    quality, name = [video_record_quality, '']
-                elif len(split_line) == 2:
-                    if contains_url(split_line[0]):
-                        quality = video_record_quality
-                        url, name = split_line
-                    else:
-                        quality, url = split_line
-                        name = ''
-                else:
-                    quality, url, name = split_line
-
-                if quality not in ("原畫", "藍光", "超清", "高清", "標清", "流暢"):
-                    quality = '原畫'
-
-                if url not in url_line_list:
-                    url_line_list.append(url)
-                else:
-                    delete_line(url_config_file, origin_line)
+                    line = f'{line_spilt[0]}主播: {line_spilt[-1]}'
+                    quality, url, name, is_comment_line = parse_line(line, video_record_quality)
 
                 url = 'https://' + url if '://' not in url else url
                 url_host = url.split('/')[2]
 
-                platform_host = [
-                    'live.douyin.com',
-                    'v.douyin.com',
-                    'www.douyin.com',
-                    'live.kuaishou.com',
-                    'www.huya.com',
-                    'www.douyu.com',
-                    'www.yy.com',
-                    'live.bilibili.com',
-                    'www.redelight.cn',
-                    'www.xiaohongshu.com',
-                    'xhslink.com',
-                    'www.bigo.tv',
-                    'slink.bigovideo.tv',
-                    'app.blued.cn',
-                    'cc.163.com',
-                    'qiandurebo.com',
-                    'fm.missevan.com',
-                    'look.163.com',
-                    'twitcasting.tv',
-                    'live.baidu.com',
-                    'weibo.com',
-                    'fanxing.kugou.com',
-                    'fanxing2.kugou.com',
-                    'mfanxing.kugou.com',
-                    'www.huajiao.com',
-                    'www.7u66.com',
-                    'wap.7u66.com',
-                    'live.acfun.cn',
-                    'm.acfun.cn',
-                    'live.tlclw.com',
-                    'wap.tlclw.com',
-                    'live.ybw1666.com',
-                    'wap.ybw1666.com',
-                    'www.inke.cn',
-                    'www.zhihu.com',
-                    'www.haixiutv.com',
-                    "h5webcdnp.vvxqiu.com",
-                    "17.live",
-                    'www.lang.live',
-                    "m.pp.weimipopo.com",
-                    "v.6.cn",
-                    "m.6.cn",
-                    'www.lehaitv.com',
-                    'h.catshow168.com',
-                    'e.tb.cn',
-                    'huodong.m.taobao.com',
-                    '3.cn',
-                    'eco.m.jd.com'
-                ]
-                overseas_platform_host = [
-                    'www.tiktok.com',
-                    'play.sooplive.co.kr',
-                    'm.sooplive.co.kr',
-                    'www.pandalive.co.kr',
-                    'www.winktv.co.kr',
-                    'www.flextv.co.kr',
-                    'www.popkontv.com',
-                    'www.twitch.tv',
-                    'www.liveme.com',
-                    'www.showroom-live.com',
-                    'chzzk.naver.com',
-                    'm.chzzk.naver.com',
-                    'live.shopee.',
-                    '.shp.ee',
-                    'www.youtube.com',
-                    'youtu.be',
-                    'www.faceit.com'
-                ]
-
-                platform_host.extend(overseas_platform_host)
-                clean_url_host_list = (
-                    "live.douyin.com",
-                    "live.bilibili.com",
-                    "www.huajiao.com",
-                    "www.zhihu.com",
-                    "www.huya.com",
-                    "chzzk.naver.com",
-                    "www.liveme.com",
-                    "www.haixiutv.com",
-                    "v.6.cn",
-                    "m.6.cn",
-                    'www.lehaitv.com'
-                )
-
-                if 'live.shopee.' in url_host or '.shp.ee' in url_host:
-                    url_host = 'live.shopee.' if 'live.shopee.' in url_host else '.shp.ee'
-
-                if url_host in platform_host or any(ext in url for ext in (".flv", ".m3u8")):
+                if is_supported_url(url):
                     if url_host in clean_url_host_list:
-                        url = update_file(url_config_file, old_str=url, new_str=url.split('?')[0])
+                        new_url = url.split('?')[0]
+                        line, url = line.replace(url, new_url), new_url
 
                     if 'xiaohongshu' in url:
                         host_id = re.search('&host_id=(.*?)(?=&|$)', url)
                         if host_id:
                             new_url = url.split('?')[0] + f'?host_id={host_id.group(1)}'
-                            url = update_file(url_config_file, old_str=url, new_str=new_url)
+                            line, url = line.replace(url, new_url), new_url
 
-                    url_comments = [i for i in url_comments if url not in i]
+                    url_comments.discard(url)
                     if is_comment_line:
-                        url_comments.append(url)
+                        url_comments.add(url)
                     else:
                         new_line = (quality, url, name)
                         url_tuples_list.append(new_line)
                 else:
                     if not origin_line.startswith('#'):
                         color_obj.print_colored(f"\r{origin_line.strip()} 本行包含未知鏈接.此條跳過", color_obj.YELLOW)
-                        update_file(url_config_file, old_str=origin_line, new_str=origin_line, start_str='#')
+                        line = f'#{line}'
+                url_edits[entry] = line
 
         while len(need_update_line_list):
             a = need_update_line_list.pop()
@@ -2716,26 +3016,58 @@ while True:
                 else:
                     start_with = None
                     new_word = replace_words[1]
-                update_file(url_config_file, old_str=replace_words[0], new_str=new_word, start_str=start_with)
+                if room_catalog is not None:
+                    room_catalog.set_name(replace_words[0], parse_room_line(new_word)[2])
+                elif entry := url_catalog.find(replace_words[0]):
+                    line = url_edits.get(entry, entry.raw.strip()).replace(replace_words[0], new_word)
+                    url_edits[entry] = f'{start_with or ""}{line}'
+                else:
+                    update_file(url_config_file, old_str=replace_words[0], new_str=new_word, start_str=start_with)
+
+        if room_catalog is None and url_edits:
+            with file_update_lock:
+                url_catalog.replace(url_edits)
+
+        if cluster_db_path:
+            if room_catalog is not None:
+                url_tuples_list = [(r.quality, r.url, f'主播: {r.name}' if r.name else '')
+                                   for r in room_catalog.rooms(paused=False) if is_supported_url(r.url)]
+            if cluster_node is None:
+                cluster_node = ClusterNode(
+                    LeaseStore(cluster_db_path, cluster_node_id or default_node_id()),
+                    video_save_path or default_path, busy=lambda u: u in recording_urls)
+            cluster_node.set_rooms(url_tuple[1] for url_tuple in url_tuples_list)
+            cluster_node.start()
 
         text_no_repeat_url = list(set(url_tuples_list))
 
+        if first_run:
+            startup_tasks.mark('讀取配置')
         if len(text_no_repeat_url) > 0:
+            start_delay = 0
             for url_tuple in text_no_repeat_url:
                 monitoring = len(running_list)
 
                 if url_tuple[1] in not_record_list:
                     continue
 
+                if cluster_node is not None and url_tuple[1] not in cluster_node.owned:
+                    continue
+
                 if url_tuple[1] not in running_list:
                     print(f"\r{'新增' if not first_start else '傳入'}地址: {url_tuple[1]}")
                     monitoring += 1
-                    args = [url_tuple, monitoring]
+                    args = [url_tuple, monitoring, start_delay]
                     create_var[f'thread_{monitoring}'] = threading.Thread(target=start_record, args=args)
                     create_var[f'thread_{monitoring}'].daemon = True
                     create_var[f'thread_{monitoring}'].start()
-                    running_list.append(url_tuple[1])
-                    time.sleep(local_delay_default)
+                    running_list.add(url_tuple[1])
+                    start_delay += local_delay_default
+        if enable_push_watch:
+            if push_watcher is None:
+                push_watcher = PushWatcher()
+                push_watcher.start()
+            push_watcher.set_rooms(url for url in running_list if not room_released(url))
         url_tuples_list = []
         first_start = False
 
@@ -2743,6 +3075,8 @@ while True:
         logger.error(f"錯誤資訊: {err} 發生錯誤的行數: {err.__traceback__.tb_lineno}")
 
     if first_run:
+        startup_tasks.mark('啟動直播間監控')
+        print(f"\r{startup_tasks.report()}")
         t = threading.Thread(target=display_info, args=(), daemon=True)
         t.start()
         t2 = threading.Thread(target=adjust_max_request, args=(), daemon=True)
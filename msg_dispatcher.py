@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Deliver push notifications from one background event loop.
+"""
+import asyncio
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+Sender = Callable[[httpx.AsyncClient], Awaitable[Dict[str, Any]]]
+
+# channel -> [(max messages, period in seconds), ...]
+CHANNEL_RATE_LIMITS = {
+    '釘釘': [(20, 60)],
+    'TG': [(1, 1), (20, 60)],
+}
+
+# channels that went through urllib's default opener, which follows the system and environment proxies;
+# the others used an opener without proxies
+SYSTEM_PROXY_CHANNELS = {'TG'}
+
+
+class RateLimit:
+    """Sliding window limit, only used from the dispatcher loop"""
+
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+            if len(self._calls) < self.max_calls:
+                self._calls.append(now)
+                return
+            await asyncio.sleep(self.period - (now - self._calls[0]))
+
+
+class PushCoalescer:
+    """
+    Collect status pushes for ``window`` seconds and hand them over as one message.
+
+    A room that goes back to its last delivered state inside the window (online -> offline -> online)
+    produces nothing. With a window of 0 every push is delivered immediately.
+    """
+
+    def __init__(self, deliver: Callable[[str, str, str], None], window: float = 0):
+        self.deliver = deliver
+        self.window = window
+        self._pending: Dict[str, tuple[bool, str, str]] = {}
+        self._delivered: Dict[str, bool] = {}
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    def add(self, record_name: str, live_url: str, content: str, is_live: bool) -> None:
+        with self._lock:
+            if self.window > 0:
+                pending = self._pending.get(record_name)
+                if pending and pending[0] != is_live and self._delivered.get(record_name, False) == is_live:
+                    del self._pending[record_name]
+                    return
+                self._pending[record_name] = (is_live, live_url, content)
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            self._delivered[record_name] = is_live
+        self.deliver(record_name, live_url, content)
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
+            for record_name, (is_live, _, _) in pending.items():
+                self._delivered[record_name] = is_live
+
+        if len(pending) == 1:
+            record_name, (_, live_url, content) = pending.popitem()
+            self.deliver(record_name, live_url, content)
+        elif pending:
+            content = '\n'.join(item[2] for item in pending.values())
+            self.deliver(f'{len(pending)}個直播間', '', content)
+
+
+class PushDispatcher:
+    """
+    Bounded queue of push jobs served by a few workers on a dedicated event loop.
+
+    A job maps channel names to senders; the channels of one job are pushed concurrently, every channel
+    keeps its own pooled client and rate limits, and a channel that fails completely is retried with
+    exponential backoff.
+    """
+
+    def __init__(self, max_queue: int = 500, workers: int = 4, retries: int = 2, backoff: float = 2.0,
+                 timeout: int = 15, rate_limits: Dict[str, list] | None = None):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limits = CHANNEL_RATE_LIMITS if rate_limits is None else rate_limits
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limits: Dict[str, list[RateLimit]] = {}
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._loop:
+                return
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._run, name='push-dispatcher', daemon=True).start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue(self.max_queue)
+        for _ in range(self.workers):
+            self._loop.create_task(self._worker())
+        self._loop.call_soon(self._ready.set)
+        self._loop.run_forever()
+
+    def submit(self, record_name: str, senders: Dict[str, Sender]) -> None:
+        """Queue a job from any thread; returns immediately"""
+        if not senders:
+            return
+        self.start()
+        self._loop.call_soon_threadsafe(self._enqueue, record_name, senders)
+
+    def _enqueue(self, record_name: str, senders: Dict[str, Sender]) -> None:
+        try:
+            self._queue.put_nowait((record_name, senders))
+        except asyncio.QueueFull:
+            print(f'推送佇列已滿({self.max_queue}), 已丟棄[{record_name}]的直播狀態推送')
+
+    def _client(self, channel: str) -> httpx.AsyncClient:
+        client = self._clients.get(channel)
+        if client is None:
+            if channel in SYSTEM_PROXY_CHANNELS:
+                # getproxies also reads the Windows registry and macOS settings, which httpx alone does not
+                proxies = urllib.request.getproxies()
+                proxy = proxies.get('https') or proxies.get('all')
+                client = httpx.AsyncClient(timeout=self.timeout, proxy=proxy, trust_env=True)
+            else:
+                client = httpx.AsyncClient(timeout=self.timeout, trust_env=False)
+            self._clients[channel] = client
+        return client
+
+    async def _throttle(self, channel: str) -> None:
+        if channel not in self._limits:
+            self._limits[channel] = [RateLimit(*limit) for limit in self.rate_limits.get(channel, [])]
+        for limit in self._limits[channel]:
+            await limit.acquire()
+
+    async def _worker(self) -> None:
+        while True:
+            record_name, senders = await self._queue.get()
+            try:
+                await asyncio.gather(*(self._send(record_name, channel, sender) for channel, sender in senders.items()))
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, record_name: str, channel: str, sender: Sender) -> None:
+        result = None
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                await self._throttle(channel)
+                result = await sender(self._client(channel))
+                error = None
+            except Exception as e:
+                result, error = None, e
+            if result and (result['success'] or not result['error']):
+                break
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        if result:
+            print(f'提示資訊：已經將[{record_name}]直播狀態訊息推送至你的{channel},'
+                  f' 成功{len(result["success"])}, 失敗{len(result["error"])}')
+        else:
+            print(f'直播訊息推送到{channel}失敗: {error}')
@@ -13,6 +13,7 @@ import base64
 import urllib.request
 import urllib.error
 import smtplib
+import threading
 from email.header import Header
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -22,23 +23,82 @@ opener = urllib.request.build_opener(no_proxy_handler)
 headers: Dict[str, str] = {'Content-Type': 'application/json'}
 
 
+def split_api(url: str) -> list:
+    return url.replace('，', ',').split(',') if url.strip() else []
+
+
+def dingtalk_payload(content: str, number: str = None, is_atall: bool = False) -> Dict[str, Any]:
+    return {
+        'msgtype': 'text',
+        'text': {
+            'content': content,
+        },
+        "at": {
+            "atMobiles": [
+                number
+            ],
+            "isAtAll": is_atall
+        },
+    }
+
+
+def bark_payload(title: str, content: str, level: str = "active", badge: int = 1, auto_copy: int = 1,
+                 sound: str = "", icon: str = "", group: str = "", is_archive: int = 1,
+                 url: str = "") -> Dict[str, Any]:
+    return {
+        "title": title,
+        "body": content,
+        "level": level,
+        "badge": badge,
+        "autoCopy": auto_copy,
+        "sound": sound,
+        "icon": icon,
+        "group": group,
+        "isArchive": is_archive,
+        "url": url
+    }
+
+
+def ntfy_payload(topic: str, title: str, content: str, tags: list, priority: int = 3, action_url: str = "",
+                 attach: str = "", filename: str = "", click: str = "", icon: str = "", delay: str = "",
+                 email: str = "", call: str = "") -> Dict[str, Any]:
+    actions = [{"action": "view", "label": "view live", "url": action_url}] if action_url else []
+    return {
+        "topic": topic,
+        "title": title,
+        "message": content,
+        "tags": tags,
+        "priority": priority,
+        "attach": attach,
+        "filename": filename,
+        "click": click,
+        "actions": actions,
+        "markdown": False,
+        "icon": icon,
+        "delay": delay,
+        "email": email,
+        "call": call
+    }
+
+
+def build_email(sender_email: str, sender_name: str, receivers: list, title: str, content: str) -> MIMEMultipart:
+    message = MIMEMultipart()
+    send_name = base64.b64encode(sender_name.encode("utf-8")).decode()
+    message['From'] = f'=?UTF-8?B?{send_name}?= <{sender_email}>'
+    message['Subject'] = Header(title, 'utf-8')
+    if len(receivers) == 1:
+        message['To'] = receivers[0]
+
+    t_apart = MIMEText(content, 'plain', 'utf-8')
+    message.attach(t_apart)
+    return message
+
+
 def dingtalk(url: str, content: str, number: str = None, is_atall: bool = False) -> Dict[str, Any]:
     success = []
     error = []
-    api_list = url.replace('，', ',').split(',') if url.strip() else []
-    for api in api_list:
-        json_data = {
-            'msgtype': 'text',
-            'text': {
-                'content': content,
-            },
-            "at": {
-                "atMobiles": [
-                    number
-                ],
-                "isAtAll": is_atall
-            },
-        }
+    for api in split_api(url):
+        json_data = dingtalk_payload(content, number, is_atall)
         try:
             data = json.dumps(json_data).encode('utf-8')
             req = urllib.request.Request(api, data=data, headers=headers)
@@ -59,8 +119,7 @@ def dingtalk(url: str, content: str, number: str = None, is_atall: bool = False)
 def xizhi(url: str, title: str, content: str) -> Dict[str, Any]:
     success = []
     error = []
-    api_list = url.replace('，', ',').split(',') if url.strip() else []
-    for api in api_list:
+    for api in split_api(url):
         json_data = {
             'title': title,
             'content': content
@@ -84,19 +143,10 @@ def xizhi(url: str, title: str, content: str) -> Dict[str, Any]:
 
 def send_email(email_host: str, login_email: str, email_pass: str, sender_email: str, sender_name: str,
                to_email: str, title: str, content: str, smtp_port: str = None, open_ssl: bool = True) -> Dict[str, Any]:
-    receivers = to_email.replace('，', ',').split(',') if to_email.strip() else []
+    receivers = split_api(to_email)
 
     try:
-        message = MIMEMultipart()
-        send_name = base64.b64encode(sender_name.encode("utf-8")).decode()
-        message['From'] = f'=?UTF-8?B?{send_name}?= <{sender_email}>'
-        message['Subject'] = Header(title, 'utf-8')
-        if len(receivers) == 1:
-            message['To'] = receivers[0]
-
-        t_apart = MIMEText(content, 'plain', 'utf-8')
-        message.attach(t_apart)
-
+        message = build_email(sender_email, sender_name, receivers, title, content)
         if open_ssl:
             smtp_port = int(smtp_port) or 465
             smtp_obj = smtplib.SMTP_SSL(email_host, smtp_port)
@@ -134,20 +184,8 @@ def bark(api: str, title: str = "message", content: str = 'test', level: str = "
          is_archive: int = 1, url: str = "") -> Dict[str, Any]:
     success = []
     error = []
-    api_list = api.replace('，', ',').split(',') if api.strip() else []
-    for _api in api_list:
-        json_data = {
-            "title": title,
-            "body": content,
-            "level": level,
-            "badge": badge,
-            "autoCopy": auto_copy,
-            "sound": sound,
-            "icon": icon,
-            "group": group,
-            "isArchive": is_archive,
-            "url": url
-        }
+    for _api in split_api(api):
+        json_data = bark_payload(title, content, level, badge, auto_copy, sound, icon, group, is_archive, url)
         try:
             data = json.dumps(json_data).encode('utf-8')
             req = urllib.request.Request(_api, data=data, headers=headers)
@@ -170,27 +208,11 @@ def ntfy(api: str, title: str = "message", content: str = 'test', tags: str = 't
          delay: str = "", email: str = "", call: str = "") -> Dict[str, Any]:
     success = []
     error = []
-    api_list = api.replace('，', ',').split(',') if api.strip() else []
     tags = tags.replace('，', ',').split(',') if tags else ['partying_face']
-    actions = [{"action": "view", "label": "view live", "url": action_url}] if action_url else []
-    for _api in api_list:
+    for _api in split_api(api):
         server, topic = _api.rsplit('/', maxsplit=1)
-        json_data = {
-            "topic": topic,
-            "title": title,
-            "message": content,
-            "tags": tags,
-            "priority": priority,
-            "attach": attach,
-            "filename": filename,
-            "click": click,
-            "actions": actions,
-            "markdown": False,
-            "icon": icon,
-            "delay": delay,
-            "email": email,
-            "call": call
-        }
+        json_data = ntfy_payload(topic, title, content, tags, priority, action_url, attach, filename, click, icon,
+                                 delay, email, call)
 
         try:
             data = json.dumps(json_data, ensure_ascii=False).encode('utf-8')
@@ -213,6 +235,155 @@ def ntfy(api: str, title: str = "message", content: str = 'test', tags: str = 't
     return {"success": success, "error": error}
 
 
+class SmtpSession:
+    """Keep one logged-in SMTP connection and reconnect when the server drops it"""
+
+    def __init__(self, email_host: str, login_email: str, email_pass: str, smtp_port: str = None,
+                 open_ssl: bool = True, timeout: int = 15):
+        self.email_host = email_host
+        self.login_email = login_email
+        self.email_pass = email_pass
+        self.open_ssl = open_ssl
+        self.smtp_port = int(smtp_port or 0) or (465 if open_ssl else 25)
+        self.timeout = timeout
+        self._smtp = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.open_ssl:
+            smtp_obj = smtplib.SMTP_SSL(self.email_host, self.smtp_port, timeout=self.timeout)
+        else:
+            smtp_obj = smtplib.SMTP(self.email_host, self.smtp_port, timeout=self.timeout)
+        smtp_obj.login(self.login_email, self.email_pass)
+        return smtp_obj
+
+    def close(self) -> None:
+        with self._lock:
+            if self._smtp:
+                try:
+                    self._smtp.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._smtp = None
+
+    def send(self, sender_email: str, sender_name: str, to_email: str, title: str, content: str) -> Dict[str, Any]:
+        receivers = split_api(to_email)
+        message = build_email(sender_email, sender_name, receivers, title, content).as_string()
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._smtp is None:
+                        self._smtp = self._connect()
+                    self._smtp.sendmail(sender_email, receivers, message)
+                    return {"success": receivers, "error": []}
+                except smtplib.SMTPAuthenticationError as e:
+                    self._smtp = None
+                    print(f'郵件推送失敗, 推送郵箱：{to_email}, 錯誤資訊:{e}')
+                    break
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                    # stale connection, log in again once before giving up
+                    self._smtp = None
+                    if attempt:
+                        print(f'郵件推送失敗, 推送郵箱：{to_email}, 錯誤資訊:{e}')
+                except smtplib.SMTPException as e:
+                    print(f'郵件推送失敗, 推送郵箱：{to_email}, 錯誤資訊:{e}')
+                    break
+        return {"success": [], "error": receivers}
+
+
+async def _post_json(client, api: str, json_data: dict, ensure_ascii: bool = True) -> dict:
+    data = json.dumps(json_data, ensure_ascii=ensure_ascii).encode('utf-8')
+    response = await client.post(api, content=data, headers=headers)
+    return response.json()
+
+
+async def dingtalk_async(client, url: str, content: str, number: str = None,
+                         is_atall: bool = False) -> Dict[str, Any]:
+    success = []
+    error = []
+    for api in split_api(url):
+        try:
+            json_data = await _post_json(client, api, dingtalk_payload(content, number, is_atall))
+            if json_data['errcode'] == 0:
+                success.append(api)
+            else:
+                error.append(api)
+                print(f'釘釘推送失敗, 推送地址：{api}, {json_data["errmsg"]}')
+        except Exception as e:
+            error.append(api)
+            print(f'釘釘推送失敗, 推送地址：{api}, 錯誤資訊:{e}')
+    return {"success": success, "error": error}
+
+
+async def xizhi_async(client, url: str, title: str, content: str) -> Dict[str, Any]:
+    success = []
+    error = []
+    for api in split_api(url):
+        try:
+            json_data = await _post_json(client, api, {'title': title, 'content': content})
+            if json_data['code'] == 200:
+                success.append(api)
+            else:
+                error.append(api)
+                print(f'微信推送失敗, 推送地址：{api}, 失敗資訊：{json_data["msg"]}')
+        except Exception as e:
+            error.append(api)
+            print(f'微信推送失敗, 推送地址：{api}, 錯誤資訊:{e}')
+    return {"success": success, "error": error}
+
+
+async def tg_bot_async(client, chat_id: int, token: str, content: str) -> Dict[str, Any]:
+    try:
+        url = f'https://api.telegram.org/bot{token}/sendMessage'
+        json_data = await _post_json(client, url, {"chat_id": chat_id, 'text': content})
+        if json_data.get('ok'):
+            return {"success": [1], "error": []}
+        print(f'tg推送失敗, 聊天ID：{chat_id}, 錯誤資訊:{json_data.get("description")}')
+    except Exception as e:
+        print(f'tg推送失敗, 聊天ID：{chat_id}, 錯誤資訊:{e}')
+    return {"success": [], "error": [1]}
+
+
+async def bark_async(client, api: str, title: str = "message", content: str = 'test', level: str = "active",
+                     sound: str = "") -> Dict[str, Any]:
+    success = []
+    error = []
+    for _api in split_api(api):
+        try:
+            json_data = await _post_json(client, _api, bark_payload(title, content, level=level, sound=sound))
+            if json_data['code'] == 200:
+                success.append(_api)
+            else:
+                error.append(_api)
+                print(f'Bark推送失敗, 推送地址：{_api}, 失敗資訊：{json_data["message"]}')
+        except Exception as e:
+            error.append(_api)
+            print(f'Bark推送失敗, 推送地址：{_api}, 錯誤資訊:{e}')
+    return {"success": success, "error": error}
+
+
+async def ntfy_async(client, api: str, title: str = "message", content: str = 'test', tags: str = 'tada',
+                     action_url: str = "", email: str = "") -> Dict[str, Any]:
+    success = []
+    error = []
+    tags = tags.replace('，', ',').split(',') if tags else ['partying_face']
+    for _api in split_api(api):
+        server, topic = _api.rsplit('/', maxsplit=1)
+        try:
+            json_data = await _post_json(
+                client, server, ntfy_payload(topic, title, content, tags, action_url=action_url, email=email),
+                ensure_ascii=False)
+            if "error" not in json_data:
+                success.append(_api)
+            else:
+                error.append(_api)
+                print(f'ntfy推送失敗, 推送地址：{_api}, 失敗資訊：{json_data["error"]}')
+        except Exception as e:
+            error.append(_api)
+            print(f'ntfy推送失敗, 推送地址：{_api}, 錯誤資訊:{e}')
+    return {"success": success, "error": error}
+
+
 if __name__ == '__main__':
     send_title = '直播通知'  # 標題
     send_content = '張三 開播了！'  # 推送內容
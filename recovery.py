@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Fast re-probe schedule for a room whose recording just ended.
+"""
+import math
+import time
+
+
+class RecoverySchedule:
+    """
+    Probe delays after a recording ended: at once, then 1, 2, 4 and 8 seconds, repeating the last delay until
+    ``window`` seconds have passed. A streamer who reconnects within the window is picked up within seconds
+    instead of after the normal loop delay.
+    """
+
+    def __init__(self, window: float, delays: tuple[int, ...] = (0, 1, 2, 4, 8)):
+        self.window = window
+        self.delays = delays
+        self.started = time.monotonic()
+        self.probes = 0
+
+    def expired(self, now: float | None = None) -> bool:
+        return (time.monotonic() if now is None else now) - self.started >= self.window
+
+    def next_delay(self, now: float | None = None) -> int | None:
+        """Seconds to wait before the next probe, None once the window is over"""
+        now = time.monotonic() if now is None else now
+        if self.expired(now):
+            return None
+        delay = self.delays[min(self.probes, len(self.delays) - 1)]
+        self.probes += 1
+        return math.ceil(min(delay, self.window - (now - self.started)))
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Prune or archive old recordings by per-streamer and per-platform retention policies.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from storage import segment_prefix
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class RetentionPolicy(NamedTuple):
+    days: float | None = None
+    gb: float | None = None
+    last: int | None = None
+
+
+def parse_policies(text: str) -> dict[str, RetentionPolicy]:
+    """
+    Parse ``範圍:規則;範圍:規則``, e.g. ``*:days=30;抖音:gb=200;主播名:last=10,days=7``.
+
+    The scope is ``*``, a platform name or a streamer name; rules are days=, gb= and last=.
+    """
+    policies = {}
+    for item in text.replace('；', ';').split(';'):
+        if ':' not in item and '：' not in item:
+            continue
+        scope, rules = item.replace('：', ':').split(':', 1)
+        values = {}
+        for rule in rules.replace('，', ',').split(','):
+            key, _, value = rule.partition('=')
+            key, value = key.strip().lower(), value.strip()
+            if key in ('days', 'gb') and value:
+                values[key] = float(value)
+            elif key == 'last' and value:
+                values[key] = int(value)
+        if values:
+            policies[scope.strip()] = RetentionPolicy(**values)
+    return policies
+
+
+class Broadcast(NamedTuple):
+    path: str
+    room: str
+    platform: str
+    started: datetime.datetime
+
+
+def broadcast_files(path: str, names: list[str]) -> list[str]:
+    """Files of one recording: its segments, or the file plus its conversions and subtitles"""
+    prefix = segment_prefix(path)
+    if prefix is None:
+        prefix = os.path.splitext(os.path.basename(path))[0] + '.'
+    return [name for name in names if name.startswith(prefix)]
+
+
+def exclusive_lock(path: str):
+    """
+    Take a non-blocking lock that this process holds until it exits. Returns the open lock file, or None
+    while another process (a supervisor worker, or another node started from the same directory) holds it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock_file = open(path, 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+class RetentionEngine:
+    """
+    Background pruning of finished recordings, oldest first.
+
+    Recordings are known from the storage ledger, which is read incrementally from the last offset, so no
+    save directory is ever walked; only the directories of candidate recordings are listed once per pass.
+    ``days`` and ``last`` apply to every streamer separately, ``gb`` to everything the scope covers. A streamer
+    rule overrides its platform rule, which overrides ``*``. Files are deleted or moved to ``archive_dir``
+    with copies to another disk limited to ``rate_mb`` MB/s.
+
+    Only one process should run the engine over a ledger. ``is_active`` knows that process's own recordings;
+    a recording with a file written in the last ``active_seconds`` is treated as running in another process,
+    and the paths returned by ``held`` (fragments waiting to be stitched) are never touched either.
+    """
+
+    def __init__(self, ledger_path: str, state_path: str, is_active: Callable[[str], bool] = lambda path: False,
+                 held: Callable[[], set[str]] = set, active_seconds: float = 600):
+        self.ledger_path = ledger_path
+        self.state_path = state_path
+        self.is_active = is_active
+        self.held = held
+        self.active_seconds = active_seconds
+        self.policies: dict[str, RetentionPolicy] = {}
+        self.action = 'delete'
+        self.archive_dir = ''
+        self.rate_mb = 50.0
+        self.interval = 600
+        self._offset = 0
+        self._broadcasts: dict[str, Broadcast] = {}
+        self._running = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._wake = threading.Event()
+        self._load_state()
+
+    def configure(self, policies: dict[str, RetentionPolicy], action: str = 'delete', archive_dir: str = '',
+                  rate_mb: float = 50.0) -> None:
+        self.policies = policies
+        self.action = 'archive' if action == 'archive' and archive_dir else 'delete'
+        self.archive_dir = archive_dir
+        self.rate_mb = max(rate_mb, 1.0)
+
+    def _load_state(self) -> None:
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            self._offset = state['offset']
+            self._broadcasts = {b[0]: Broadcast(b[0], b[1], b[2], datetime.datetime.strptime(b[3], TIME_FORMAT))
+                                for b in state['broadcasts']}
+        except (OSError, ValueError, KeyError, IndexError):
+            self._offset, self._broadcasts = 0, {}
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f'{self.state_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'offset': self._offset, 'broadcasts': [
+                [b.path, b.room, b.platform, b.started.strftime(TIME_FORMAT)] for b in self._broadcasts.values()]},
+                f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def refresh(self) -> int:
+        """Index the recordings appended to the ledger since the last call"""
+        try:
+            with open(self.ledger_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < self._offset:
+                    self._offset = 0
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return 0
+        end = data.rfind(b'\n') + 1
+        added = 0
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+                started = datetime.datetime.strptime(record['time'], TIME_FORMAT)
+            except (ValueError, KeyError):
+                continue
+            self._broadcasts[record['path']] = Broadcast(record['path'], record.get('room', ''),
+                                                         record.get('platform', ''), started)
+            added += 1
+        self._offset += end
+        return added
+
+    def _scope(self, broadcast: Broadcast) -> str | None:
+        if broadcast.room in self.policies:
+            return broadcast.room
+        for scope in self.policies:
+            if scope != '*' and scope and scope in broadcast.platform:
+                return scope
+        return '*' if '*' in self.policies else None
+
+    def plan(self, now: datetime.datetime | None = None, sizes: Callable[[Broadcast], int] | None = None,
+             busy: Callable[[Broadcast], bool] | None = None) -> list[Broadcast]:
+        """Finished recordings that break a policy, oldest first"""
+        now = now or datetime.datetime.now()
+        busy = busy or (lambda b: self.is_active(b.path))
+        groups: dict[str, list[Broadcast]] = {}
+        for broadcast in self._broadcasts.values():
+            if busy(broadcast):
+                continue
+            scope = self._scope(broadcast)
+            if scope is not None:
+                groups.setdefault(scope, []).append(broadcast)
+
+        expired = {}
+        for scope, broadcasts in groups.items():
+            policy = self.policies[scope]
+            broadcasts.sort(key=lambda b: b.started)
+            broadcasts.reverse()  # newest first, ties keep the ledger order
+            per_room: dict[str, int] = {}
+            kept_bytes = 0
+            for broadcast in broadcasts:
+                position = per_room[broadcast.room] = per_room.get(broadcast.room, 0) + 1
+                if policy.days is not None and now - broadcast.started > datetime.timedelta(days=policy.days):
+                    expired[broadcast.path] = broadcast
+                elif policy.last is not None and position > policy.last:
+                    expired[broadcast.path] = broadcast
+                elif policy.gb is not None and sizes is not None:
+                    kept_bytes += sizes(broadcast)
+                    if kept_bytes > policy.gb * 1024 ** 3:
+                        expired[broadcast.path] = broadcast
+        return sorted(expired.values(), key=lambda b: b.started)
+
+    def _throttle(self, size: int) -> None:
+        time.sleep(size / (self.rate_mb * 1024 * 1024))
+
+    def _move(self, source: str, target: str) -> None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.rename(source, target)
+            return
+        except OSError:
+            pass
+        # different disk: copy in chunks at the configured rate, then remove the original
+        chunk = 1024 * 1024
+        with open(source, 'rb') as src, open(target + '.part', 'wb') as dst:
+            for block in iter(lambda: src.read(chunk), b''):
+                dst.write(block)
+                self._throttle(len(block))
+        os.replace(target + '.part', target)
+        os.remove(source)
+
+    def _remove(self, broadcast: Broadcast, names: list[str], action: str) -> int:
+        directory = os.path.dirname(broadcast.path)
+        freed = 0
+        for name in broadcast_files(broadcast.path, names):
+            file_path = os.path.join(directory, name)
+            try:
+                size = os.path.getsize(file_path)
+                if action == 'archive':
+                    self._move(file_path, os.path.join(self.archive_dir, broadcast.platform, broadcast.room, name))
+                else:
+                    os.remove(file_path)
+                freed += size
+                names.remove(name)
+            except OSError as e:
+                print(f'保留策略處理檔案失敗: {file_path} {e}')
+        del self._broadcasts[broadcast.path]
+        return freed
+
+    def run_once(self, free_bytes: Callable[[], int] | None = None) -> int:
+        """
+        One pass: index new recordings, then prune what the policies reject. With ``free_bytes`` (bytes still
+        to free, <= 0 when done) the oldest recordings are also deleted until enough space is free; these are
+        deleted at once, since archiving to the same disk would free nothing.
+
+        Only copies to an archive on another disk are rate limited. A call made while another pass is running
+        does not wait for it: it returns 0 and the running thread makes one more pass afterwards.
+        """
+        if not self._running.acquire(blocking=False):
+            self.wake()
+            return 0
+        try:
+            self.refresh()
+            listings: dict[str, list[str]] = {}
+
+            def names(broadcast: Broadcast) -> list[str]:
+                directory = os.path.dirname(broadcast.path)
+                if directory not in listings:
+                    try:
+                        listings[directory] = os.listdir(directory)
+                    except OSError:
+                        listings[directory] = []
+                return listings[directory]
+
+            def stats(broadcast: Broadcast) -> list[os.stat_result]:
+                directory = os.path.dirname(broadcast.path)
+                results = []
+                for name in broadcast_files(broadcast.path, names(broadcast)):
+                    try:
+                        results.append(os.stat(os.path.join(directory, name)))
+                    except OSError:
+                        pass
+                return results
+
+            def sizes(broadcast: Broadcast) -> int:
+                return sum(stat.st_size for stat in stats(broadcast))
+
+            held = self.held()
+            written_after = time.time() - self.active_seconds
+
+            def busy(broadcast: Broadcast) -> bool:
+                return (self.is_active(broadcast.path) or broadcast.path in held
+                        or any(stat.st_mtime > written_after for stat in stats(broadcast)))
+
+            freed = 0
+            for broadcast in self.plan(sizes=sizes, busy=busy):
+                freed += self._remove(broadcast, names(broadcast), self.action)
+
+            if free_bytes is not None:
+                oldest = sorted((b for b in self._broadcasts.values() if not busy(b)), key=lambda b: b.started)
+                for broadcast in oldest:
+                    if free_bytes() <= 0:
+                        break
+                    freed += self._remove(broadcast, names(broadcast), 'delete')
+
+            # forget recordings whose files are all gone
+            for broadcast in list(self._broadcasts.values()):
+                if not busy(broadcast) and not broadcast_files(broadcast.path, names(broadcast)):
+                    del self._broadcasts[broadcast.path]
+            self._save_state()
+            return freed
+        finally:
+            self._running.release()
+
+    def start(self, interval: int = 600, free_bytes: Callable[[], int] | None = None) -> None:
+        self.interval = interval
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(free_bytes,), name='retention', daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        """Run the next pass now, e.g. when a disk crossed its threshold"""
+        self._wake.set()
+
+    def _run(self, free_bytes: Callable[[], int] | None) -> None:
+        while True:
+            try:
+                freed = self.run_once(free_bytes)
+                if freed:
+                    print(f'保留策略已處理{freed / 1024 ** 3:.2f}GB的舊錄製檔案')
+            except Exception as e:
+                print(f'保留策略執行錯誤: {e}')
+            self._wake.wait(self.interval)
+            self._wake.clear()
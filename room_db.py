@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Optional SQLite room catalog replacing URL_config.ini for large room lists.
+"""
+import datetime
+import sqlite3
+import threading
+import urllib.parse
+from typing import NamedTuple
+
+from url_catalog import UrlCatalog, parse_line
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('rev', 0);
+
+CREATE TABLE IF NOT EXISTS rooms (
+    url TEXT PRIMARY KEY,
+    quality TEXT NOT NULL DEFAULT '原畫',
+    name TEXT NOT NULL DEFAULT '',
+    platform TEXT NOT NULL DEFAULT '',
+    paused INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    last_live TEXT,
+    live_count INTEGER NOT NULL DEFAULT 0,
+    rev INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS rooms_rev ON rooms (rev);
+CREATE INDEX IF NOT EXISTS rooms_platform ON rooms (platform, paused);
+
+-- every edit of the scheduling columns, by this program or by hand, moves the room to a new revision
+CREATE TRIGGER IF NOT EXISTS rooms_insert_rev AFTER INSERT ON rooms BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'rev';
+    UPDATE rooms SET rev = (SELECT value FROM meta WHERE key = 'rev') WHERE rowid = NEW.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS rooms_update_rev AFTER UPDATE OF url, quality, name, paused, deleted ON rooms BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'rev';
+    UPDATE rooms SET rev = (SELECT value FROM meta WHERE key = 'rev') WHERE rowid = NEW.rowid;
+END;
+"""
+
+
+class Room(NamedTuple):
+    url: str
+    quality: str
+    name: str
+    platform: str
+    paused: bool
+    deleted: bool
+    last_live: str | None
+    live_count: int
+    rev: int
+
+
+_ROOM_COLUMNS = 'url, quality, name, platform, paused, deleted, last_live, live_count, rev'
+
+
+def _platform(url: str) -> str:
+    url = url if '://' in url else 'https://' + url
+    return urllib.parse.urlsplit(url).hostname or ''
+
+
+def _room(row: tuple) -> Room:
+    url, quality, name, platform, paused, deleted, last_live, live_count, rev = row
+    return Room(url, quality, name, platform, bool(paused), bool(deleted), last_live, live_count, rev)
+
+
+class RoomCatalog:
+    """
+    Rooms stored in SQLite (WAL mode) instead of URL_config.ini.
+
+    Each change to the url, quality, name, paused or deleted columns gets a new revision from a trigger,
+    so the scheduler only asks for rows newer than the last revision it saw instead of re-reading the list.
+    Removal is a soft delete (deleted = 1) so that it reaches the scheduler like any other change.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM rooms WHERE deleted = 0').fetchone()[0]
+
+    def revision(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'rev'").fetchone()[0]
+
+    def changes(self, since: int = 0) -> tuple[int, list[Room]]:
+        """Rooms changed after revision ``since`` and the revision to pass next time"""
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {_ROOM_COLUMNS} FROM rooms WHERE rev > ? ORDER BY rev', (since,)).fetchall()
+        rooms = [_room(row) for row in rows]
+        return (rooms[-1].rev if rooms else since), rooms
+
+    def get(self, url: str) -> Room | None:
+        with self._lock:
+            row = self._conn.execute(f'SELECT {_ROOM_COLUMNS} FROM rooms WHERE url = ?', (url,)).fetchone()
+        return _room(row) if row else None
+
+    def rooms(self, platform: str | None = None, paused: bool | None = None,
+              include_deleted: bool = False) -> list[Room]:
+        conditions, params = [], []
+        if not include_deleted:
+            conditions.append('deleted = 0')
+        if platform is not None:
+            conditions.append('platform = ?')
+            params.append(platform)
+        if paused is not None:
+            conditions.append('paused = ?')
+            params.append(int(paused))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._lock:
+            rows = self._conn.execute(f'SELECT {_ROOM_COLUMNS} FROM rooms{where} ORDER BY rowid', params).fetchall()
+        return [_room(row) for row in rows]
+
+    def upsert(self, url: str, quality: str = '原畫', name: str = '', paused: bool = False) -> None:
+        with self._lock:
+            self._upsert(url, quality, name, paused)
+
+    def _upsert(self, url: str, quality: str, name: str, paused: bool) -> None:
+        self._conn.execute(
+            'INSERT INTO rooms (url, quality, name, platform, paused) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(url) DO UPDATE SET quality = excluded.quality, name = excluded.name, '
+            'paused = excluded.paused, deleted = 0 '
+            'WHERE quality != excluded.quality OR name != excluded.name OR paused != excluded.paused OR deleted',
+            (url, quality, name, _platform(url), int(paused)))
+
+    def set_paused(self, url: str, paused: bool = True) -> None:
+        with self._lock:
+            self._conn.execute('UPDATE rooms SET paused = ? WHERE url = ? AND paused != ?',
+                               (int(paused), url, int(paused)))
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute('UPDATE rooms SET deleted = 1 WHERE url = ? AND deleted = 0', (url,))
+
+    def set_name(self, url: str, name: str) -> None:
+        with self._lock:
+            self._conn.execute('UPDATE rooms SET name = ? WHERE url = ? AND name != ?', (name, url, name))
+
+    def mark_live(self, url: str) -> None:
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self._conn.execute('UPDATE rooms SET last_live = ?, live_count = live_count + 1 WHERE url = ?',
+                               (now, url))
+
+    def import_ini(self, ini_path: str, encoding: str = 'utf-8-sig', default_quality: str = '原畫') -> int:
+        """Load the rooms of a URL_config.ini; commented lines become paused rooms"""
+        catalog = UrlCatalog.load(ini_path, encoding, default_quality)
+        rooms = [e for e in catalog.entries if e.url]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for e in rooms:
+                    url = e.url if '://' in e.url else 'https://' + e.url
+                    self._upsert(url, e.quality, e.name.replace('主播:', '').strip(), e.is_comment)
+                self._conn.execute('COMMIT')
+            except sqlite3.Error:
+                self._conn.execute('ROLLBACK')
+                raise
+        return len(rooms)
+
+    def export_ini(self, ini_path: str, encoding: str = 'utf-8-sig') -> int:
+        """Write the rooms back in URL_config.ini format, paused rooms commented out"""
+        rooms = self.rooms()
+        with open(ini_path, 'w', encoding=encoding) as f:
+            for room in rooms:
+                line = f"{room.quality},{room.url}" + (f",主播: {room.name}" if room.name else '')
+                f.write(f"{'#' if room.paused else ''}{line}\n")
+        return len(rooms)
+
+
+def parse_room_line(line: str, default_quality: str = '原畫') -> tuple[str, str, str]:
+    """(quality, url, anchor name) of a line in URL_config.ini format"""
+    quality, url, name, _ = parse_line(line.strip(), default_quality)
+    return quality, url, name.replace('主播:', '').strip()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Import or export the room database')
+    parser.add_argument('action', choices=['import', 'export', 'list'])
+    parser.add_argument('db', help='room database, e.g. config/rooms.db')
+    parser.add_argument('ini', nargs='?', default='config/URL_config.ini')
+    parser.add_argument('--platform', help='only list rooms of this host')
+    args = parser.parse_args()
+
+    room_catalog = RoomCatalog(args.db)
+    if args.action == 'import':
+        print(f'imported {room_catalog.import_ini(args.ini)} rooms from {args.ini}')
+    elif args.action == 'export':
+        print(f'exported {room_catalog.export_ini(args.ini)} rooms to {args.ini}')
+    else:
+        for r in room_catalog.rooms(platform=args.platform):
+            print(f"{'#' if r.paused else ' '} {r.quality} {r.url} {r.name} "
+                  f"last live: {r.last_live or '-'} ({r.live_count})")
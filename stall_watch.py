@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Detect recordings whose output stopped growing while ffmpeg is still running.
+"""
+import datetime
+import json
+import os
+import threading
+import time
+
+from storage import segment_prefix
+
+
+def parse_thresholds(text: str, default: float = 90) -> dict[str, float]:
+    """Parse ``平台:秒;平台:秒``, e.g. ``*:90;抖音:45``; ``*`` (or a bare number) is the default"""
+    thresholds = {'*': default}
+    for item in text.replace('；', ';').replace('：', ':').split(';'):
+        scope, _, seconds = item.rpartition(':')
+        try:
+            thresholds[scope.strip() or '*'] = float(seconds)
+        except ValueError:
+            continue
+    return thresholds
+
+
+def threshold_for(thresholds: dict[str, float], platform: str) -> float:
+    for scope, seconds in thresholds.items():
+        if scope != '*' and scope in platform:
+            return seconds
+    return thresholds.get('*', 90)
+
+
+def output_bytes(save_file_path: str) -> int:
+    """Bytes written so far: the file itself, or all segments of a segmented output"""
+    prefix = segment_prefix(save_file_path)
+    if prefix is None:
+        try:
+            return os.path.getsize(save_file_path)
+        except OSError:
+            return 0
+    total = 0
+    try:
+        with os.scandir(os.path.dirname(save_file_path)) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix):
+                    try:
+                        total += entry.stat().st_size
+                    except OSError:
+                        pass
+    except OSError:
+        pass
+    return total
+
+
+class OutputWatch:
+    """
+    Output growth of one running recording, sampled every ``interval`` seconds.
+
+    ``stalled()`` turns true once the size has not changed for ``threshold`` seconds; the time before the first
+    byte counts as well, so the threshold should leave room for ffmpeg's probing at start.
+    """
+
+    def __init__(self, save_file_path: str, threshold: float, interval: float = 5):
+        self.save_file_path = save_file_path
+        self.threshold = threshold
+        self.interval = interval
+        self.bytes = 0
+        self.last_growth = self.last_sample = time.monotonic()
+
+    def sample(self, now: float | None = None) -> int:
+        now = time.monotonic() if now is None else now
+        if now - self.last_sample >= self.interval:
+            self.last_sample = now
+            size = output_bytes(self.save_file_path)
+            if size != self.bytes:
+                self.bytes = size
+                self.last_growth = now
+        return self.bytes
+
+    def idle_seconds(self, now: float | None = None) -> float:
+        return (time.monotonic() if now is None else now) - self.last_growth
+
+    def stalled(self, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.sample(now)
+        return self.idle_seconds(now) >= self.threshold
+
+
+class StallMetrics:
+    """Stall counters per platform, with the recent events kept for the status display and the event log"""
+
+    def __init__(self, log_path: str | None = None, keep: int = 20):
+        self.log_path = log_path
+        self.keep = keep
+        self.total = 0
+        self.by_platform: dict[str, int] = {}
+        self.recent: list[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, platform: str, room: str, idle_seconds: float, written_bytes: int) -> None:
+        event = {'time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'platform': platform,
+                 'room': room, 'idle_seconds': round(idle_seconds, 1), 'bytes': written_bytes}
+        with self._lock:
+            self.total += 1
+            self.by_platform[platform] = self.by_platform.get(platform, 0) + 1
+            self.recent = (self.recent + [event])[-self.keep:]
+            if self.log_path:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'total': self.total, 'by_platform': dict(self.by_platform), 'recent': list(self.recent)}
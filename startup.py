@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Run independent startup checks concurrently and report how long each startup step took.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+class StartupTasks:
+    """
+    Startup steps, timed from the moment this object is created.
+
+    ``submit`` runs a check on its own daemon thread and ``wait`` blocks only the caller that needs its
+    result, so monitoring can begin while slow checks (network probes, tool lookups) are still running.
+    ``mark`` ends an inline step that began where the previous one ended. ``report`` lists every step; steps
+    still running at that point are printed again by ``on_late`` once they finish.
+    """
+
+    def __init__(self, on_late: Callable[[str], None] = print):
+        self.started = time.monotonic()
+        self.on_late = on_late
+        self._futures: dict[str, Future] = {}
+        self._timings: dict[str, tuple[float, float | None]] = {}
+        self._reported = False
+        self._last_mark = 0.0
+        self._lock = threading.Lock()
+
+    def _begin(self, name: str) -> None:
+        with self._lock:
+            self._timings[name] = (time.monotonic() - self.started, None)
+
+    def _end(self, name: str) -> None:
+        with self._lock:
+            offset = self._timings[name][0]
+            self._timings[name] = (offset, time.monotonic() - self.started - offset)
+            late = self._reported
+        if late:
+            self.on_late(f"啟動步驟完成: {name} {self._timings[name][1]:.2f}s")
+
+    def submit(self, name: str, func: Callable[..., Any], *args: Any) -> Future:
+        future = Future()
+        self._futures[name] = future
+        self._begin(name)
+
+        def run() -> None:
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                self._end(name)
+
+        threading.Thread(target=run, name=f'startup-{name}', daemon=True).start()
+        return future
+
+    def wait(self, name: str, timeout: float | None = None) -> Any:
+        return self._futures[name].result(timeout)
+
+    def done(self, name: str) -> bool:
+        return self._futures[name].done()
+
+    def mark(self, name: str) -> None:
+        now = time.monotonic() - self.started
+        with self._lock:
+            self._timings[name] = (self._last_mark, now - self._last_mark)
+            self._last_mark = now
+
+    def report(self) -> str:
+        with self._lock:
+            self._reported = True
+            parts = [f"{name} {duration:.2f}s" if duration is not None else f"{name} 背景執行中"
+                     for name, (_, duration) in sorted(self._timings.items(), key=lambda item: item[1][0])]
+        return f"啟動耗時 {time.monotonic() - self.started:.2f}s: " + " | ".join(parts)
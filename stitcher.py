@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Join the fragments of one broadcast, split by reconnects, into a single file without re-encoding.
+"""
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import Callable, NamedTuple
+
+
+class Fragment(NamedTuple):
+    path: str
+    started: float
+    ended: float
+
+
+class Broadcast(NamedTuple):
+    room: str
+    save_type: str
+    record_name: str
+    script_command: str | None
+    fragments: list[Fragment]
+
+
+def concat_command(list_path: str, output_path: str) -> list[str]:
+    return ['ffmpeg', '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path,
+            '-map', '0', '-c', 'copy', output_path]
+
+
+def write_concat_list(paths: list[str], list_path: str) -> None:
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace('\\', '/').replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def pending_fragments(journal_dir: str, prefix: str = 'stitch_journal') -> set[str]:
+    """Paths of the fragments still waiting to be stitched, across the journals of every process"""
+    paths = set()
+    try:
+        names = [name for name in os.listdir(journal_dir) if name.startswith(prefix) and name.endswith('.json')]
+    except OSError:
+        return paths
+    for name in names:
+        try:
+            with open(os.path.join(journal_dir, name), encoding='utf-8') as f:
+                paths.update(fragment[0] for item in json.load(f) for fragment in item['fragments'])
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            continue
+    return paths
+
+
+class BroadcastStitcher:
+    """
+    Group the recordings of a room into broadcasts and finalize each broadcast once.
+
+    A fragment that starts within ``gap`` seconds of the previous one ending, in the same directory, belongs
+    to the same broadcast. A broadcast is finalized when ``gap`` seconds pass without a new fragment: its
+    fragments are joined with ffmpeg's concat demuxer (stream copy) into the first fragment's file name and
+    ``on_done(path, save_type, record_name, script_command)`` runs once for the result. Pending broadcasts are
+    kept in ``journal_path`` so a restart still finalizes them. With ``gap`` 0 every fragment is final.
+    """
+
+    def __init__(self, journal_path: str, on_done: Callable[[str, str, str, str | None], None], gap: float = 120,
+                 startupinfo=None):
+        self.journal_path = journal_path
+        self.on_done = on_done
+        self.gap = gap
+        self.startupinfo = startupinfo
+        self._pending: dict[str, Broadcast] = {}
+        self._active: set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                for item in json.load(f):
+                    fragments = [Fragment(*fragment) for fragment in item['fragments']]
+                    self._pending[item['room']] = Broadcast(item['room'], item['save_type'], item['record_name'],
+                                                            item['script_command'], fragments)
+        except (OSError, ValueError, KeyError, TypeError):
+            self._pending = {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        tmp_path = self.journal_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([b._asdict() for b in self._pending.values()], f, ensure_ascii=False)
+        os.replace(tmp_path, self.journal_path)
+
+    def open(self, room: str) -> None:
+        """A new fragment of ``room`` started recording; its broadcast stays open until that fragment ends"""
+        with self._lock:
+            self._active.add(room)
+
+    def finish(self, room: str, path: str, started: float, ended: float, save_type: str, record_name: str,
+               script_command: str | None = None) -> None:
+        fragment = Fragment(path, started, ended)
+        ready = []
+        with self._lock:
+            self._active.discard(room)
+            broadcast = self._pending.pop(room, None)
+            if broadcast is not None:
+                last = broadcast.fragments[-1]
+                if (fragment.started - last.ended <= self.gap and save_type == broadcast.save_type
+                        and os.path.dirname(path) == os.path.dirname(last.path)):
+                    broadcast.fragments.append(fragment)
+                else:
+                    ready.append(broadcast)
+                    broadcast = None
+            if broadcast is None:
+                broadcast = Broadcast(room, save_type, record_name, script_command, [fragment])
+            if self.gap > 0:
+                self._pending[room] = broadcast
+            else:
+                ready.append(broadcast)
+            self._save()
+        for broadcast in ready:
+            threading.Thread(target=self.finalize, args=(broadcast,)).start()
+
+    def due(self, now: float | None = None) -> list[Broadcast]:
+        """Take the broadcasts whose last fragment ended more than ``gap`` seconds ago"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rooms = [room for room, b in self._pending.items()
+                     if room not in self._active and now - b.fragments[-1].ended > self.gap]
+            ready = [self._pending.pop(room) for room in rooms]
+            if ready:
+                self._save()
+        return ready
+
+    def stitch(self, paths: list[str]) -> str:
+        """Join ``paths`` in order into the first one; the fragments are removed only after ffmpeg succeeded"""
+        paths = [path for path in paths if os.path.exists(path) and os.path.getsize(path) > 0]
+        if len(paths) < 2:
+            return paths[0] if paths else ''
+        stem, extension = os.path.splitext(paths[0])
+        output_path = f'{stem}.stitching{extension}'
+        list_path = f'{stem}.stitching.txt'
+        write_concat_list(paths, list_path)
+        try:
+            subprocess.check_output(concat_command(list_path, output_path), stderr=subprocess.STDOUT,
+                                    startupinfo=self.startupinfo)
+            # the joined file takes the first fragment's place before any other fragment is removed, so a
+            # failed replace leaves every original in place
+            os.replace(output_path, paths[0])
+        except BaseException:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            if os.path.exists(list_path):
+                os.remove(list_path)
+        for path in paths[1:]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f'{path} 已合併但刪除失敗: {e}')
+        return paths[0]
+
+    def finalize(self, broadcast: Broadcast) -> None:
+        paths = [fragment.path for fragment in broadcast.fragments]
+        try:
+            results = [self.stitch(paths)] if len(paths) > 1 else paths
+            if len(paths) > 1:
+                print(f'{broadcast.record_name} 已將{len(paths)}個斷線片段合併為: {results[0]}')
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f'{broadcast.record_name} 斷線片段合併失敗, 保留原片段: {e}')
+            results = paths
+        for path in results:
+            if path:
+                self.on_done(path, broadcast.save_type, broadcast.record_name, broadcast.script_command)
+
+    def start(self, interval: float = 5) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='stitcher', daemon=True)
+            self._thread.start()
+
+    def _run(self, interval: float) -> None:
+        while True:
+            for broadcast in self.due():
+                try:
+                    self.finalize(broadcast)
+                except Exception as e:
+                    print(f'{broadcast.record_name} 錄製收尾處理失敗: {e}')
+            time.sleep(interval)
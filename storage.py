@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Place recordings on the save path with the most room and log where each file went.
+"""
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+
+
+def _existing_parent(path: str) -> str:
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def segment_prefix(save_file_path: str) -> str | None:
+    """File name prefix shared by the segments of a segmented output, None for a single file"""
+    name = os.path.basename(save_file_path)
+    return name.split('%', 1)[0] if '%' in name else None
+
+
+def count_segments(save_file_path: str) -> int:
+    prefix = segment_prefix(save_file_path)
+    directory = os.path.dirname(save_file_path)
+    try:
+        return sum(1 for entry in os.scandir(directory) if entry.name.startswith(prefix))
+    except OSError:
+        return 0
+
+
+class StorageRouter:
+    """
+    Choose a save path (volume) for every new recording.
+
+    Volumes under ``threshold_gb`` free are skipped; among the others the one with the highest free space per
+    running recording wins, so concurrent recordings spread over the disks instead of piling onto one.
+    Free space is cached for ``cache_seconds`` to keep the per-second checks cheap.
+    """
+
+    def __init__(self, volumes: list[str] | None = None, threshold_gb: float = 1.0, ledger_path: str | None = None,
+                 cache_seconds: float = 5):
+        self.volumes: list[str] = []
+        self.threshold_gb = threshold_gb
+        self.ledger_path = ledger_path
+        self.cache_seconds = cache_seconds
+        self._free: dict[str, tuple[float, float]] = {}
+        self._active: dict[str, str] = {}
+        self._lock = threading.Lock()
+        if volumes:
+            self.update(volumes, threshold_gb)
+
+    def update(self, volumes: list[str], threshold_gb: float) -> None:
+        self.volumes = list(dict.fromkeys(v.rstrip('/\\') or v for v in volumes if v))
+        self.threshold_gb = threshold_gb
+
+    def free_gb(self, volume: str) -> float:
+        now = time.monotonic()
+        cached = self._free.get(volume)
+        if cached and now - cached[0] < self.cache_seconds:
+            return cached[1]
+        try:
+            free = shutil.disk_usage(_existing_parent(volume)).free / (1024 ** 3)
+        except OSError:
+            free = 0.0
+        self._free[volume] = (now, free)
+        return free
+
+    def shortfall_gb(self) -> float:
+        """Space to free before any volume is back over the threshold, 0 when one already is"""
+        self._free.clear()
+        return max(0.0, min((self.threshold_gb - self.free_gb(v) for v in self.volumes), default=0.0))
+
+    def volume_of(self, path: str) -> str | None:
+        path = os.path.abspath(path)
+        matches = [v for v in self.volumes if path.startswith(os.path.abspath(v) + os.sep)
+                   or path == os.path.abspath(v)]
+        return max(matches, key=len) if matches else None
+
+    def has_space(self, volume: str) -> bool:
+        return self.free_gb(volume) >= self.threshold_gb
+
+    def _load(self, volume: str) -> int:
+        return sum(1 for v in self._active.values() if v == volume)
+
+    def choose(self, exclude: tuple[str, ...] = ()) -> str | None:
+        with self._lock:
+            candidates = [v for v in self.volumes if v not in exclude and self.has_space(v)]
+            if not candidates:
+                return None
+            return max(candidates, key=lambda v: self.free_gb(v) / (1 + self._load(v)))
+
+    def should_move(self, save_file_path: str) -> bool:
+        """The volume of a running recording dropped under the threshold and another volume has room"""
+        volume = self.volume_of(save_file_path)
+        return bool(volume and not self.has_space(volume) and self.choose(exclude=(volume,)))
+
+    def open(self, room: str, save_file_path: str, platform: str = '') -> None:
+        """Count a running recording towards its volume's write load and log where it is written"""
+        volume = self.volume_of(save_file_path)
+        with self._lock:
+            self._active[save_file_path] = volume
+        if self.ledger_path:
+            record = {'time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'room': room,
+                      'platform': platform, 'volume': volume, 'path': save_file_path}
+            with self._lock:
+                os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+                with open(self.ledger_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def is_active(self, save_file_path: str) -> bool:
+        return save_file_path in self._active
+
+    def close(self, save_file_path: str) -> None:
+        with self._lock:
+            self._active.pop(save_file_path, None)
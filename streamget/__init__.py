@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 from pathlib import Path
 from .initializer import check_node
 
@@ -11,4 +12,6 @@ execute_dir = os.path.split(os.path.realpath(sys.argv[0]))[0]
 node_execute_dir = Path(execute_dir) / 'node'
 current_env_path = os.environ.get('PATH')
 os.environ['PATH'] = str(node_execute_dir) + os.pathsep + current_env_path
-check_node()
+# runs in the background so importing the package never waits on node; execjs only needs it on first use
+node_check = threading.Thread(target=check_node, name='node-check', daemon=True)
+node_check.start()
@@ -0,0 +1,208 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Process-wide DNS cache for the HTTP clients and for pre-resolving ffmpeg input hosts.
+"""
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+import typing
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+if typing.TYPE_CHECKING:
+    import httpcore
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+def _lookup(host: str, port: int) -> list[str]:
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class DNSCache:
+    """
+    Cached hostname lookups shared by every thread and event loop of the process.
+
+    Answers are kept for ``ttl`` seconds and failures for ``negative_ttl`` seconds. A hit past
+    ``prefetch_ratio`` of its lifetime is served from the cache while a background thread refreshes it, so
+    busy hosts never wait for the resolver. The system resolver gives no TTLs, hence the fixed lifetime.
+    """
+
+    def __init__(self, ttl: float = 300, negative_ttl: float = 30, prefetch_ratio: float = 0.8,
+                 max_entries: int = 4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefetch_ratio = prefetch_ratio
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[tuple[str, int], tuple[float, list[str] | None]] = {}
+        self._refreshing: set[tuple[str, int]] = set()
+        self._lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='dns-prefetch')
+
+    def _store(self, key: tuple[str, int], addresses: list[str] | None) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic(), addresses)
+            self._refreshing.discard(key)
+
+    def _refresh(self, key: tuple[str, int]) -> None:
+        try:
+            self._store(key, _lookup(*key))
+        except OSError:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _cached(self, key: tuple[str, int]) -> list[str] | None:
+        """Addresses from the cache; raises for a cached failure, None when a lookup is needed"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored, addresses = entry
+        age = time.monotonic() - stored
+        if addresses is None:
+            if age < self.negative_ttl:
+                self.hits += 1
+                raise socket.gaierror(socket.EAI_NONAME, f'{key[0]}: lookup failed recently (cached)')
+            return None
+        if age >= self.ttl:
+            return None
+        if age >= self.ttl * self.prefetch_ratio:
+            with self._lock:
+                schedule = key not in self._refreshing
+                self._refreshing.add(key)
+            if schedule:
+                self._prefetcher.submit(self._refresh, key)
+        self.hits += 1
+        return addresses
+
+    async def resolve(self, host: str, port: int = 443) -> list[str]:
+        if is_ip(host):
+            return [host.strip('[]')]
+        key = (host.lower(), port)
+        addresses = self._cached(key)
+        if addresses is not None:
+            return addresses
+        self.misses += 1
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError:
+            self._store(key, None)
+            raise
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._store(key, addresses)
+        return addresses
+
+    def resolve_sync(self, host: str, port: int = 80) -> list[str]:
+        if is_ip(host):
+            return [host.strip('[]')]
+        key = (host.lower(), port)
+        addresses = self._cached(key)
+        if addresses is not None:
+            return addresses
+        self.misses += 1
+        try:
+            addresses = _lookup(host, port)
+        except OSError:
+            self._store(key, None)
+            raise
+        self._store(key, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int | None = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == host.lower() and port in (None, k[1])]:
+                del self._entries[key]
+
+
+dns_cache = DNSCache()
+
+
+class CachedResolverBackend:
+    """
+    httpcore network backend that connects to cached addresses; TLS still uses the original host name.
+
+    httpcore (and anyio behind it) is imported on first use rather than with this module, as httpx itself
+    does, so importing the HTTP clients stays cheap. The pool only calls the methods below.
+    """
+
+    def __init__(self, cache: DNSCache = dns_cache):
+        import httpcore
+
+        self.cache = cache
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: float | None = None,
+                          local_address: str | None = None,
+                          socket_options: typing.Iterable | None = None) -> 'httpcore.AsyncNetworkStream':
+        import httpcore
+
+        try:
+            addresses = await self.cache.resolve(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout=timeout, local_address=local_address,
+                                                       socket_options=socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # every cached address failed: the host may have moved, look it up again next time
+        self.cache.invalidate(host, port)
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: float | None = None,
+                                  socket_options: typing.Iterable | None = None) -> 'httpcore.AsyncNetworkStream':
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+def cached_transport(verify: bool = True, http2: bool = False, proxy: str | None = None) -> httpx.AsyncHTTPTransport:
+    transport = httpx.AsyncHTTPTransport(verify=verify, http2=http2, proxy=proxy)
+    # httpx has no option for the network backend, the pool takes it as a plain attribute
+    if hasattr(transport._pool, '_network_backend'):
+        transport._pool._network_backend = CachedResolverBackend()
+    return transport
+
+
+def pin_ffmpeg_input(url: str, cache: DNSCache = dns_cache) -> tuple[str, str | None]:
+    """
+    Swap the host of a plain-http, non-HLS input for a cached address, returning (url, Host header).
+
+    HTTPS keeps its host for SNI and certificates, and HLS playlists may point segments at other hosts, so
+    those inputs are returned unchanged with no header.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if (parts.scheme != 'http' or not parts.hostname or is_ip(parts.hostname) or '@' in parts.netloc
+            or '.m3u8' in parts.path):
+        return url, None
+    try:
+        address = cache.resolve_sync(parts.hostname, parts.port or 80)[0]
+    except (OSError, IndexError):
+        return url, None
+    host = f'[{address}]' if ':' in address else address
+    netloc = f'{host}:{parts.port}' if parts.port else host
+    return urllib.parse.urlunsplit(parts._replace(netloc=netloc)), parts.netloc
@@ -0,0 +1,103 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Decode JSON embedded in live room pages without copying the page.
+"""
+import json
+
+_decoder = json.JSONDecoder()
+
+RSC_PUSH_PREFIX = 'self.__pace_f.push([1,"'
+
+
+def decode_object_at(text: str, index: int) -> tuple[dict | list | str, int]:
+    """Decode the JSON value starting at ``index`` and return it with its end offset"""
+    return _decoder.raw_decode(text, index)
+
+
+def extract_script_json(html: str, open_tag: str, start: int = 0) -> dict | None:
+    index = html.find(open_tag, start)
+    if index == -1:
+        return None
+    index += len(open_tag)
+    while index < len(html) and html[index] in ' \t\r\n':
+        index += 1
+    return decode_object_at(html, index)[0]
+
+
+def extract_rsc_string(html: str, index: int) -> tuple[str, int] | None:
+    """Return the decoded ``self.__pace_f.push([1, "..."])`` payload that contains ``index``"""
+    push_index = html.rfind(RSC_PUSH_PREFIX, 0, index)
+    if push_index == -1:
+        return None
+    try:
+        payload, end = decode_object_at(html, push_index + len(RSC_PUSH_PREFIX) - 1)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(payload, str) or end <= index:
+        return None
+    return payload, end
+
+
+def find_key(data, key: str, max_depth: int = 8):
+    if max_depth < 0:
+        return None
+    if isinstance(data, dict):
+        if key in data:
+            return data[key]
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+    for value in values:
+        if isinstance(value, (dict, list)):
+            found = find_key(value, key, max_depth - 1)
+            if found is not None:
+                return found
+    return None
+
+
+def extract_douyin_room_store(html: str) -> dict | None:
+    for marker, json_marker in (('{\\"state\\":', '{"state":'), ('{\\"common\\":', '{"common":')):
+        index = html.find(marker)
+        while index != -1:
+            # Stream data chunks start their string with the marker, the page state is wrapped in an RSC tuple
+            if html[index - 1] != '"':
+                decoded = extract_rsc_string(html, index)
+                if decoded:
+                    payload, _ = decoded
+                    json_index = payload.find(json_marker)
+                    if json_index != -1:
+                        room_store = find_key(decode_object_at(payload, json_index)[0], 'roomStore')
+                        if room_store:
+                            return room_store
+            index = html.find(marker, index + len(marker))
+    return None
+
+
+def extract_douyin_stream_chunks(html: str) -> list[dict]:
+    chunks = []
+    marker = '"{\\"common\\":'
+    index = html.find(marker)
+    while index != -1:
+        try:
+            payload, end = decode_object_at(html, index)
+        except json.JSONDecodeError:
+            index = html.find(marker, index + len(marker))
+            continue
+        try:
+            chunk = json.loads(payload)
+            if isinstance(chunk.get('data'), str):
+                chunk['data'] = json.loads(chunk['data'])
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            chunk = None
+        if isinstance(chunk, dict) and chunk.get('data'):
+            chunks.append(chunk)
+        index = html.find(marker, end)
+    return chunks
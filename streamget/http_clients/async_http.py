@@ -1,11 +1,58 @@
 # -*- coding: utf-8 -*-
+import codecs
+import urllib.request
 import httpx
 from typing import Dict, Any
 from .. import utils
+from ..dns_cache import cached_transport
+from ..proxy import proxy_pool
 
 OptionalStr = str | None
 OptionalDict = Dict[str, Any] | None
 
+# Shared transport override, e.g. to replay recorded responses offline
+_transport: httpx.AsyncBaseTransport | None = None
+
+
+def set_transport(transport: httpx.AsyncBaseTransport | None) -> None:
+    global _transport
+    _transport = transport
+
+
+def _new_client(proxy_addr: OptionalStr, timeout: int, verify: bool, http2: bool = False) -> httpx.AsyncClient:
+    if _transport:
+        # a proxy would mount its own transport over the override
+        return httpx.AsyncClient(timeout=timeout, verify=verify, transport=_transport)
+    if not proxy_addr and not _env_proxy():
+        # direct connections resolve through the shared DNS cache; a proxy resolves on its own side
+        return httpx.AsyncClient(timeout=timeout, verify=verify, transport=cached_transport(verify, http2))
+    return httpx.AsyncClient(proxy=proxy_addr, timeout=timeout, verify=verify, http2=http2)
+
+
+# errors that point at the proxy itself rather than at the site behind it
+_PROXY_ERRORS = (httpx.ProxyError, httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout,
+                 httpx.RemoteProtocolError)
+
+
+def _domain(url: str) -> str:
+    """Proxy pool key of a request, the same scheme://host key the recorder reports under"""
+    return '/'.join(url.split('/')[0:3])
+
+
+def _next_proxy(url: str, proxy_addr: OptionalStr, error: Exception, tried: list[str]) -> OptionalStr:
+    """Another pooled proxy to retry with after ``error``, or None when the request should not be retried"""
+    if not isinstance(error, _PROXY_ERRORS) or proxy_addr not in proxy_pool:
+        return None
+    domain = _domain(url)
+    proxy_pool.report_failure(proxy_addr, domain)
+    tried.append(proxy_addr)
+    return proxy_pool.choose(domain, exclude=tuple(tried)) if len(tried) < len(proxy_pool) else None
+
+
+def _env_proxy() -> bool:
+    proxies = urllib.request.getproxies()
+    return any(proxies.get(scheme) for scheme in ('http', 'https', 'all'))
+
 
 async def async_req(
         url: str,
@@ -24,14 +71,24 @@ async def async_req(
 ) -> OptionalDict | OptionalStr | tuple:
     if headers is None:
         headers = {}
+    tried = []
     try:
         proxy_addr = utils.handle_proxy_addr(proxy_addr)
-        if data or json_data:
-            async with httpx.AsyncClient(proxy=proxy_addr, timeout=timeout, verify=verify, http2=http2) as client:
-                response = await client.post(url, data=data, json=json_data, headers=headers)
-        else:
-            async with httpx.AsyncClient(proxy=proxy_addr, timeout=timeout, verify=verify, http2=http2) as client:
-                response = await client.get(url, headers=headers, follow_redirects=True)
+        while True:
+            try:
+                if data or json_data:
+                    async with _new_client(proxy_addr, timeout, verify, http2) as client:
+                        response = await client.post(url, data=data, json=json_data, headers=headers)
+                else:
+                    async with _new_client(proxy_addr, timeout, verify, http2) as client:
+                        response = await client.get(url, headers=headers, follow_redirects=True)
+                proxy_pool.report_success(proxy_addr, _domain(url))
+                break
+            except Exception as e:
+                # a pooled proxy that fails mid-poll is swapped for the next best one
+                proxy_addr = _next_proxy(url, proxy_addr, e, tried)
+                if not proxy_addr:
+                    raise
 
         if redirect_url:
             return str(response.url)
@@ -46,12 +103,80 @@ async def async_req(
     return resp_str
 
 
+async def async_req_until(
+        url: str,
+        start_marker: str,
+        end_marker: str,
+        proxy_addr: OptionalStr = None,
+        headers: OptionalDict = None,
+        occurrences: int = 1,
+        slice_only: bool = True,
+        timeout: int = 20,
+        abroad: bool = False,
+        verify: bool = False,
+        http2: bool = True
+) -> str:
+    """
+    GET a page but stop reading once the part that is needed has arrived.
+
+    The body is decoded as it streams in; after the ``occurrences``-th ``start_marker`` and the next
+    ``end_marker`` the response is closed and the text from the first ``start_marker`` through ``end_marker``
+    is returned (from the start of the page with ``slice_only=False``). A page without the markers is
+    returned whole, like ``async_req``.
+    """
+    if headers is None:
+        headers = {}
+    tried = []
+    try:
+        proxy_addr = utils.handle_proxy_addr(proxy_addr)
+        while True:
+            try:
+                text = await _read_until(url, start_marker, end_marker, proxy_addr, headers, occurrences,
+                                         slice_only, timeout, verify, http2)
+                proxy_pool.report_success(proxy_addr, _domain(url))
+                return text
+            except Exception as e:
+                proxy_addr = _next_proxy(url, proxy_addr, e, tried)
+                if not proxy_addr:
+                    raise
+    except Exception as e:
+        return str(e)
+
+
+async def _read_until(url: str, start_marker: str, end_marker: str, proxy_addr: OptionalStr, headers: dict,
+                      occurrences: int, slice_only: bool, timeout: int, verify: bool, http2: bool) -> str:
+    async with _new_client(proxy_addr, timeout, verify, http2) as client:
+        async with client.stream('GET', url, headers=headers, follow_redirects=True) as response:
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or 'utf-8')(errors='replace')
+            text = ''
+            first = -1
+            found = 0
+            scan = 0
+            async for chunk in response.aiter_bytes():
+                text += decoder.decode(chunk)
+                while found < occurrences:
+                    index = text.find(start_marker, scan)
+                    if index == -1:
+                        scan = max(scan, len(text) - len(start_marker) + 1)
+                        break
+                    first = index if first == -1 else first
+                    found += 1
+                    scan = index + len(start_marker)
+                if found == occurrences:
+                    end = text.find(end_marker, scan)
+                    if end != -1:
+                        end += len(end_marker)
+                        return text[first:end] if slice_only else text[:end]
+                    scan = max(scan, len(text) - len(end_marker) + 1)
+            return text + decoder.decode(b'', final=True)
+
+
 async def get_response_status(url: str, proxy_addr: OptionalStr = None, headers: OptionalDict = None,
                               timeout: int = 10, abroad: bool = False, verify: bool = False, http2=False) -> bool:
 
     try:
         proxy_addr = utils.handle_proxy_addr(proxy_addr)
-        async with httpx.AsyncClient(proxy=proxy_addr, timeout=timeout, verify=verify) as client:
+        async with _new_client(proxy_addr, timeout, verify) as client:
             response = await client.head(url, headers=headers, follow_redirects=True)
             return response.status_code == 200
     except Exception as e:
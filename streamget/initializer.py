@@ -14,11 +14,9 @@ import sys
 import platform
 import zipfile
 from pathlib import Path
-import requests
 import re
-import distro
-from tqdm import tqdm
 from .logger import logger
+from .tool_versions import tool_versions
 
 current_platform = platform.system()
 execute_dir = os.path.split(os.path.realpath(sys.argv[0]))[0]
@@ -37,6 +35,9 @@ def unzip_file(zip_path: str | Path, extract_to: str | Path, delete: bool = True
 
 
 def install_nodejs_windows():
+    # only needed when Node.js is missing, keep them out of the startup path
+    import requests
+    from tqdm import tqdm
     try:
         logger.warning("Node.js is not installed.")
         logger.debug("Installing the stable version of Node.js for Windows...")
@@ -154,6 +155,7 @@ def install_nodejs_mac():
 
 
 def get_package_manager():
+    import distro
     dist_id = distro.id()
     if dist_id in ["centos", "fedora", "rhel", "amzn", "oracle", "scientific", "opencloudos", "alinux"]:
         return "RHS"
@@ -179,27 +181,11 @@ def install_nodejs() -> bool:
 
 
 def ensure_nodejs_installed(func):
-    def wrapper(*args, **kwargs):
-        try:
-            result = subprocess.run(['node', '-v'], capture_output=True)
-            version = result.stdout.strip()
-            if result.returncode == 0 and version:
-                return func(*args, **kwargs)
-        except FileNotFoundError:
-            pass
-        return False
-
     def wrapped_func(*args, **kwargs):
-        if sys.version_info >= (3, 7):
-            res = wrapper(*args, **kwargs)
-        else:
-            res = wrapper(*args, **kwargs)
-        if not res:
+        if not check_nodejs_installed():
             install_nodejs()
-            res = wrapper(*args, **kwargs)
-
-        if not res:
-            raise RuntimeError("Node.js is not installed.")
+            if not check_nodejs_installed():
+                raise RuntimeError("Node.js is not installed.")
 
         return func(*args, **kwargs)
 
@@ -207,14 +193,8 @@ def ensure_nodejs_installed(func):
 
 
 def check_nodejs_installed() -> bool:
-    try:
-        result = subprocess.run(['node', '-v'], capture_output=True)
-        version = result.stdout.strip()
-        if result.returncode == 0 and version:
-            return True
-    except FileNotFoundError:
-        pass
-    return False
+    # the version is cached per node executable, so only a new or changed node is run
+    return tool_versions.version('node', ('-v',)) is not None
 
 
 def check_node() -> bool:
@@ -0,0 +1,22 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Message catalog for the user facing output of streamget.
+"""
+
+_catalog: dict[str, str] = {}
+
+
+def set_catalog(catalog: dict[str, str]) -> None:
+    """Install translations keyed by the English message id; an empty dict restores English"""
+    _catalog.clear()
+    _catalog.update(catalog)
+
+
+def tr(message: str) -> str:
+    return _catalog.get(message, message)
@@ -0,0 +1,155 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Parse HLS master playlists and select stream variants.
+"""
+import re
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+QUALITY_MAPPING = {"OD": 0, "BD": 0, "UHD": 1, "HD": 2, "SD": 3, "LD": 4}
+
+CODEC_FAMILIES = {
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'hvc1': 'h265',
+    'hev1': 'h265',
+    'av01': 'av1',
+    'vp09': 'vp9',
+}
+
+_ATTRIBUTE_PATTERN = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+@dataclass(frozen=True)
+class Variant:
+    url: str
+    bandwidth: int = 0
+    resolution: tuple[int, int] | None = None
+    codecs: str = ''
+    frame_rate: float | None = None
+    name: str = ''
+
+    @property
+    def height(self) -> int:
+        return self.resolution[1] if self.resolution else 0
+
+    @property
+    def video_codec(self) -> str:
+        for codec in self.codecs.split(','):
+            codec = codec.strip().split('.')[0].lower()
+            if codec in CODEC_FAMILIES:
+                return CODEC_FAMILIES[codec]
+            if codec in ('h264', 'h265', 'bytevc1', 'av1', 'vp9'):
+                return 'h265' if codec == 'bytevc1' else codec
+        return ''
+
+
+@dataclass(frozen=True)
+class SelectionPolicy:
+    max_bitrate: int = 0
+    max_height: int = 0
+    codec_preference: tuple[str, ...] = field(default_factory=tuple)
+
+    @classmethod
+    def from_config(cls, max_bitrate_kbps: int | str = 0, max_height: int | str = 0,
+                    codec_preference: str = '') -> 'SelectionPolicy':
+        codecs = tuple(c.strip().lower() for c in codec_preference.replace('，', ',').split(',') if c.strip())
+        return cls(max_bitrate=int(max_bitrate_kbps or 0) * 1000, max_height=int(max_height or 0),
+                   codec_preference=codecs)
+
+    def apply(self, variants: list[Variant]) -> list[Variant]:
+        candidates = variants
+        if self.max_bitrate:
+            candidates = [v for v in candidates if not v.bandwidth or v.bandwidth <= self.max_bitrate]
+        if self.max_height:
+            candidates = [v for v in candidates if not v.height or v.height <= self.max_height]
+        if not candidates:
+            # Nothing satisfies the caps, the cheapest variant is the closest match
+            candidates = variants[-1:]
+        for codec in self.codec_preference:
+            preferred = [v for v in candidates if v.video_codec == codec]
+            if preferred:
+                return preferred
+        return candidates
+
+
+def parse_attribute_list(text: str) -> dict:
+    attributes = {}
+    for key, value in _ATTRIBUTE_PATTERN.findall(text):
+        attributes[key] = value[1:-1] if value.startswith('"') else value
+    return attributes
+
+
+def parse_resolution(value: str | None) -> tuple[int, int] | None:
+    if not value or 'x' not in value:
+        return None
+    width, height = value.lower().split('x', maxsplit=1)
+    if width.isdigit() and height.isdigit():
+        return int(width), int(height)
+    return None
+
+
+def parse_master_playlist(text: str, base_url: str = '') -> list[Variant]:
+    variants = []
+    pending = None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            pending = parse_attribute_list(line[len('#EXT-X-STREAM-INF:'):])
+        elif line.startswith('#'):
+            continue
+        elif pending is not None:
+            frame_rate = pending.get('FRAME-RATE')
+            bandwidth = pending.get('BANDWIDTH') or pending.get('AVERAGE-BANDWIDTH') or '0'
+            variants.append(Variant(
+                url=urllib.parse.urljoin(base_url, line) if base_url else line,
+                bandwidth=int(bandwidth) if bandwidth.isdigit() else 0,
+                resolution=parse_resolution(pending.get('RESOLUTION')),
+                codecs=pending.get('CODECS', ''),
+                frame_rate=float(frame_rate) if frame_rate else None,
+                name=pending.get('NAME', '') or pending.get('VIDEO', ''),
+            ))
+            pending = None
+    variants.sort(key=lambda v: (v.bandwidth, v.height), reverse=True)
+    return variants
+
+
+def get_quality_index(quality) -> tuple:
+    if not quality:
+        return list(QUALITY_MAPPING.items())[0]
+
+    quality_str = str(quality).upper()
+    if quality_str.isdigit():
+        quality_int = int(quality_str[0])
+        quality_str = list(QUALITY_MAPPING.keys())[quality_int]
+    return quality_str, QUALITY_MAPPING.get(quality_str, 0)
+
+
+def select_by_quality(items: list, quality) -> tuple:
+    """Pick an item from a best-first list, clamping to the lowest entry instead of padding the list"""
+    quality_str, quality_index = get_quality_index(quality)
+    return quality_str, items[min(quality_index, len(items) - 1)]
+
+
+def select_variant(variants: list[Variant], quality, policy: SelectionPolicy | None = None) -> tuple:
+    if policy:
+        variants = policy.apply(variants)
+    return select_by_quality(variants, quality)
+
+
+def apply_policy(items: list, describe: Callable[[Any], Variant], policy: SelectionPolicy | None) -> list:
+    """Filter a best-first list of platform entries through ``policy``, describing each entry as a Variant"""
+    if not policy or not items:
+        return items
+    variants = [describe(item) for item in items]
+    kept = {id(variant) for variant in policy.apply(variants)}
+    return [item for item, variant in zip(items, variants) if id(variant) in kept]
@@ -9,8 +9,14 @@ Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
 """
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
 from dataclasses import dataclass, field
+
+import httpx
+
 from .utils import logger
 
 
@@ -99,3 +105,148 @@ class ProxyDetector:
     def _is_proxy_enabled_linux(self) -> bool:
         proxies = self._get_proxy_info_linux()
         return any(proxy != '' for proxy in proxies)
+
+
+@dataclass
+class ProxyState:
+    address: str
+    latency: float | None = None
+    healthy: bool = True
+    failures: int = 0
+    checked_at: float = 0.0
+
+
+class ProxyPool:
+    """
+    Several upstream proxies, health-checked in the background against ``check_url``.
+
+    ``choose(key)`` returns the healthy proxy with the lowest latency and keeps giving the same one to
+    ``key`` (a platform) while it stays usable and no other proxy is at least 30% faster, so a platform
+    does not hop between exit regions on every poll.
+
+    ``report_failure(address, key)`` counts consecutive failures of a proxy for one platform (or for every
+    platform with an empty key); after ``failure_limit`` of them the proxy is left out for that key for
+    ``cooldown`` seconds. The health check only proves the proxy reaches ``check_url``, so a passing check
+    never clears these marks: a proxy blocked by one site stays out for that site until the cooldown ends
+    or ``report_success`` is called for it.
+    """
+
+    def __init__(self, proxies: list[str] | None = None, check_url: str = 'https://www.google.com/generate_204',
+                 interval: float = 60, timeout: float = 8, failure_limit: int = 2, cooldown: float = 300):
+        self.check_url = check_url
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_limit = failure_limit
+        self.cooldown = cooldown
+        self._states: dict[str, ProxyState] = {}
+        self._assigned: dict[str, str] = {}
+        # (address, key) -> (consecutive failures, left out until)
+        self._marks: dict[tuple[str, str], tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.update(proxies or [], check_url)
+
+    def update(self, proxies: list[str], check_url: str | None = None) -> None:
+        addresses = list(dict.fromkeys(p.strip() if '://' in p else 'http://' + p.strip()
+                                       for p in proxies if p and p.strip()))
+        with self._lock:
+            self._states = {a: self._states.get(a) or ProxyState(a) for a in addresses}
+            self._assigned = {k: v for k, v in self._assigned.items() if v in self._states}
+            self._marks = {k: v for k, v in self._marks.items() if k[0] in self._states}
+        if check_url:
+            self.check_url = check_url
+
+    def __contains__(self, address: str | None) -> bool:
+        return bool(address) and address in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def check(self, address: str) -> None:
+        started = time.monotonic()
+        try:
+            with httpx.Client(proxy=address, timeout=self.timeout, verify=False) as client:
+                # a proxy that answers 403/407 itself is not usable
+                healthy = 200 <= client.get(self.check_url).status_code < 300
+        except Exception:
+            healthy = False
+        latency = time.monotonic() - started
+        with self._lock:
+            state = self._states.get(address)
+            if state is None:
+                return
+            state.checked_at = time.time()
+            state.healthy = healthy
+            if healthy:
+                state.latency = latency if state.latency is None else 0.7 * state.latency + 0.3 * latency
+
+    def check_all(self) -> None:
+        addresses = list(self._states)
+        if addresses:
+            with ThreadPoolExecutor(max_workers=min(8, len(addresses))) as executor:
+                list(executor.map(self.check, addresses))
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='proxy-pool', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.check_all()
+            except Exception as e:
+                logger.error(f"Proxy health check failed: {e}")
+            time.sleep(self.interval)
+
+    def _cooling(self, address: str, key: str, now: float) -> bool:
+        return any(self._marks.get((address, k), (0, 0.0))[1] > now for k in {'', key})
+
+    def _usable(self, key: str, exclude: tuple[str, ...]) -> list[ProxyState]:
+        now = time.time()
+        states = [s for s in self._states.values() if s.address not in exclude]
+        usable = [s for s in states if s.healthy and not self._cooling(s.address, key, now)]
+        # with nothing usable, fall back to the proxy that failed least
+        return usable or sorted(states, key=lambda s: s.failures)[:1]
+
+    def choose(self, key: str = '', exclude: tuple[str, ...] = ()) -> str | None:
+        with self._lock:
+            usable = self._usable(key, exclude)
+            if not usable:
+                return None
+            best = min(usable, key=lambda s: float('inf') if s.latency is None else s.latency)
+            current = self._states.get(self._assigned.get(key, ''))
+            if (current is not None and current in usable and current.latency is not None
+                    and best.latency is not None and best.latency >= current.latency * 0.7):
+                return current.address
+            self._assigned[key] = best.address
+            return best.address
+
+    def report_failure(self, address: str | None, key: str = '') -> None:
+        with self._lock:
+            state = self._states.get(address or '')
+            if state is None:
+                return
+            state.failures += 1
+            failures, until = self._marks.get((address, key), (0, 0.0))
+            failures += 1
+            if failures >= self.failure_limit:
+                until = time.time() + self.cooldown
+                logger.warning(f"Proxy {address} left out{f' for {key}' if key else ''} for {self.cooldown:.0f}s "
+                               f"after {failures} failures")
+            self._marks[(address, key)] = (failures, until)
+
+    def report_success(self, address: str | None, key: str = '') -> None:
+        with self._lock:
+            state = self._states.get(address or '')
+            if state is not None:
+                state.failures = 0
+                self._marks.pop((address, key), None)
+                self._marks.pop((address, ''), None)
+
+    def snapshot(self) -> list[ProxyState]:
+        with self._lock:
+            return [ProxyState(**vars(s)) for s in self._states.values()]
+
+
+proxy_pool = ProxyPool()
@@ -17,21 +17,19 @@ import urllib.parse
 import urllib.error
 from typing import List
 import httpx
-import ssl
 import re
 import json
 import execjs
 import urllib.request
-from . import JS_SCRIPT_PATH, utils
+from . import JS_SCRIPT_PATH, html_extract, utils
 from .utils import trace_error_decorator
 from .logger import script_path
 from .room import get_sec_user_id, get_unique_id
-from .http_clients.async_http import async_req
+from .http_clients.async_http import async_req, async_req_until
+from .playlist import Variant, parse_master_playlist
+from .messages import tr
 
 
-ssl_context = ssl.create_default_context()
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
 OptionalStr = str | None
 OptionalDict = dict | None
 
@@ -44,22 +42,16 @@ def get_params(url: str, params: str) -> OptionalStr:
         return query_params[params][0]
 
 
+async def get_play_variants(m3u8: str, proxy: OptionalStr = None, header: OptionalDict = None,
+                            abroad: bool = False) -> List[Variant]:
+    resp = await async_req(url=m3u8, proxy_addr=proxy, headers=header, abroad=abroad)
+    return parse_master_playlist(resp, base_url=m3u8)
+
+
 async def get_play_url_list(m3u8: str, proxy: OptionalStr = None, header: OptionalDict = None,
                             abroad: bool = False) -> List[str]:
     resp = await async_req(url=m3u8, proxy_addr=proxy, headers=header, abroad=abroad)
-    play_url_list = []
-    for i in resp.split('\n'):
-        if i.startswith('https://'):
-            play_url_list.append(i.strip())
-    if not play_url_list:
-        for i in resp.split('\n'):
-            if i.strip().endswith('m3u8'):
-                play_url_list.append(i.strip())
-    bandwidth_pattern = re.compile(r'BANDWIDTH=(\d+)')
-    bandwidth_list = bandwidth_pattern.findall(resp)
-    url_to_bandwidth = {url: int(bandwidth) for bandwidth, url in zip(bandwidth_list, play_url_list)}
-    play_url_list = sorted(play_url_list, key=lambda url: url_to_bandwidth[url], reverse=True)
-    return play_url_list
+    return [variant.url for variant in parse_master_playlist(resp)]
 
 
 @trace_error_decorator
@@ -166,25 +158,22 @@ async def get_douyin_stream_data(url: str, proxy_addr: OptionalStr = None, cooki
 
     try:
         origin_url_list = None
-        html_str = await async_req(url=url, proxy_addr=proxy_addr, headers=headers)
-        match_json_str = re.search(r'(\{\\"state\\":.*?)]\\n"]\)', html_str)
-        if not match_json_str:
-            match_json_str = re.search(r'(\{\\"common\\":.*?)]\\n"]\)</script><div hidden', html_str)
-        json_str = match_json_str.group(1)
-        cleaned_string = json_str.replace('\\', '').replace(r'u0026', r'&')
-        room_store = re.search('"roomStore":(.*?),"linkmicStore"', cleaned_string, re.DOTALL).group(1)
-        anchor_name = re.search('"nickname":"(.*?)","avatar_thumb', room_store, re.DOTALL).group(1)
-        room_store = room_store.split(',"has_commerce_goods"')[0] + '}}}'
-        json_data = json.loads(room_store)['roomInfo']['room']
-        json_data['anchor_name'] = anchor_name
+        # the room state and both stream chunks come before the second chunk's closing script tag
+        html_str = await async_req_until(url, '"{\\"common\\":', '</script>', proxy_addr=proxy_addr,
+                                         headers=headers, occurrences=2, slice_only=False)
+        room_store = html_extract.extract_douyin_room_store(html_str)
+        if not room_store:
+            raise ValueError('roomStore not found in page')
+        room_info = room_store['roomInfo']
+        json_data = room_info['room']
+        owner = json_data.get('owner') or room_info.get('anchor') or {}
+        json_data['anchor_name'] = owner.get('nickname', '')
         if 'status' in json_data and json_data['status'] == 4:
             return json_data
         stream_orientation = json_data['stream_url']['stream_orientation']
-        match_json_str2 = re.findall(r'"(\{\\"common\\":.*?)"]\)</script><script nonce=', html_str)
-        if match_json_str2:
-            json_str = match_json_str2[0] if stream_orientation == 1 else match_json_str2[1]
-            json_data2 = json.loads(
-                json_str.replace('\\', '').replace('"{', '{').replace('}"', '}').replace('u0026', '&'))
+        stream_chunks = html_extract.extract_douyin_stream_chunks(html_str)
+        if stream_chunks:
+            json_data2 = stream_chunks[0] if stream_orientation == 1 else stream_chunks[1]
             if 'origin' in json_data2['data']:
                 origin_url_list = json_data2['data']['origin']['main']
 
@@ -217,7 +206,8 @@ async def get_tiktok_stream_data(url: str, proxy_addr: OptionalStr = None, cooki
     if cookies:
         headers['Cookie'] = cookies
     for i in range(3):
-        html_str = await async_req(url=url, proxy_addr=proxy_addr, headers=headers, abroad=True)
+        html_str = await async_req_until(url, '<script id="SIGI_STATE" type="application/json">', '</script>',
+                                         proxy_addr=proxy_addr, headers=headers, abroad=True)
         time.sleep(1)
         if "We regret to inform you that we have discontinued operating TikTok" in html_str:
             msg = re.search('<p>\n\\s+(We regret to inform you that we have discontinu.*?)\\.\n\\s+</p>', html_str)
@@ -227,12 +217,12 @@ async def get_tiktok_stream_data(url: str, proxy_addr: OptionalStr = None, cooki
             )
         if 'UNEXPECTED_EOF_WHILE_READING' not in html_str:
             try:
-                json_str = re.findall(
-                    '<script id="SIGI_STATE" type="application/json">(.*?)</script>',
-                    html_str, re.DOTALL)[0]
-            except Exception:
+                json_data = html_extract.extract_script_json(
+                    html_str, '<script id="SIGI_STATE" type="application/json">')
+            except ValueError:
+                json_data = None
+            if not json_data:
                 raise ConnectionError("Please check if your network can access the TikTok website normally")
-            json_data = json.loads(json_str)
             return json_data
 
 
@@ -245,7 +235,8 @@ async def get_kuaishou_stream_data(url: str, proxy_addr: OptionalStr = None, coo
     if cookies:
         headers['Cookie'] = cookies
     try:
-        html_str = await async_req(url=url, proxy_addr=proxy_addr, headers=headers)
+        html_str = await async_req_until(url, '<script>window.__INITIAL_STATE__=', ';(function(){var s;',
+                                         proxy_addr=proxy_addr, headers=headers)
     except Exception as e:
         print(f"Failed to fetch data from {url}.{e}")
         return {"type": 1, "is_live": False}
@@ -266,7 +257,7 @@ async def get_kuaishou_stream_data(url: str, proxy_addr: OptionalStr = None, coo
         return result
 
     if not play_list.get('liveStream'):
-        print("IP banned. Please change device or network.")
+        print(tr("IP banned. Please change device or network."))
         return result
 
     anchor_name = play_list['author'].get('name', '')
@@ -339,7 +330,8 @@ async def get_huya_stream_data(url: str, proxy_addr: OptionalStr = None, cookies
     if cookies:
         headers['Cookie'] = cookies
 
-    html_str = await async_req(url=url, proxy_addr=proxy_addr, headers=headers)
+    html_str = await async_req_until(url, 'stream: {"data"', ',"iWebDefaultBitRate"', proxy_addr=proxy_addr,
+                                     headers=headers)
     json_str = re.findall('stream: (\\{"data".*?),"iWebDefaultBitRate"', html_str)[0]
     json_data = json.loads(json_str + '}')
     return json_data
@@ -640,7 +632,7 @@ async def get_bilibili_stream_data(url: str, qn: str = '10000', platform: str =
         json_str = await async_req(api, proxy_addr=proxy_addr, headers=headers)
         json_data = json.loads(json_str)
         if json_data['data']['live_status'] == 0:
-            print("The anchor did not start broadcasting.")
+            print(tr("The anchor did not start broadcasting."))
             return
         playurl_info = json_data['data']['playurl_info']
         format_list = playurl_info['playurl']['stream'][0]['format']
@@ -760,7 +752,8 @@ async def get_bigo_stream_url(url: str, proxy_addr: OptionalStr = None, cookies:
         headers['Cookie'] = cookies
 
     if 'bigo.tv' not in url:
-        html_str = await async_req(url, proxy_addr=proxy_addr, headers=headers)
+        html_str = await async_req_until(url, '<meta data-n-head="ssr" data-hid="al:web:url"', '>',
+                                         proxy_addr=proxy_addr, headers=headers)
         web_url = re.search(
             '<meta data-n-head="ssr" data-hid="al:web:url" property="al:web:url" content="(.*?)">',
             html_str).group(1)
@@ -786,7 +779,8 @@ async def get_bigo_stream_url(url: str, proxy_addr: OptionalStr = None, cookies:
         result['record_url'] = m3u8_url
         result |= {"title": live_title, "is_live": True, "m3u8_url": m3u8_url, 'record_url': m3u8_url}
     elif result['anchor_name'] == '':
-        html_str = await async_req(url=f'https://www.bigo.tv/cn/{room_id}', proxy_addr=proxy_addr, headers=headers)
+        html_str = await async_req_until(f'https://www.bigo.tv/cn/{room_id}', '<title>', '</title>',
+                                         proxy_addr=proxy_addr, headers=headers)
         result['anchor_name'] = re.search('<title>歡迎來到(.*?)的直播間</title>', html_str, re.DOTALL).group(1)
 
     return result
@@ -979,23 +973,16 @@ async def get_sooplive_stream_data(
 
     result = {"anchor_name": anchor_name or '' ,"is_live": False}
 
-    async def get_url_list(m3u8: str) -> List[str]:
+    async def get_url_list(m3u8: str) -> dict:
         resp = await async_req(url=m3u8, proxy_addr=proxy_addr, headers=headers, abroad=True)
-        play_url_list = []
         url_prefix = m3u8.rsplit('/', maxsplit=1)[0] + '/'
-        for i in resp.split('\n'):
-            if i.startswith('auth_playlist'):
-                play_url_list.append(url_prefix + i.strip())
-        bandwidth_pattern = re.compile(r'BANDWIDTH=(\d+)')
-        bandwidth_list = bandwidth_pattern.findall(resp)
-        url_to_bandwidth = {purl: int(bandwidth) for bandwidth, purl in zip(bandwidth_list, play_url_list)}
-        play_url_list = sorted(play_url_list, key=lambda purl: url_to_bandwidth[purl], reverse=True)
-        return play_url_list
+        play_variants = [v for v in parse_master_playlist(resp, base_url=url_prefix) if '/auth_playlist' in v.url]
+        return {'play_url_list': [v.url for v in play_variants], 'play_variants': play_variants}
 
     async def handle_login() -> OptionalStr:
         cookie = await login_sooplive(username, password, proxy_addr=proxy_addr)
         if 'AuthTicket=' in cookie:
-            print("sooplive platform login successful! Starting to fetch live streaming data...")
+            print(tr("sooplive platform login successful! Starting to fetch live streaming data..."))
             return cookie
 
     async def fetch_data(cookie, _result) -> dict:
@@ -1008,20 +995,20 @@ async def get_sooplive_stream_data(
             "anchor_name": _anchor_name,
             "is_live": True,
             "m3u8_url": _m3u8_url,
-            'play_url_list': await get_url_list(_m3u8_url),
+            **await get_url_list(_m3u8_url),
             'new_cookies': cookie
         }
         return _result
 
     if not anchor_name:
         if json_data['data']['code'] == -3001:
-            print("sooplive live stream failed to retrieve, the live stream just ended.")
+            print(tr("sooplive live stream failed to retrieve, the live stream just ended."))
             return result
 
         elif json_data['data']['code'] == -3002:
-            print("sooplive live stream retrieval failed, the live needs 19+, you are not logged in.")
-            print("Attempting to log in to the sooplive live streaming platform with your account and password, "
-                  "please ensure it is configured.")
+            print(tr("sooplive live stream retrieval failed, the live needs 19+, you are not logged in."))
+            print(tr("Attempting to log in to the sooplive live streaming platform with your account and password, "
+                     "please ensure it is configured."))
             new_cookie = await handle_login()
             if new_cookie and len(new_cookie) > 0:
                 return await fetch_data(new_cookie, result)
@@ -1033,8 +1020,8 @@ async def get_sooplive_stream_data(
             else:
                 raise RuntimeError("sooplive login failed, please check if the account and password are correct")
         elif json_data['data']['code'] == -6001:
-            print(f"error message：Please check if the input sooplive live room address "
-                  f"is correct.")
+            print(tr("error message：Please check if the input sooplive live room address "
+                     "is correct."))
             return result
     if json_data['result'] == 1 and anchor_name:
         broad_no = json_data['data']['broad_no']
@@ -1042,7 +1029,7 @@ async def get_sooplive_stream_data(
         view_url_data = await get_sooplive_cdn_url(broad_no, proxy_addr=proxy_addr)
         view_url = view_url_data['view_url']
         m3u8_url = view_url + '?aid=' + hls_authentication_key
-        result |= {'is_live': True, 'm3u8_url': m3u8_url, 'play_url_list': await get_url_list(m3u8_url)}
+        result |= {'is_live': True, 'm3u8_url': m3u8_url, **await get_url_list(m3u8_url)}
     result['new_cookies'] = None
     return result
 
@@ -1167,8 +1154,11 @@ async def get_pandatv_stream_data(url: str, proxy_addr: OptionalStr = None, cook
             else:
                 raise RuntimeError(json_data['errorData']['code'], json_data['message'])
         play_url = json_data['PlayList']['hls'][0]['url']
-        play_url_list = await get_play_url_list(m3u8=play_url, proxy=proxy_addr, header=headers, abroad=True)
-        result |= {'is_live': True, 'm3u8_url': play_url, 'play_url_list': play_url_list}
+        play_variants = await get_play_variants(m3u8=play_url, proxy=proxy_addr, header=headers, abroad=True)
+        result |= {
+            'is_live': True, 'm3u8_url': play_url,
+            'play_url_list': [v.url for v in play_variants], 'play_variants': play_variants
+        }
     return result
 
 
@@ -1282,9 +1272,10 @@ async def get_winktv_stream_data(url: str, proxy_addr: OptionalStr = None, cooki
             else:
                 raise RuntimeError(json_data['errorData']['code'], json_data['message'])
         m3u8_url = json_data['PlayList']['hls'][0]['url']
-        play_url_list = await get_play_url_list(m3u8=m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
+        play_variants = await get_play_variants(m3u8=m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
         result['m3u8_url'] = m3u8_url
-        result['play_url_list'] = play_url_list
+        result['play_url_list'] = [v.url for v in play_variants]
+        result['play_variants'] = play_variants
     return result
 
 
@@ -1309,7 +1300,7 @@ async def login_flextv(username: str, password: str, proxy_addr: OptionalStr = N
     url = 'https://api.flextv.co.kr/v2/api/auth/signin'
 
     try:
-        print("Logging into FlexTV platform...")
+        print(tr("Logging into FlexTV platform..."))
         cookie_dict = await async_req(url, proxy_addr=proxy_addr, headers=headers, json_data=data,
                                       return_cookies=True, timeout=20)
 
@@ -1317,7 +1308,7 @@ async def login_flextv(username: str, password: str, proxy_addr: OptionalStr = N
             cookie_str = '; '.join([f"{k}={v}" for k, v in cookie_dict.items()])
             return cookie_str
         else:
-            print("Please check if the FlexTV account and password in the configuration file are correct.")
+            print(tr("Please check if the FlexTV account and password in the configuration file are correct."))
             return None
 
     except Exception as e:
@@ -1378,15 +1369,15 @@ async def get_flextv_stream_data(
         channel_data = json_data['props']['pageProps']['channel']
         login_need = 'message' in channel_data and '로그인후 이용이 가능합니다.' in channel_data.get('message')
         if login_need:
-            print("FlexTV live stream retrieval failed [not logged in]: 19+ live streams are only available for "
-                  "logged-in adults.")
-            print("Attempting to log in to the FlexTV live streaming platform, please ensure your account and "
-                  "password are correctly filled in the configuration file.")
+            print(tr("FlexTV live stream retrieval failed [not logged in]: 19+ live streams are only available for "
+                     "logged-in adults."))
+            print(tr("Attempting to log in to the FlexTV live streaming platform, please ensure your account and "
+                     "password are correctly filled in the configuration file."))
             if len(username) < 6 or len(password) < 8:
                 raise RuntimeError("FlexTV登錄失敗！請在config.ini配置檔案中填寫正確的FlexTV平臺的帳號和密碼")
             new_cookies = await login_flextv(username, password, proxy_addr=proxy_addr)
             if new_cookies:
-                print("Logged into FlexTV platform successfully! Starting to fetch live streaming data...")
+                print(tr("Logged into FlexTV platform successfully! Starting to fetch live streaming data..."))
             else:
                 raise RuntimeError("FlexTV login failed")
             cookies = new_cookies if new_cookies else cookies
@@ -1403,10 +1394,11 @@ async def get_flextv_stream_data(
             result["anchor_name"] = anchor_name
             play_url = await get_flextv_stream_url(url=url, proxy_addr=proxy_addr, cookies=cookies)
             if play_url:
-                play_url_list = await get_play_url_list(m3u8=play_url, proxy=proxy_addr, header=headers, abroad=True)
-                if play_url_list:
+                play_variants = await get_play_variants(m3u8=play_url, proxy=proxy_addr, header=headers, abroad=True)
+                if play_variants:
                     result['m3u8_url'] = play_url
-                    result['play_url_list'] = play_url_list
+                    result['play_url_list'] = [v.url for v in play_variants]
+                    result['play_variants'] = play_variants
                     result['is_live'] = True
         else:
             url2 = f'https://www.flextv.co.kr/channels/{user_id}'
@@ -1494,7 +1486,7 @@ async def get_looklive_stream_url(url: str, proxy_addr: OptionalStr = None, cook
     if live_status == 1:
         result["is_live"] = True
         if json_data['data']['roomInfo']['liveType'] == 1:
-            print("Look live currently only supports audio live streaming, not video live streaming!")
+            print(tr("Look live currently only supports audio live streaming, not video live streaming!"))
         else:
             play_url_list = json_data['data']['roomInfo']['liveUrl']
             live_title = json_data['data']['roomInfo']['title']
@@ -1688,19 +1680,19 @@ async def get_popkontv_stream_url(
         json_str = await fetch_data(headers, partner_code)
 
         if 'HTTP Error 400' in json_str or 'statusCd":"E5000' in json_str or 'Access token expired' in json_str:
-            print("Failed to retrieve popkontv live stream [token does not exist or has expired]: Please log in to "
-                  "watch.")
-            print("Attempting to log in to the popkontv live streaming platform, please ensure your account "
-                  "and password are correctly filled in the configuration file.")
+            print(tr("Failed to retrieve popkontv live stream [token does not exist or has expired]: Please log in to "
+                     "watch."))
+            print(tr("Attempting to log in to the popkontv live streaming platform, please ensure your account "
+                     "and password are correctly filled in the configuration file."))
             if len(username) < 4 or len(password) < 10:
                 raise RuntimeError("popkontv login failed! Please enter the correct account and password for the "
                                    "popkontv platform in the config.ini file.")
-            print("Logging into popkontv platform...")
+            print(tr("Logging into popkontv platform..."))
             new_access_token, new_partner_code = await login_popkontv(
                 username=username, password=password, proxy_addr=proxy_addr, code=partner_code
             )
             if new_access_token and len(new_access_token) == 640:
-                print("Logged into popkontv platform successfully! Starting to fetch live streaming data...")
+                print(tr("Logged into popkontv platform successfully! Starting to fetch live streaming data..."))
                 headers['Authorization'] = f'Bearer {new_access_token}'
                 new_token = f'Bearer {new_access_token}'
                 json_str = await fetch_data(headers, new_partner_code)
@@ -1804,23 +1796,23 @@ async def get_twitcasting_stream_url(
     try:
         to_login = get_params(url, "login")
         if to_login == 'true':
-            print("Attempting to log in to TwitCasting...")
+            print(tr("Attempting to log in to TwitCasting..."))
             new_cookie = await login_twitcasting(
                 account_type=account_type, username=username, password=password, proxy_addr=proxy_addr, cookies=cookies)
             if not new_cookie:
                 raise RuntimeError("TwitCasting login failed, please check if the account password in the "
                                    "configuration file is correct")
-            print("TwitCasting login successful! Starting to fetch data...")
+            print(tr("TwitCasting login successful! Starting to fetch data..."))
             headers['Cookie'] = new_cookie
         anchor_name, live_status, live_title = get_data(headers)
     except AttributeError:
-        print("Failed to retrieve TwitCasting data, attempting to log in...")
+        print(tr("Failed to retrieve TwitCasting data, attempting to log in..."))
         new_cookie = await login_twitcasting(
             account_type=account_type, username=username, password=password, proxy_addr=proxy_addr, cookies=cookies)
         if not new_cookie:
             raise RuntimeError("TwitCasting login failed, please check if the account and password in the "
                                "configuration file are correct")
-        print("TwitCasting login successful! Starting to fetch data...")
+        print(tr("TwitCasting login successful! Starting to fetch data..."))
         headers['Cookie'] = new_cookie
         anchor_name, live_status, live_title = await get_data(headers)
 
@@ -2087,8 +2079,11 @@ async def get_twitchtv_stream_data(url: str, proxy_addr: OptionalStr = None, coo
         }
         access_key = urllib.parse.urlencode(params)
         m3u8_url = f'https://usher.ttvnw.net/api/channel/hls/{uid}.m3u8?{access_key}'
-        play_url_list = await get_play_url_list(m3u8=m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
-        result |= {'m3u8_url': m3u8_url, 'play_url_list': play_url_list}
+        play_variants = await get_play_variants(m3u8=m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
+        result |= {
+            'm3u8_url': m3u8_url,
+            'play_url_list': [v.url for v in play_variants], 'play_variants': play_variants
+        }
     return result
 
 
@@ -2214,8 +2209,8 @@ async def get_huajiao_stream_url_app(url: str, proxy_addr: OptionalStr = None, c
     json_data = json.loads(json_str)
 
     if json_data['errmsg'] or not json_data['data'].get('creatime'):
-        print("Failed to retrieve live room data, the Huajiao live room address is not fixed, please manually change "
-              "the address for recording.")
+        print(tr("Failed to retrieve live room data, the Huajiao live room address is not fixed, please manually change "
+                 "the address for recording."))
         return
     data = json_data['data']
     return {
@@ -2597,10 +2592,11 @@ async def get_chzzk_stream_data(url: str, proxy_addr: OptionalStr = None, cookie
     if live_status == 'OPEN':
         play_data = json.loads(live_data['livePlaybackJson'])
         m3u8_url = play_data['media'][0]['path']
-        m3u8_url_list = await get_play_url_list(m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
-        prefix = m3u8_url.split('?')[0].rsplit('/', maxsplit=1)[0]
-        m3u8_url_list = [prefix + '/' + i for i in m3u8_url_list]
-        result |= {"is_live": True, "m3u8_url": m3u8_url, "play_url_list": m3u8_url_list}
+        play_variants = await get_play_variants(m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
+        result |= {
+            "is_live": True, "m3u8_url": m3u8_url,
+            "play_url_list": [v.url for v in play_variants], "play_variants": play_variants
+        }
     return result
 
 
@@ -2867,7 +2863,7 @@ async def get_shopee_stream_url(url: str, proxy_addr: OptionalStr = None, cookie
     json_str = await async_req(f'{api_host}/api/v1/session/{session_id}', proxy_addr=proxy_addr, headers=headers, abroad=True)
     json_data = json.loads(json_str)
     if not json_data.get('data'):
-        print("Fetch shopee live data failed, please update the address of the live broadcast room and try again.")
+        print(tr("Fetch shopee live data failed, please update the address of the live broadcast room and try again."))
         return result
     uid = json_data['data']['session']['uid']
     anchor_name = json_data['data']['session']['nickname']
@@ -2891,7 +2887,8 @@ async def get_youtube_stream_url(url: str, proxy_addr: OptionalStr = None, cooki
     if cookies:
         headers['Cookie'] = cookies
 
-    html_str = await async_req(url, proxy_addr=proxy_addr, headers=headers, abroad=True)
+    html_str = await async_req_until(url, 'var ytInitialPlayerResponse = ', ';var meta = document.createElement',
+                                     proxy_addr=proxy_addr, headers=headers, abroad=True)
     json_str = re.search('var ytInitialPlayerResponse = (.*?);var meta = document\\.createElement', html_str).group(1)
     json_data = json.loads(json_str)
     result = {"anchor_name": "", "is_live": False}
@@ -2903,8 +2900,11 @@ async def get_youtube_stream_url(url: str, proxy_addr: OptionalStr = None, cooki
     if live_status:
         live_title = json_data['videoDetails']['title']
         m3u8_url = json_data['streamingData']["hlsManifestUrl"]
-        play_url_list = await get_play_url_list(m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
-        result |= {"is_live": True, "title": live_title, "m3u8_url": m3u8_url, "play_url_list": play_url_list}
+        play_variants = await get_play_variants(m3u8_url, proxy=proxy_addr, header=headers, abroad=True)
+        result |= {
+            "is_live": True, "title": live_title, "m3u8_url": m3u8_url,
+            "play_url_list": [v.url for v in play_variants], "play_variants": play_variants
+        }
     return result
 
 
@@ -14,30 +14,58 @@ import json
 import time
 import random
 import re
-from operator import itemgetter
 import urllib.parse
 import urllib.request
 from .utils import trace_error_decorator
+from .playlist import (
+    QUALITY_MAPPING, SelectionPolicy, Variant, apply_policy, get_quality_index, parse_resolution,
+    select_by_quality, select_variant
+)
 from .spider import (
     get_douyu_stream_data, get_bilibili_stream_data
 )
 
-QUALITY_MAPPING = {"OD": 0, "BD": 0, "UHD": 1, "HD": 2, "SD": 3, "LD": 4}
+
+# Douyin url map keys -> quality keys of the sdk stream data, and nominal heights when the page has no sdk params
+DOUYIN_SDK_KEYS = {'ORIGIN': 'origin', 'FULL_HD1': 'uhd', 'HD1': 'hd', 'SD1': 'sd', 'SD2': 'ld'}
+DOUYIN_HEIGHTS = {'ORIGIN': 1080, 'FULL_HD1': 1080, 'HD1': 720, 'SD1': 540, 'SD2': 360}
+# nominal heights of the Bilibili qn levels and the Netease CC resolution keys, neither publishes them per room
+BILIBILI_QN_HEIGHTS = {'10000': 1080, '400': 1080, '250': 720, '150': 480, '80': 360}
+NETEASE_HEIGHTS = {'blueray': 1080, 'ultra': 720, 'high': 540, 'standard': 360}
+
+
+def sdk_params(stream_data: dict, key: str) -> dict:
+    """The sdk params (vbitrate, resolution, VCodec) of one quality in Douyin/TikTok stream data"""
+    try:
+        return json.loads(stream_data[key]['main']['sdk_params'])
+    except (KeyError, TypeError, ValueError):
+        return {}
 
 
-def get_quality_index(quality) -> tuple:
-    if not quality:
-        return list(QUALITY_MAPPING.items())[0]
+def douyin_variants(stream_url: dict, map_key: str) -> list[Variant]:
+    try:
+        stream_data = json.loads(stream_url['live_core_sdk_data']['pull_data']['stream_data']).get('data') or {}
+    except (KeyError, TypeError, ValueError):
+        stream_data = {}
+    variants = []
+    for name, url in stream_url.get(map_key, {}).items():
+        params = sdk_params(stream_data, DOUYIN_SDK_KEYS.get(name, ''))
+        resolution = parse_resolution(params.get('resolution'))
+        if resolution is None and name in DOUYIN_HEIGHTS:
+            resolution = (0, DOUYIN_HEIGHTS[name])
+        vbitrate = str(params.get('vbitrate', ''))
+        variants.append(Variant(url=url, bandwidth=int(vbitrate) if vbitrate.isdigit() else 0, resolution=resolution,
+                                codecs=params.get('VCodec', ''), name=name))
+    return variants
 
-    quality_str = str(quality).upper()
-    if quality_str.isdigit():
-        quality_int = int(quality_str[0])
-        quality_str = list(QUALITY_MAPPING.keys())[quality_int]
-    return quality_str, QUALITY_MAPPING.get(quality_str, 0)
+
+def kuaishou_variant(item: dict) -> Variant:
+    bitrate = str(item.get('bitrate', ''))
+    return Variant(url=item.get('url', ''), bandwidth=int(bitrate) * 1000 if bitrate.isdigit() else 0)
 
 
 @trace_error_decorator
-async def get_douyin_stream_url(json_data: dict, video_quality: str) -> dict:
+async def get_douyin_stream_url(json_data: dict, video_quality: str, policy: SelectionPolicy | None = None) -> dict:
     anchor_name = json_data.get('anchor_name')
 
     result = {
@@ -49,18 +77,11 @@ async def get_douyin_stream_url(json_data: dict, video_quality: str) -> dict:
 
     if status == 2:
         stream_url = json_data['stream_url']
-        flv_url_dict = stream_url['flv_pull_url']
-        flv_url_list: list = list(flv_url_dict.values())
-        m3u8_url_dict = stream_url['hls_pull_url_map']
-        m3u8_url_list: list = list(m3u8_url_dict.values())
-
-        while len(flv_url_list) < 5:
-            flv_url_list.append(flv_url_list[-1])
-            m3u8_url_list.append(m3u8_url_list[-1])
-
-        video_quality, quality_index = get_quality_index(video_quality)
-        m3u8_url = m3u8_url_list[quality_index]
-        flv_url = flv_url_list[quality_index]
+        flv_variants = douyin_variants(stream_url, 'flv_pull_url')
+        m3u8_variants = douyin_variants(stream_url, 'hls_pull_url_map')
+        video_quality, flv_variant = select_variant(flv_variants, video_quality, policy)
+        flv_url = flv_variant.url
+        m3u8_url = select_variant(m3u8_variants, video_quality, policy)[1].url if m3u8_variants else ''
         result |= {
             'is_live': True,
             'title': json_data['title'],
@@ -73,25 +94,25 @@ async def get_douyin_stream_url(json_data: dict, video_quality: str) -> dict:
 
 
 @trace_error_decorator
-async def get_tiktok_stream_url(json_data: dict, video_quality: str) -> dict:
+async def get_tiktok_stream_url(json_data: dict, video_quality: str, policy: SelectionPolicy | None = None) -> dict:
     if not json_data:
         return {"anchor_name": None, "is_live": False}
 
-    def get_video_quality_url(stream, q_key) -> list:
+    def get_video_quality_url(stream, q_key) -> list[Variant]:
         play_list = []
         for key in stream:
             url_info = stream[key]['main']
-            play_url = url_info[q_key]
-            sdk_params = url_info['sdk_params']
-            sdk_params = json.loads(sdk_params)
+            sdk_params = json.loads(url_info['sdk_params'])
             vbitrate = int(sdk_params['vbitrate'])
             resolution = sdk_params['resolution']
             if vbitrate != 0 and resolution:
                 width, height = map(int, resolution.split('x'))
-                play_list.append({'url': play_url, 'vbitrate': vbitrate, 'resolution': (width, height)})
+                play_list.append(Variant(
+                    url=url_info[q_key], bandwidth=vbitrate, resolution=(width, height),
+                    codecs=sdk_params.get('VCodec', ''), name=key
+                ))
 
-        play_list.sort(key=itemgetter('vbitrate'), reverse=True)
-        play_list.sort(key=lambda x: (-x['vbitrate'], -x['resolution'][0], -x['resolution'][1]))
+        play_list.sort(key=lambda x: (-x.bandwidth, -x.resolution[0], -x.resolution[1]))
         return play_list
 
     live_room = json_data['LiveRoom']['liveRoomUserInfo']
@@ -110,13 +131,10 @@ async def get_tiktok_stream_url(json_data: dict, video_quality: str) -> dict:
         flv_url_list = get_video_quality_url(stream_data, 'flv')
         m3u8_url_list = get_video_quality_url(stream_data, 'hls')
 
-        while len(flv_url_list) < 5:
-            flv_url_list.append(flv_url_list[-1])
-        while len(m3u8_url_list) < 5:
-            m3u8_url_list.append(m3u8_url_list[-1])
-        video_quality, quality_index = get_quality_index(video_quality)
-        flv_url = flv_url_list[quality_index]['url'].replace("https://", "http://")
-        m3u8_url = m3u8_url_list[quality_index]['url'].replace("https://", "http://")
+        video_quality, flv_variant = select_variant(flv_url_list, video_quality, policy)
+        _, m3u8_variant = select_variant(m3u8_url_list, video_quality, policy)
+        flv_url = flv_variant.url.replace("https://", "http://")
+        m3u8_url = m3u8_variant.url.replace("https://", "http://")
         result |= {
             'is_live': True,
             'title': live_room['liveRoom']['title'],
@@ -129,7 +147,7 @@ async def get_tiktok_stream_url(json_data: dict, video_quality: str) -> dict:
 
 
 @trace_error_decorator
-async def get_kuaishou_stream_url(json_data: dict, video_quality: str) -> dict:
+async def get_kuaishou_stream_url(json_data: dict, video_quality: str, policy: SelectionPolicy | None = None) -> dict:
     if json_data['type'] == 1 and not json_data["is_live"]:
         return json_data
     live_status = json_data['is_live']
@@ -144,37 +162,35 @@ async def get_kuaishou_stream_url(json_data: dict, video_quality: str) -> dict:
         quality_mapping_bit = {'OD': 99999, 'BD': 4000, 'UHD': 2000, 'HD': 1000, 'SD': 800, 'LD': 600}
         if video_quality in QUALITY_MAPPING:
 
-            quality, quality_index = get_quality_index(video_quality)
             if 'm3u8_url_list' in json_data:
-                m3u8_url_list = json_data['m3u8_url_list'][::-1]
-                while len(m3u8_url_list) < 5:
-                    m3u8_url_list.append(m3u8_url_list[-1])
-                m3u8_url = m3u8_url_list[quality_index]['url']
-                result['m3u8_url'] = m3u8_url
+                m3u8_list = apply_policy(json_data['m3u8_url_list'][::-1], kuaishou_variant, policy)
+                _, m3u8_info = select_by_quality(m3u8_list, video_quality)
+                result['m3u8_url'] = m3u8_info['url']
 
             if 'flv_url_list' in json_data:
                 if 'bitrate' in json_data['flv_url_list'][0]:
-                    flv_url_list = json_data['flv_url_list']
-                    flv_url_list = sorted(flv_url_list, key=lambda x: x['bitrate'], reverse=True)
+                    flv_variants = sorted(
+                        (Variant(url=x['url'], bandwidth=int(x['bitrate']) * 1000) for x in json_data['flv_url_list']),
+                        key=lambda x: x.bandwidth, reverse=True
+                    )
+                    if policy:
+                        flv_variants = policy.apply(flv_variants)
                     quality_str = str(video_quality).upper()
                     if quality_str.isdigit():
                         video_quality, quality_index_bitrate_value = list(quality_mapping_bit.items())[int(quality_str)]
                     else:
                         quality_index_bitrate_value = quality_mapping_bit.get(quality_str, 99999)
                         video_quality = quality_str
-                    quality_index = next(
-                        (i for i, x in enumerate(flv_url_list) if x['bitrate'] <= quality_index_bitrate_value), None)
-                    if quality_index is None:
-                        quality_index = len(flv_url_list) - 1
-                    flv_url = flv_url_list[quality_index]['url']
-
+                    flv_url = next(
+                        (x.url for x in flv_variants if x.bandwidth <= quality_index_bitrate_value * 1000),
+                        flv_variants[-1].url
+                    )
                     result['flv_url'] = flv_url
                     result['record_url'] = flv_url
                 else:
-                    flv_url_list = json_data['flv_url_list'][::-1]
-                    while len(flv_url_list) < 5:
-                        flv_url_list.append(flv_url_list[-1])
-                    flv_url = flv_url_list[quality_index]['url']
+                    flv_list = apply_policy(json_data['flv_url_list'][::-1], kuaishou_variant, policy)
+                    _, flv_info = select_by_quality(flv_list, video_quality)
+                    flv_url = flv_info['url']
                     result |= {'flv_url': flv_url, 'record_url': flv_url}
             result['is_live'] = True
             result['quality'] = video_quality
@@ -182,7 +198,7 @@ async def get_kuaishou_stream_url(json_data: dict, video_quality: str) -> dict:
 
 
 @trace_error_decorator
-async def get_huya_stream_url(json_data: dict, video_quality: str) -> dict:
+async def get_huya_stream_url(json_data: dict, video_quality: str, policy: SelectionPolicy | None = None) -> dict:
     game_live_info = json_data['data'][0]['gameLiveInfo']
     live_title = game_live_info['introduction']
     stream_info_list = json_data['data'][0]['gameStreamInfoList']
@@ -243,25 +259,28 @@ async def get_huya_stream_url(json_data: dict, video_quality: str) -> dict:
         m3u8_url = f'{hls_url}/{stream_name}.{hls_url_suffix}?{new_anti_code}&ratio='
 
         quality_list = flv_anti_code.split('&exsphd=')
-        if len(quality_list) > 1 and video_quality not in ["OD", "BD"]:
-            pattern = r"(?<=264_)\d+"
-            quality_list = list(re.findall(pattern, quality_list[1]))[::-1]
-            while len(quality_list) < 5:
-                quality_list.append(quality_list[-1])
-
-            video_quality_options = {
-                "UHD": quality_list[0],
-                "HD": quality_list[1],
-                "SD": quality_list[2],
-                "LD": quality_list[3]
-            }
-
-            if video_quality not in video_quality_options:
-                raise ValueError(
-                    f"Invalid video quality. Available options are: {', '.join(video_quality_options.keys())}")
-
-            flv_url = flv_url + str(video_quality_options[video_quality])
-            m3u8_url = m3u8_url + str(video_quality_options[video_quality])
+        if len(quality_list) > 1:
+            # transcoded bitrates in kbps, highest first; an empty ratio is the original stream
+            ratios = list(re.findall(r"(?<=264_)\d+", quality_list[1]))[::-1]
+            ratio = ''
+            if video_quality not in ["OD", "BD"]:
+                video_quality_options = {
+                    key: ratios[min(i, len(ratios) - 1)] for i, key in enumerate(("UHD", "HD", "SD", "LD"))
+                }
+
+                if video_quality not in video_quality_options:
+                    raise ValueError(
+                        f"Invalid video quality. Available options are: {', '.join(video_quality_options.keys())}")
+                ratio = video_quality_options[video_quality]
+
+            if ratios and policy:
+                # the original's bitrate is not published, it is at least the highest transcode
+                ladder = [''] + ratios if not ratio else ratios[ratios.index(ratio):]
+                ratio = apply_policy(ladder, lambda r: Variant(
+                    url=r, bandwidth=(int(r) if r else int(ratios[0]) + 1) * 1000, codecs='avc1'), policy)[0]
+
+            flv_url = flv_url + ratio
+            m3u8_url = m3u8_url + ratio
 
         result |= {
             'is_live': True,
@@ -322,7 +341,8 @@ async def get_yy_stream_url(json_data: dict) -> dict:
 
 
 @trace_error_decorator
-async def get_bilibili_stream_url(json_data: dict, video_quality: str, proxy_addr: str, cookies: str) -> dict:
+async def get_bilibili_stream_url(json_data: dict, video_quality: str, proxy_addr: str, cookies: str,
+                                  policy: SelectionPolicy | None = None) -> dict:
     anchor_name = json_data["anchor_name"]
     if not json_data["live_status"]:
         return {
@@ -342,6 +362,12 @@ async def get_bilibili_stream_url(json_data: dict, video_quality: str, proxy_add
     }
 
     select_quality = video_quality_options[video_quality]
+    if policy:
+        # the qn levels publish no bitrate, only the height cap can be applied
+        ladder = list(BILIBILI_QN_HEIGHTS)
+        ladder = ladder[ladder.index(select_quality):]
+        select_quality = apply_policy(
+            ladder, lambda qn: Variant(url=qn, resolution=(0, BILIBILI_QN_HEIGHTS[qn])), policy)[0]
     play_url = await get_bilibili_stream_data(
         room_url, qn=select_quality, platform='web', proxy_addr=proxy_addr, cookies=cookies)
     return {
@@ -354,7 +380,7 @@ async def get_bilibili_stream_url(json_data: dict, video_quality: str, proxy_add
 
 
 @trace_error_decorator
-async def get_netease_stream_url(json_data: dict, video_quality: str) -> dict:
+async def get_netease_stream_url(json_data: dict, video_quality: str, policy: SelectionPolicy | None = None) -> dict:
     if not json_data['is_live']:
         return json_data
 
@@ -364,10 +390,12 @@ async def get_netease_stream_url(json_data: dict, video_quality: str) -> dict:
         stream_list = json_data['stream_list']['resolution']
         order = ['blueray', 'ultra', 'high', 'standard']
         sorted_keys = [key for key in order if key in stream_list]
-        while len(sorted_keys) < 5:
-            sorted_keys.append(sorted_keys[-1])
-        video_quality, quality_index = get_quality_index(video_quality)
-        selected_quality = sorted_keys[quality_index]
+        video_quality, selected_quality = select_by_quality(sorted_keys, video_quality)
+        if policy:
+            ladder = sorted_keys[sorted_keys.index(selected_quality):]
+            selected_quality = apply_policy(ladder, lambda key: Variant(
+                url=key, bandwidth=int(float(stream_list[key].get('vbr') or 0) * 1000),
+                resolution=(0, NETEASE_HEIGHTS[key])), policy)[0]
         flv_url_list = stream_list[selected_quality]['cdn']
         selected_cdn = list(flv_url_list.keys())[0]
         flv_url = flv_url_list[selected_cdn]
@@ -384,22 +412,24 @@ async def get_netease_stream_url(json_data: dict, video_quality: str) -> dict:
 
 
 async def get_stream_url(json_data: dict, video_quality: str, url_type: str = 'm3u8', spec: bool = False,
-                         hls_extra_key: str | int = None, flv_extra_key: str | int = None) -> dict:
+                         hls_extra_key: str | int = None, flv_extra_key: str | int = None,
+                         policy: SelectionPolicy | None = None) -> dict:
     if not json_data['is_live']:
         return json_data
 
     play_url_list = json_data['play_url_list']
-    while len(play_url_list) < 5:
-        play_url_list.append(play_url_list[-1])
-
-    video_quality, selected_quality = get_quality_index(video_quality)
+    play_variants = json_data.get('play_variants')
+    if play_variants and url_type == 'm3u8' and not hls_extra_key:
+        video_quality, variant = select_variant(play_variants, video_quality, policy)
+        play_url = variant.url
+    else:
+        video_quality, play_url = select_by_quality(play_url_list, video_quality)
     data = {
         "anchor_name": json_data['anchor_name'],
         "is_live": True
     }
 
     def get_url(key):
-        play_url = play_url_list[selected_quality]
         return play_url[key] if key else play_url
 
     if url_type == 'all':
@@ -418,4 +448,4 @@ async def get_stream_url(json_data: dict, video_quality: str, url_type: str = 'm
         data |= {"flv_url": flv_url, "record_url": flv_url}
     data['title'] = json_data.get('title')
     data['quality'] = video_quality
-    return data
\ No newline at end of file
+    return data
@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Remember the versions of external tools across runs so startup does not have to execute them.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+execute_dir = os.path.split(os.path.realpath(sys.argv[0]))[0]
+
+
+class ToolVersionCache:
+    """
+    Version strings of executables found on PATH, kept in a JSON file.
+
+    An entry is reused while the executable at the same path has the same size and modification time, so a
+    tool is only run again after it was moved, upgraded or replaced.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        try:
+            self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def version(self, tool: str, args: tuple[str, ...] = ('-version',), lines: int = 1) -> str | None:
+        """The first ``lines`` lines ``tool`` prints for ``args``, None when it is missing or fails"""
+        executable = shutil.which(tool)
+        if not executable:
+            return None
+        try:
+            stat = os.stat(executable)
+        except OSError:
+            return None
+        fingerprint = [executable, stat.st_size, stat.st_mtime_ns, list(args), lines]
+        with self._lock:
+            entry = self._entries.get(tool)
+            if entry and entry.get('fingerprint') == fingerprint:
+                return entry['version']
+        try:
+            result = subprocess.run([executable, *args], capture_output=True, text=True, errors='replace')
+        except OSError:
+            return None
+        version = '\n'.join(result.stdout.strip().splitlines()[:lines])
+        if result.returncode != 0 or not version:
+            return None
+        with self._lock:
+            self._entries[tool] = {'fingerprint': fingerprint, 'version': version}
+            self._save()
+        return version
+
+
+tool_versions = ToolVersionCache(Path(execute_dir) / 'logs' / 'tool_versions.json')
@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Cache resolved stream URLs until their signature expires.
+"""
+import re
+import threading
+import time
+import urllib.parse
+
+# query parameter -> radix of the unix timestamp it carries
+EXPIRY_PARAMS = {
+    'expire': 10,
+    'expires': 10,
+    'x-expires': 10,
+    'deadline': 10,
+    'wstime': 16,
+    'txtime': 16,
+}
+
+_URL_ERROR_PATTERN = re.compile(r'(HTTP error|Server returned) (403|404)')
+
+
+def get_url_expiry(url: str) -> float | None:
+    query = urllib.parse.urlparse(url).query
+    for key, values in urllib.parse.parse_qs(query).items():
+        radix = EXPIRY_PARAMS.get(key.lower())
+        if radix is None:
+            continue
+        try:
+            expiry = int(values[0], radix)
+        except ValueError:
+            continue
+        # some CDNs sign with millisecond timestamps
+        return expiry / 1000 if expiry > 10 ** 11 else expiry
+    return None
+
+
+def is_url_rejected(ffmpeg_output: str) -> bool:
+    return _URL_ERROR_PATTERN.search(ffmpeg_output) is not None
+
+
+class StreamUrlCache:
+    def __init__(self, safety_margin: int = 60, max_ttl: int = 3600):
+        self.safety_margin = safety_margin
+        self.max_ttl = max_ttl
+        self._entries: dict[str, tuple[float, str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, room_url: str, platform: str, port_info: dict) -> bool:
+        record_url = port_info.get('record_url')
+        expiry = get_url_expiry(record_url) if record_url else None
+        if not expiry:
+            return False
+        now = time.time()
+        expires_at = min(expiry - self.safety_margin, now + self.max_ttl)
+        if expires_at <= now:
+            return False
+        with self._lock:
+            self._entries[room_url] = (expires_at, platform, port_info)
+        return True
+
+    def get(self, room_url: str) -> tuple[str, dict] | None:
+        with self._lock:
+            entry = self._entries.get(room_url)
+            if not entry:
+                return None
+            expires_at, platform, port_info = entry
+            if expires_at <= time.time():
+                del self._entries[room_url]
+                return None
+            return platform, port_info
+
+    def invalidate(self, room_url: str) -> None:
+        with self._lock:
+            self._entries.pop(room_url, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
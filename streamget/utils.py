@@ -58,10 +58,12 @@ def trace_error_decorator(func: callable) -> callable:
     return wrapper
 
 
-def check_md5(file_path: str | Path) -> str:
+def check_md5(file_path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    file_md5 = hashlib.md5()
     with open(file_path, 'rb') as fp:
-        file_md5 = hashlib.md5(fp.read()).hexdigest()
-    return file_md5
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            file_md5.update(chunk)
+    return file_md5.hexdigest()
 
 
 def dict_to_cookie_str(cookies_dict: dict) -> str:
@@ -146,8 +148,11 @@ def remove_duplicate_lines(file_path: str | Path) -> None:
     unique_lines = OrderedDict()
     text_encoding = 'utf-8-sig'
     with open(file_path, 'r', encoding=text_encoding) as input_file:
-        for line in input_file:
-            unique_lines[line.strip()] = None
+        content = input_file.read()
+    for line in content.splitlines():
+        unique_lines[line.strip()] = None
+    if ''.join(line + '\n' for line in unique_lines) == content:
+        return
     with open(file_path, 'w', encoding=text_encoding) as output_file:
         for line in unique_lines:
             output_file.write(line + '\n')
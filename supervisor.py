@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Run main.py as several worker processes, each recording its own share of the rooms.
+"""
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from config_backup import ChangeDetector
+from url_catalog import UrlCatalog
+
+SHARD_ENV = 'DLR_SHARD'
+URL_CONFIG_ENV = 'DLR_URL_CONFIG'
+STATUS_FILE_ENV = 'DLR_STATUS_FILE'
+STALE_SECONDS = 30
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring over worker ids.
+
+    A room's owner only depends on its url and the worker count, so it stays on the same worker across
+    config reloads; changing the worker count moves about 1/N of the rooms.
+    """
+
+    def __init__(self, nodes: list[str], replicas: int = 100):
+        points = sorted((_hash(f'{node}#{i}'), node) for node in nodes for i in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def owner(self, key: str) -> str:
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[index]
+
+
+def worker_shard() -> tuple[int, int] | None:
+    """(index, count) when running as a worker started by the supervisor"""
+    value = os.environ.get(SHARD_ENV)
+    if not value:
+        return None
+    index, count = value.split('/')
+    return int(index), int(count)
+
+
+def write_status(path: str, status: dict) -> None:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(status, time=time.time(), pid=os.getpid()), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_status(path: str) -> dict | None:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Supervisor:
+    """
+    Owns URL_config.ini and pushes each worker a snapshot holding only the rooms hashed to it.
+
+    Snapshots are rewritten only when the source file changes and only for the workers whose rooms changed.
+    Workers report their state through a status file, which is aggregated into one display here.
+    """
+
+    def __init__(self, workers: int, script_path: str, url_config_file: str, encoding: str = 'utf-8-sig'):
+        self.workers = workers
+        self.script_path = script_path
+        self.url_config_file = url_config_file
+        self.encoding = encoding
+        self.shard_dir = os.path.join(script_path, 'config', 'shards')
+        self.ring = HashRing([str(i) for i in range(workers)])
+        self.detector = ChangeDetector()
+        self.processes: dict[int, subprocess.Popen] = {}
+        self._started: dict[int, float] = {}
+        self._snapshots: dict[int, str] = {}
+
+    def shard_config(self, index: int) -> str:
+        return os.path.join(self.shard_dir, f'URL_config.{index}.ini')
+
+    def status_file(self, index: int) -> str:
+        return os.path.join(self.shard_dir, f'status.{index}.json')
+
+    def push_snapshots(self) -> None:
+        catalog = UrlCatalog.load(self.url_config_file, self.encoding)
+        if catalog.duplicates:
+            catalog.remove(catalog.duplicates)
+        shards = {i: [] for i in range(self.workers)}
+        for entry in catalog.entries:
+            if entry.url:
+                shards[int(self.ring.owner(entry.url))].append(entry.raw.rstrip('\r\n') + '\n')
+
+        os.makedirs(self.shard_dir, exist_ok=True)
+        for index, lines in shards.items():
+            content = ''.join(lines)
+            if self._snapshots.get(index) == content:
+                continue
+            tmp_path = self.shard_config(index) + '.tmp'
+            with open(tmp_path, 'w', encoding=self.encoding) as f:
+                f.write(content)
+            os.replace(tmp_path, self.shard_config(index))
+            self._snapshots[index] = content
+            print(f'分片{index}: {len(lines)}個直播間')
+
+    def start_worker(self, index: int) -> None:
+        env = dict(os.environ)
+        env[SHARD_ENV] = f'{index}/{self.workers}'
+        env[URL_CONFIG_ENV] = self.shard_config(index)
+        env[STATUS_FILE_ENV] = self.status_file(index)
+        main_script = os.path.join(self.script_path, 'main.py')
+        self.processes[index] = subprocess.Popen([sys.executable, main_script], cwd=self.script_path, env=env)
+        self._started[index] = time.monotonic()
+
+    def stop(self) -> None:
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def display(self) -> None:
+        now = time.time()
+        statuses = {i: read_status(self.status_file(i)) for i in range(self.workers)}
+        live = {i: s for i, s in statuses.items() if s and now - s['time'] < STALE_SECONDS}
+        monitoring = sum(s['monitoring'] for s in live.values())
+        errors = sum(s['error_count'] for s in live.values())
+        stalls = sum(s.get('stalls', 0) for s in live.values())
+        print(f"\r共監測{monitoring}個直播中 | 工作行程: {len(live)}/{self.workers} | 目前瞬時錯誤數為: {errors}"
+              f" | 輸出停滯重啟次數: {stalls} | 目前時間: {time.strftime('%H:%M:%S', time.localtime())}")
+        for i in range(self.workers):
+            if i not in live:
+                print(f"分片{i}: 無狀態回報")
+
+        recordings = [(name, start, quality) for s in live.values() for name, (start, quality) in
+                      s['recording'].items()]
+        if not recordings:
+            print("\r沒有正在錄製的直播")
+            return
+        now_time = datetime.datetime.now()
+        print("x" * 60)
+        print(f"正在錄製{len(recordings)}個直播: ")
+        for name, start, quality in sorted(recordings):
+            have_record_time = now_time - datetime.datetime.fromisoformat(start)
+            print(f"{name}[{quality}] 正在錄製中 {str(have_record_time).split('.')[0]}")
+        print("x" * 60)
+
+    def run(self, display_interval: int = 10) -> None:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            self.detector.changed(self.url_config_file)
+            self.push_snapshots()
+            for index in range(self.workers):
+                self.start_worker(index)
+
+            last_display = time.monotonic()
+            while True:
+                time.sleep(1)
+                if self.detector.changed(self.url_config_file):
+                    self.push_snapshots()
+                for index, process in self.processes.items():
+                    # a worker that keeps crashing is restarted at most every 10 seconds
+                    if process.poll() is not None and time.monotonic() - self._started[index] >= 10:
+                        print(f"分片{index}工作行程已退出(返回碼{process.returncode}), 重新啟動")
+                        self.start_worker(index)
+                if time.monotonic() - last_display >= display_interval:
+                    last_display = time.monotonic()
+                    self.display()
+        finally:
+            self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    script_dir = os.path.split(os.path.realpath(sys.argv[0]))[0]
+    parser = argparse.ArgumentParser(description='Record rooms with several main.py worker processes')
+    parser.add_argument('-n', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--url-config', default=os.path.join(script_dir, 'config', 'URL_config.ini'))
+    parser.add_argument('--display-interval', type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        Supervisor(max(1, args.workers), script_dir, args.url_config).run(args.display_interval)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Write wall-clock timecode subtitles for recordings.
+"""
+import datetime
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, TextIO
+
+
+def format_timecode(seconds: int) -> str:
+    m, s = divmod(seconds, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
+def srt_cue(index: int, start_time: datetime.datetime) -> str:
+    """Cue ``index`` spans seconds index..index+1 and shows the wall clock ``index - 1`` seconds after start"""
+    wall_clock = start_time + datetime.timedelta(seconds=index - 1)
+    return (f"{index}\n{format_timecode(index)},000 --> {format_timecode(index + 1)},000\n"
+            f"{wall_clock.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+
+def write_srt(path: str, start_time: datetime.datetime, duration: int, encoding: str = 'utf-8-sig',
+              first_index: int = 1) -> None:
+    """Generate the whole timecode track at once from the recording start time and duration"""
+    with open(path, 'a', encoding=encoding, buffering=1024 * 1024) as f:
+        for index in range(first_index, duration + 1):
+            f.write(srt_cue(index, start_time))
+
+
+@dataclass
+class _Track:
+    path: str
+    is_active: Callable[[], bool]
+    live: bool
+    start_time: datetime.datetime = field(default_factory=datetime.datetime.now)
+    started: float = field(default_factory=time.monotonic)
+    written: int = 0
+    handle: TextIO | None = None
+
+
+class SubtitleService:
+    """
+    One timer thread serving the timecode subtitles of every active recording.
+
+    Live tracks are written through buffered handles that are flushed every ``flush_interval`` seconds;
+    deferred tracks write nothing until the recording ends and are then generated in one pass.
+    """
+
+    def __init__(self, encoding: str = 'utf-8-sig', flush_interval: int = 10):
+        self.encoding = encoding
+        self.flush_interval = flush_interval
+        self._tracks: dict[str, _Track] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def add(self, path: str, is_active: Callable[[], bool], live: bool = True) -> None:
+        track = _Track(path=path, is_active=is_active, live=live)
+        if live:
+            track.handle = open(path, 'a', encoding=self.encoding)
+        with self._lock:
+            old = self._tracks.pop(path, None)
+            self._tracks[path] = track
+            # the timer thread only writes to handles it finds registered while holding the lock
+            if old and old.handle:
+                self._close(old)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='subtitle-service', daemon=True)
+                self._thread.start()
+        if old and not old.live:
+            self._write_deferred(old)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        ticks = 0
+        while True:
+            next_tick += 1
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            ticks += 1
+            with self._lock:
+                tracks = list(self._tracks.values())
+            for track in tracks:
+                active = track.is_active()
+                with self._lock:
+                    if self._tracks.get(track.path) is not track:
+                        continue
+                    try:
+                        self._tick(track, flush=ticks % self.flush_interval == 0)
+                    except (OSError, ValueError):
+                        active = False
+                    if not active:
+                        del self._tracks[track.path]
+                        if track.handle:
+                            self._close(track)
+                if not active and not track.live:
+                    self._write_deferred(track)
+
+    @staticmethod
+    def _tick(track: _Track, flush: bool) -> None:
+        if track.live:
+            # catch up on missed seconds instead of drifting when a tick runs late
+            elapsed = int(time.monotonic() - track.started) + 1
+            while track.written < elapsed:
+                track.written += 1
+                track.handle.write(srt_cue(track.written, track.start_time))
+            if flush:
+                track.handle.flush()
+
+    @staticmethod
+    def _close(track: _Track) -> None:
+        try:
+            track.handle.close()
+        except (OSError, ValueError):
+            pass
+
+    def _write_deferred(self, track: _Track) -> None:
+        duration = int(time.monotonic() - track.started) + 1
+        write_srt(track.path, track.start_time, duration, self.encoding)
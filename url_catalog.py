@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+Author: SAOJSM
+GitHub: https://github.com/SAOJSM
+Date: 2025-03-18 05:40:00
+Update: 2025-03-18 05:40:00
+Copyright (c) 2025-2025 by SAOJSM, All Rights Reserved.
+Function: Parse URL_config.ini in one pass with line offsets and hash indexes.
+"""
+import mmap
+import os
+import re
+from collections import Counter
+from typing import NamedTuple
+
+QUALITY_NAMES = ("原畫", "藍光", "超清", "高清", "標清", "流暢")
+BOM = b'\xef\xbb\xbf'
+
+_SPLIT_PATTERN = re.compile('[,，]')
+_URL_PATTERN = re.compile(r"(https?://)?(www\.)?[a-zA-Z0-9-]+(\.[a-zA-Z0-9-]+)+(:\d+)?(/.*)?")
+
+
+def contains_url(string: str) -> bool:
+    return _URL_PATTERN.search(string) is not None
+
+
+class UrlEntry(NamedTuple):
+    line_no: int
+    offset: int
+    length: int
+    raw: str
+    quality: str = ''
+    url: str = ''
+    name: str = ''
+    is_comment: bool = False
+
+
+def parse_line(line: str, default_quality: str) -> tuple[str, str, str, bool]:
+    """Split a stripped config line into (quality, url, name, is_comment)"""
+    is_comment = line.startswith("#")
+    if is_comment:
+        line = line.lstrip('#')
+
+    split_line = _SPLIT_PATTERN.split(line) if _SPLIT_PATTERN.search(line) else [line, '']
+    if len(split_line) == 1:
+        url = split_line[0]
+        quality, name = default_quality, ''
+    elif len(split_line) == 2:
+        if contains_url(split_line[0]):
+            quality = default_quality
+            url, name = split_line
+        else:
+            quality, url = split_line
+            name = ''
+    else:
+        quality, url, name = split_line[:3]
+
+    if quality not in QUALITY_NAMES:
+        quality = '原畫'
+    return quality, url, name, is_comment
+
+
+class UrlCatalog:
+    """
+    Snapshot of URL_config.ini.
+
+    Lines are located by byte offset over an mmap in a single pass; exact duplicate lines and repeated
+    URLs are found through hash sets, and removing them rewrites the file once. Edits of single lines
+    (``replace``) are spliced in by offset as well, so a batch of them costs one rewrite.
+
+    ``load`` with the ``previous`` snapshot returns it as is while the file's size and mtime are unchanged,
+    which is the common case for the main loop's rescans. After an edit, the file is scanned again, but lines
+    seen in the previous snapshot reuse its parsed fields instead of going through ``parse_line``.
+    """
+
+    def __init__(self, path: str, encoding: str = 'utf-8-sig'):
+        self.path = path
+        self.encoding = 'utf-8' if encoding.lower().replace('_', '-') == 'utf-8-sig' else encoding
+        self.entries: list[UrlEntry] = []
+        self.by_url: dict[str, UrlEntry] = {}
+        self.duplicates: list[UrlEntry] = []
+        self._stat: tuple[int, int] | None = None
+        self._options: tuple[str, str, int] | None = None
+        self._parsed: dict[str, tuple[str, str, str, bool]] = {}
+
+    @classmethod
+    def load(cls, path: str, encoding: str = 'utf-8-sig', default_quality: str = '原畫',
+             min_length: int = 20, previous: 'UrlCatalog | None' = None) -> 'UrlCatalog':
+        options = (encoding, default_quality, min_length)
+        known = {}
+        if previous is not None and previous.path == path and previous._options == options:
+            if previous.is_unchanged():
+                return previous
+            known = previous._parsed
+        catalog = cls(path, encoding)
+        catalog._parse(default_quality, min_length, known)
+        catalog._options = options
+        return catalog
+
+    def _parse(self, default_quality: str, min_length: int, known: dict[str, tuple[str, str, str, bool]]) -> None:
+        parsed = self._parsed
+        seen_lines = set()
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._stat = (stat.st_mtime_ns, stat.st_size)
+            if not stat.st_size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = len(BOM) if data[:len(BOM)] == BOM else 0
+                size = len(data)
+                line_no = 0
+                while offset < size:
+                    end = data.find(b'\n', offset)
+                    end = size if end == -1 else end + 1
+                    raw = data[offset:end].decode(self.encoding, errors='ignore')
+                    start, length = offset, end - offset
+                    offset = end
+
+                    line = raw.strip()
+                    if raw in seen_lines and line:
+                        self.duplicates.append(UrlEntry(line_no, start, length, raw))
+                        line_no += 1
+                        continue
+                    seen_lines.add(raw)
+                    if len(line) < min_length:
+                        entry = UrlEntry(line_no, start, length, raw)
+                    else:
+                        fields = known.get(raw) or parse_line(line, default_quality)
+                        parsed[raw] = fields
+                        entry = UrlEntry(line_no, start, length, raw, *fields)
+                    line_no += 1
+                    if entry.url in self.by_url:
+                        self.duplicates.append(entry)
+                        continue
+                    if entry.url:
+                        self.by_url[entry.url] = entry
+                    self.entries.append(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.by_url
+
+    def find(self, url: str) -> UrlEntry | None:
+        """Entry of a URL as written in the file, with or without its scheme"""
+        return self.by_url.get(url) or self.by_url.get(url.split('://', 1)[-1])
+
+    def is_unchanged(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) == self._stat
+
+    def remove(self, entries: list[UrlEntry]) -> int:
+        """
+        Drop the given lines with one rewrite. Byte offsets are only trusted while the file is unchanged
+        since loading; otherwise lines are matched by content, one occurrence per entry.
+        """
+        if not entries:
+            return 0
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        if self.is_unchanged():
+            new_data = _splice(data, [(e.offset, e.offset + e.length, b'') for e in entries])
+        else:
+            pending = Counter(e.raw for e in entries)
+            has_bom = data.startswith(BOM)
+            parts = data[len(BOM) if has_bom else 0:].decode(self.encoding, errors='ignore').split('\n')
+            lines = [line + '\n' for line in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+            # keep the first copies of a line, drop the trailing ones
+            keep = Counter(lines)
+            for line, count in pending.items():
+                keep[line] -= count
+            kept = []
+            for line in lines:
+                if keep[line] > 0 or line not in pending:
+                    keep[line] -= 1
+                    kept.append(line)
+            new_data = (BOM if has_bom else b'') + ''.join(kept).encode(self.encoding)
+
+        with open(self.path, 'wb') as f:
+            f.write(new_data)
+        return len(entries)
+
+    def replace(self, changes: dict[UrlEntry, str]) -> int:
+        """
+        Replace the stripped text of the given lines with one rewrite, keeping their indentation and line
+        endings. As in ``remove``, lines are matched by content when the file changed since loading.
+        """
+        changes = {entry: text for entry, text in changes.items() if text != entry.raw.strip()}
+        if not changes:
+            return 0
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        def edited(raw: str, text: str) -> str:
+            return raw.replace(raw.strip(), text, 1)
+
+        if self.is_unchanged():
+            new_data = _splice(data, [(e.offset, e.offset + e.length, edited(e.raw, text).encode(self.encoding))
+                                      for e, text in changes.items()])
+        else:
+            pending = {e.raw: text for e, text in changes.items()}
+            has_bom = data.startswith(BOM)
+            parts = data[len(BOM) if has_bom else 0:].decode(self.encoding, errors='ignore').split('\n')
+            lines = [line + '\n' for line in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+            for i, line in enumerate(lines):
+                if line in pending:
+                    lines[i] = edited(line, pending.pop(line))
+            new_data = (BOM if has_bom else b'') + ''.join(lines).encode(self.encoding)
+
+        with open(self.path, 'wb') as f:
+            f.write(new_data)
+        return len(changes)
+
+
+def _splice(data: bytes, edits: list[tuple[int, int, bytes]]) -> bytes:
+    """Apply non-overlapping (start, end, replacement) byte edits"""
+    parts = []
+    position = 0
+    for start, end, replacement in sorted(edits):
+        parts.append(data[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(data[position:])
+    return b''.join(parts)